@@ -1,4 +1,6 @@
-from zipfile import ZipFile
+import time
+import tarfile
+from zipfile import ZipFile, ZipInfo, ZIP_STORED, ZIP_DEFLATED
 
 class ZipFileArchiver(object):
     """
@@ -33,8 +35,203 @@ class ZipFileArchiver(object):
         """
         self.zipfile.extractall(*args, **kwargs)
 
+    def members(self):
+        """
+        Yields info about each member of the archive.
+
+        Info is read from the central directory only, no member data is
+        decompressed.
+
+        :returns: Generator of dicts with keys ``name``, ``size``, ``ts``
+                  and ``dir``.
+        """
+        for info in self.zipfile.infolist():
+            yield dict(
+                name=info.filename.rstrip('/'),
+                size=info.file_size,
+                ts=time.mktime(info.date_time + (0, 0, -1)),
+                dir=info.is_dir()
+            )
+
     def close(self):
         """
         Close the archive.
         """
-        self.zipfile.close()
\ No newline at end of file
+        self.zipfile.close()
+
+
+class TarFileArchiver(object):
+    """
+    An archiver used to read .tar files, optionally compressed.
+    This wraps Python's built in :class:`tarfile.TarFile` to provide
+    the same interface as :class:`ZipFileArchiver`.
+    """
+
+    def __init__(self, fileobj, mode='r:*'):
+        """
+        Create a :class:`.TarFileArchiver` instance from an open file-like
+        object.
+        """
+        self.tarfile = tarfile.open(fileobj=fileobj, mode=mode)
+
+    @classmethod
+    def open(self, *args, **kwargs):
+        """
+        Open the archive. This must be a classmethod.
+        """
+        return TarFileArchiver(*args, **kwargs)
+
+    def add(self, *args, **kwargs):
+        """
+        Add file to the archive.
+        """
+        self.tarfile.add(*args, **kwargs)
+
+    def extractall(self, *args, **kwargs):
+        """
+        Extract all files from the archive.
+        """
+        self.tarfile.extractall(*args, **kwargs)
+
+    def members(self):
+        """
+        Yields info about each member of the archive.
+
+        Headers are read lazily, one after the other. For an uncompressed
+        tar, the data blocks between the headers are skipped by seeking;
+        a compressed tar must be decompressed to get from one header to the
+        next, but member data is never extracted.
+
+        :returns: Generator of dicts with keys ``name``, ``size``, ``ts``
+                  and ``dir``.
+        """
+        for info in self.tarfile:
+            yield dict(
+                name=info.name.rstrip('/'),
+                size=info.size,
+                ts=info.mtime,
+                dir=info.isdir()
+            )
+
+    def close(self):
+        """
+        Close the archive.
+        """
+        self.tarfile.close()
+
+
+LISTERS = {
+    'application/zip' : ZipFileArchiver,
+    'application/x-zip' : ZipFileArchiver,
+    'application/x-tar' : TarFileArchiver,
+    'application/gzip' : TarFileArchiver,
+    'application/x-gzip' : TarFileArchiver,
+    'application/x-bzip2' : TarFileArchiver,
+    'application/x-xz' : TarFileArchiver,
+}
+"""
+Archivers that are able to list the members of an archive, key is mime-type.
+"""
+
+
+class _ZipSink(object):
+    """
+    Write-only, unseekable buffer that :class:`ZipStream` writes into.
+
+    Because it cannot seek, :class:`zipfile.ZipFile` writes each member
+    with a data descriptor, i.e. sizes and CRC follow the data.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """
+        Returns and clears all data written so far.
+        """
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ZipStream(object):
+    """
+    A zip archive that is generated while it is read.
+
+    Iterating yields the archive in chunks; no member needs to be known
+    upfront, and memory usage is bounded by ``block_size``. Members are
+    written with zip64 extensions and data descriptors, so neither their
+    sizes nor the size of the whole archive must be known in advance.
+
+    Entries are dicts with keys:
+
+    - ``name``: Name of member inside the archive, with '/' as separator
+    - ``ts``: Modification time
+    - ``dir``: True if member is a directory
+    - ``open``: Callable without arguments that returns a file-like object
+      for the content of a file member
+    """
+
+    def __init__(self, entries, compression=ZIP_DEFLATED, block_size=64*1024):
+        """
+        :param entries: Iterable of entries, may be a generator
+        :param compression: ``zipfile.ZIP_DEFLATED`` or
+                            ``zipfile.ZIP_STORED``
+        :param block_size: Size of blocks read from members
+        """
+        self._entries = entries
+        self._compression = compression
+        self.block_size = block_size
+        self._gen = None
+
+    def __iter__(self):
+        if self._gen is None:
+            self._gen = self._generate()
+        return self._gen
+
+    def _generate(self):
+        sink = _ZipSink()
+        zf = ZipFile(sink, 'w', self._compression)
+        for entry in self._entries:
+            name = entry['name'].strip('/')
+            date_time = time.localtime(max(entry['ts'], 315532800))[:6]
+            if entry['dir']:
+                info = ZipInfo(name + '/', date_time)
+                info.external_attr = (0o40755 << 16) | 0x10
+                zf.writestr(info, b'')
+            else:
+                info = ZipInfo(name, date_time)
+                info.external_attr = 0o644 << 16
+                info.compress_type = self._compression
+                src = entry['open']()
+                try:
+                    with zf.open(info, 'w', force_zip64=True) as dst:
+                        while True:
+                            data = src.read(self.block_size)
+                            if not data:
+                                break
+                            dst.write(data)
+                            chunk = sink.drain()
+                            if chunk:
+                                yield chunk
+                finally:
+                    src.close()
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+        zf.close()
+        yield sink.drain()
+
+    def close(self):
+        """
+        Stops generating, closes the currently open member.
+        """
+        if self._gen is not None:
+            self._gen.close()
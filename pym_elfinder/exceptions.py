@@ -62,10 +62,15 @@ PYM_ERROR_INVALID_NAME_POLICY = 'Name policy is invalid'
 PYM_ERROR_UNIQUE_NAME = 'Failed to create unique name'
 PYM_ERROR_INVALID_PATH = 'Invalid path'
 PYM_ERROR_QUOTA_EXCEEDED = 'Quota exceeded ({0:,d} bytes free)'
+PYM_ERROR_RANGE_NOT_SATISFIABLE = 'Requested range not satisfiable'
+PYM_ERROR_MULTIPART = 'Invalid multipart data'
 
 HTTP_INTERNAL_SERVER_ERROR = 'HTTP/1.x 500 Internal Server Error'
 HTTP_ACCESS_DENIED         = 'HTTP/1.x 403 Access Denied';
 HTTP_NOT_FOUND             = 'HTTP/1.x 404 Not Found';
+HTTP_PARTIAL_CONTENT       = 'HTTP/1.x 206 Partial Content'
+HTTP_NOT_MODIFIED          = 'HTTP/1.x 304 Not Modified'
+HTTP_RANGE_NOT_SATISFIABLE = 'HTTP/1.x 416 Requested Range Not Satisfiable'
 
 class FinderError(Exception):
     """
@@ -166,7 +171,8 @@ class FinderAccessDenied(FinderError):
         """
         Sets HTTP status to 403 ACCESS DENIED.
         """
-        kw2 = dict(status=HTTP_ACCESS_DENIED).update(kw)
+        kw2 = dict(status=HTTP_ACCESS_DENIED)
+        kw2.update(kw)
         super().__init__(ERROR_PERM_DENIED, *args, **kw2)
 
 
@@ -176,6 +182,7 @@ class FinderNotFound(FinderError):
         """
         Sets HTTP status to 404 NOT FOUND.
         """
-        kw2 = dict(status=HTTP_NOT_FOUND).update(kw)
+        kw2 = dict(status=HTTP_NOT_FOUND)
+        kw2.update(kw)
         super().__init__(ERROR_FILE_NOT_FOUND, *args, **kw2)
 
@@ -4,9 +4,15 @@ from importlib import import_module
 import time
 import re
 import urllib
+import uuid
+from collections import OrderedDict
 from pprint import pprint
 
 from . import exceptions as exc
+from . import archivers
+from . import httputil
+from . import streams
+from . import uploads
 from . import API_VERSION
 
 class Finder:
@@ -18,25 +24,39 @@ class Finder:
         'parents' : { 'target' : True },
         'tmb' : { 'targets' : True },
         'file' : { 'target' : True, 'download' : False },
+        'url' : { 'target' : True, 'options' : False },
+        'zipdl' : { 'targets' : True, 'name' : False, 'compress' : False },
         'size' : { 'targets' : True },
-        'mkdir' : { 'target' : True, 'name' : True },
+        'mkdir' : { 'target' : True, 'name' : False, 'dirs' : False },
         'mkfile' : { 'target' : True, 'name' : True, 'mimes' : False },
         'rm' : { 'targets' : True },
+        'trash' : { 'target' : True },
+        'restore' : { 'target' : True, 'ids' : True },
         'rename' : { 'target' : True, 'name' : True, 'mimes' : False },
         'duplicate' : { 'targets' : True },
         'paste' : { 'dst' : True, 'targets' : True, 'cut' : False, 'mimes' : False },
-        'upload' : { 'target' : True, 'upload' : True, 'mimes' : False, 'html' : False },
+        'upload' : { 'target' : True, 'upload' : True, 'mimes' : False, 'html' : False, 'chunk' : False, 'cid' : False, 'range' : False, 'upload_path' : False },
+        'chunkstatus' : { 'target' : True, 'chunk' : True, 'cid' : True },
         'get' : { 'target' : True },
         'put' : { 'target' : True, 'content' : '', 'mimes' : False },
         'archive' : { 'targets' : True, 'type_' : True, 'mimes' : False },
         'extract' : { 'target' : True, 'mimes' : False },
         'search' : { 'q' : True, 'mimes' : False },
         'info' : { 'targets' : True, 'options': False },
+        'lsarchive' : { 'target' : True, 'offset' : False, 'limit' : False },
         'dim' : { 'target' : True },
         'resize' : {'target' : True, 'width' : True, 'height' : True, 'mode' : False, 'x' : False, 'y' : False, 'degree' : False },
         'netmount'  : { 'protocol' : True, 'host' : True, 'path' : False, 'port' : False, 'user' : True, 'pass' : True, 'alias' : False, 'options' : False}
     }
 
+    ARG_KEYWORDS = {
+        'range' : 'range_',
+    }
+    """
+    Keyword arguments of the command methods for request parameters whose
+    names would shadow a builtin.
+    """
+
     def __init__(self, opts, cache, session=None):
         # ---[ private attribs ]-------
         self._opts = opts
@@ -85,6 +105,27 @@ class Finder:
         We need it to setup the 'filename' setting in the HTTP headers for
         downloading a file.
         """
+        self.http_range = None
+        """
+        Value of HTTP header ``Range``.
+
+        Initialize this attribute inside a request. Command ``file`` then
+        sends only the requested byte ranges of the file.
+        """
+        self.if_none_match = None
+        """
+        Value of HTTP header ``If-None-Match``.
+
+        Initialize this attribute inside a request. Commands ``file`` and
+        ``get`` then respond with status 304 Not Modified if the client's
+        copy is still valid, without reading the file.
+        """
+        self.if_modified_since = None
+        """
+        Value of HTTP header ``If-Modified-Since``.
+
+        See :attr:`if_none_match`.
+        """
 
     def mount_volumes(self):
         self.volumes = {}
@@ -152,9 +193,17 @@ class Finder:
         # Update quota
         # TODO  Optimize this
         for id_, volume in self.volumes.items():
+            volume.clear_cache()
             volume.update_quota()
         # Run command
-        result = getattr(self, func)(**cmd_args)
+        kwargs = { self.ARG_KEYWORDS.get(k, k) : v
+            for k, v in cmd_args.items() }
+        try:
+            result = getattr(self, func)(**kwargs)
+        finally:
+            # Sync written data according to volume option "durability"
+            for id_, volume in self.volumes.items():
+                volume.flush()
         if self.debug:
             result['debug'] = {
                 'connector' : 'Pym-elFinder',
@@ -296,6 +345,17 @@ class Finder:
         tree = volume.tree_stats(target)
         return dict(tree=tree)
 
+    def cmd_parents(self, target):
+        """
+        Returns all parent directories of requested directory and their
+        subdirectories.
+
+        :param target: Hash of directory
+        :returns: Dict(tree=list(...))
+        """
+        volume = self._volume_from_hash(target)
+        return dict(tree=volume.parents(target))
+
     def cmd_ls_hash(self, target):
         """
         Returns list of item names in requested directory.
@@ -307,12 +367,30 @@ class Finder:
         names = volume.ls_names_hash(target)
         return dict(list=names)
 
-    def cmd_mkdir(self, target, name):
+    def cmd_mkdir(self, target, name=None, dirs=None):
         """
         Creates a new directory
+
+        Several directories, e.g. of a folder to upload, are created at once
+        by passing ``dirs``, a list of paths relative to ``target``. Then
+        ``hashes`` maps each of these paths to the hash of its directory.
+        See :meth:`~pym_elfinder.volume.volumedriver.VolumeDriver.mkdirs()`.
+
+        :param target: Hash of current directory
+        :param name: Name of new directory
+        :param dirs: List of relative paths of new directories
         """
+        if not name and not dirs:
+            raise exc.FinderError(exc.ERROR_INV_PARAMS, 'mkdir', 'name')
         volume = self._volume_from_hash(target)
-        return dict(added=[volume.mkdir(target, name)])
+        result = dict(added=[])
+        if name:
+            result['added'].append(volume.mkdir(target, name))
+        if dirs:
+            added, hashes = volume.mkdirs(target, dirs)
+            result['added'] += added
+            result['hashes'] = hashes
+        return result
 
     def cmd_mkfile(self, target, name):
         """
@@ -335,13 +413,19 @@ class Finder:
         cut = bool(int(cut))
         result = dict(added=[], removed=[])
         dst_vol = self._volume_from_hash(dst)
-        # "targets" are in fact the source items
+        # "targets" are in fact the source items. Items of each source
+        # volume are pasted in one batch, see
+        # :meth:`~pym_elfinder.volume.volumedriver.VolumeDriver.paste_many()`.
+        batches = OrderedDict()
         for src in targets:
             src_vol = self._volume_from_hash(src)
-            added, removed = dst_vol.paste(src_vol, src, dst, cut)
-            result['added'].append(added)
-            if removed:
-                result['removed'].append(removed)
+            batches.setdefault(src_vol, []).append(src)
+        for src_vol, hashes in batches.items():
+            for added, removed in dst_vol.paste_many(src_vol, hashes, dst,
+                    cut):
+                result['added'].append(added)
+                if removed:
+                    result['removed'].append(removed)
         return result
 
     def cmd_duplicate(self, targets):
@@ -355,28 +439,54 @@ class Finder:
         """
         result = dict(added=[])
         # "targets" are in fact the source items
+        batches = OrderedDict()
         for target in targets:
             vol = self._volume_from_hash(target)
-            added = vol.duplicate(target)
-            result['added'].append(added)
+            batches.setdefault(vol, []).append(target)
+        for vol, hashes in batches.items():
+            result['added'].extend(vol.duplicate_many(hashes))
         return result
 
     def cmd_rm(self, targets):
         """
         Removes items.
 
-        Only empty diresctories will be removed.
+        Directories are removed with all their content. The items of each
+        volume are removed in one batch, see
+        :meth:`~pym_elfinder.volume.volumedriver.VolumeDriver.remove_many()`.
 
         :param targets: List of items.
         """
         result = dict(removed=[])
+        batches = OrderedDict()
         for target in targets:
             vol = self._volume_from_hash(target)
-            removed = vol.remove(target)
-            result['removed'].append(removed)
+            batches.setdefault(vol, []).append(target)
+        for vol, hashes in batches.items():
+            result['removed'].extend(vol.remove_many(hashes))
         return result
     
-    def cmd_upload(self, target, upload):
+    def cmd_trash(self, target):
+        """
+        Lists the items in trash of a volume.
+
+        :param target: Hash of any item of the volume
+        """
+        vol = self._volume_from_hash(target)
+        return dict(files=vol.trash_list())
+
+    def cmd_restore(self, target, ids):
+        """
+        Restores items from trash of a volume.
+
+        :param target: Hash of any item of the volume
+        :param ids: List of IDs of items in trash
+        """
+        vol = self._volume_from_hash(target)
+        return dict(added=vol.restore(ids))
+
+    def cmd_upload(self, target, upload, chunk=None, cid=None, range_=None,
+            upload_path=None):
         """
         Uploads one or more files.
 
@@ -384,27 +494,84 @@ class Finder:
         E.g. if you upload files in Pyramid, those are of type ``cgi.FieldStorage``.
         ``file`` is a file-like object.
 
-        If you upload several files, the process terminates at the first error.
-        :attr:`upload_errors` then contains a list of the occurred exceptions.
+        Several files are saved concurrently, see
+        :meth:`~pym_elfinder.volume.volumedriver.VolumeDriver.upload_many()`.
+        A failing file does not abort the others. :attr:`upload_errors` then
+        contains a list of the occurred exceptions, and ``errorData`` maps
+        the names of the failed files to their errors. If some files were
+        added, the failures are reported as ``warning``, else as ``error``.
+
+        Large files may be uploaded in chunks (elFinder 2.1 protocol). Then
+        ``upload`` contains one chunk, ``chunk`` is its name, ``cid`` the
+        upload ID and ``range_`` its byte range (request parameter
+        ``range``). After the last chunk, the result tells ``_chunkmerged``
+        and ``_name``, and the client sends them back as ``chunk`` and
+        ``upload`` to finish the upload. See
+        :meth:`~pym_elfinder.volume.volumedriver.VolumeDriver.upload_chunk()`.
 
         :param target: Hash of destination directory.
         :param upload: List of file objects
+        :param chunk: Name of chunk, or key of merged upload
+        :param cid: Upload ID of chunked upload
+        :param range_: Byte range of chunk
+        :param upload_path: List of hashes of destination directories, one
+                            per file, e.g. as created by command ``mkdir``
+                            with ``dirs`` for a folder upload
         """
         self.upload_errors = []
         result = dict(added=[])
         volume = self._volume_from_hash(target)
-        
-        for fo in upload:
-            try:
-                added = volume.upload(fo, target)
-                result['added'].append(added)
-            except exc.FinderError as e:
+
+        if chunk:
+            return self._upload_chunk(volume, target, upload, chunk, cid,
+                range_)
+
+        added, errors = volume.upload_many(upload, target, upload_path)
+        result['added'] = added
+        if errors:
+            messages = []
+            result['errorData'] = {}
+            for filename, e in errors:
                 self.upload_errors.append(e)
-                result['error'] = (e.args[0], fo.filename)
-                result['errorData'] = {fo.filename : str(e.args)}
-                break
+                messages += [ exc.ERROR_UPLOAD_FILE, filename, e.args[0] ]
+                result['errorData'][filename] = str(e.args)
+            if added:
+                result['warning'] = messages
+            else:
+                result['error'] = (errors[0][1].args[0], errors[0][0])
         return result
 
+    def _upload_chunk(self, volume, target, upload, chunk, cid, range_):
+        """
+        Handles a request of a chunked upload, see :meth:`cmd_upload()`.
+        """
+        if not upload:
+            raise exc.FinderError(exc.ERROR_UPLOAD_NO_FILES)
+        fo = upload[0]
+        try:
+            if uploads.parse_chunk_name(chunk):
+                return volume.upload_chunk(fo, target, chunk, cid, range_)
+            # Finish upload; client sends the file name only
+            name = fo if isinstance(fo, str) else fo.filename
+            return dict(added=[ volume.upload_chunked(chunk, target, name) ])
+        except exc.FinderError as e:
+            self.upload_errors.append(e)
+            raise
+
+    def cmd_chunkstatus(self, target, chunk, cid):
+        """
+        Returns status of a chunked upload, so that the client can resume it.
+
+        :param target: Hash of destination directory
+        :param chunk: Name of any chunk of the upload
+        :param cid: Upload ID
+        :returns: Dict with keys ``received`` (list of indexes of chunks that
+                  arrived), ``last`` (index of last chunk) and ``size`` (size
+                  of complete file)
+        """
+        volume = self._volume_from_hash(target)
+        return volume.upload_status(target, chunk, cid)
+
     def cmd_rename(self, target, name):
         """
         Renames an item.
@@ -438,6 +605,22 @@ class Finder:
 
         ``headers`` contain the HTTP headers initialized to transport the file.
 
+        If Finder's ``http_range`` attribute is set to the value of the
+        request's ``Range`` header, ``file`` is bounded to the requested byte
+        range, and key ``status`` tells the HTTP status 206 Partial Content.
+        Several ranges are sent as ``multipart/byteranges``. An unsatisfiable
+        range raises a FinderError with status 416.
+
+        Headers ``ETag`` and ``Last-Modified`` are always set. If Finder's
+        ``if_none_match`` or ``if_modified_since`` attributes tell that the
+        client's copy is still valid, the file is not opened at all; the
+        result then has no key ``file``, and ``status`` is 304 Not Modified.
+
+        If the volume offloads downloads to the web server, ``file`` is None
+        and ``headers`` contain the internal-redirect header (e.g.
+        ``X-Accel-Redirect``) instead of ``Content-Length``. Caller must send
+        an empty body then.
+
         Make sure, caller initializes Finder's ``user_agent`` attribute. Otherwise, the filename
         may not be set correctly.
 
@@ -449,7 +632,8 @@ class Finder:
         :param target: Hash of file to download
         :param download: Determines content-disposition: True=attachment,
                          False=inline
-        :returns: Dict with keys ``file``, ``stat`` and ``headers``.
+        :returns: Dict with keys ``file``, ``stat`` and ``headers``, and
+                  optionally ``status``.
         """
         # Catch all exceptions so that we can setup the appropriate HTTP
         # headers. We do not return an AJAX response, but some data to allow
@@ -458,7 +642,8 @@ class Finder:
             vol = self._volume_from_hash(target)
             # Any checks and access control are done by the volume (like for all
             # other commands), not here by the finder.
-            result = vol.file(target)
+            validators = {}
+            result = vol.file(target, self._precondition(validators))
         except exc.FinderError as e:
             raise # Let FinderErrors bubble up
         except Exception as e:
@@ -466,6 +651,8 @@ class Finder:
             raise exc.FinderError(exc.ERROR_UNKNOWN, e,
                 status=exc.HTTP_INTERNAL_SERVER_ERROR)
         else:
+            if not 'file' in result:
+                return self._not_modified(validators)
             stat = result['stat']
             if download:
                 disp = 'attachment'
@@ -478,25 +665,7 @@ class Finder:
                     disp = 'attachment'
                 mime = stat['mime']
 
-            quoted_name = urllib.parse.quote(stat['name'])
-            # ASCII only
-            if '%' in quoted_name:
-                filename = 'filename="%s"' % stat['name']
-            # Setup for specific UAs
-            elif self.user_agent:
-                # IE < 9 does not support RFC 6266 (RFC 2231/RFC 5987)
-                if re.search('MSIE [4-8]', self.user_agent):
-                    filename = 'filename="%s"' % quoted_name
-                # Safari
-                elif not 'Chrome' in self.user_agent and 'Safari' in self.user_agent:
-                    filename = 'filename="%s"' % stat['name'].replace('"','')
-                # RFC 6266 (RFC 2231/RFC 5987)
-                else:
-                    filename = "filename*=UTF-8''%s" % quoted_name
-            # Default to be standards compliant!
-            # RFC 6266 (RFC 2231/RFC 5987)
-            else:
-                filename = "filename*=UTF-8''%s" % quoted_name
+            filename = self._disposition_filename(stat['name'])
 
             if not 'headers' in result:
                 result['headers'] = dict()
@@ -505,15 +674,131 @@ class Finder:
             result['headers']['Content-Disposition'] = "{0};{1}".format(disp, filename)
             result['headers']['Content-Location'] = stat['name']
             result['headers']['Content-Transfer-Encoding'] = 'binary'
+            result['headers'].update(self._validator_headers(validators))
+            if 'offload' in result:
+                # Web server sends the file, and handles ranges itself.
+                return result
             result['headers']['Content-Length'] = str(stat['size'])
+            result['headers']['Accept-Ranges'] = 'bytes'
+            if self.http_range:
+                self._apply_range(result, mime)
             return result
 
+    def _apply_range(self, result, mime):
+        """
+        Restricts result of command ``file`` to the requested byte ranges.
+
+        :param result: Result of command ``file``, is modified in-place.
+        :param mime: Mime-type the file is sent with
+        """
+        size = result['stat']['size']
+        ranges = httputil.parse_range(self.http_range, size)
+        if ranges is None:
+            # Send complete file
+            return
+        headers = result['headers']
+        if not ranges:
+            result['file'].close()
+            raise exc.FinderError(exc.PYM_ERROR_RANGE_NOT_SATISFIABLE,
+                status=exc.HTTP_RANGE_NOT_SATISFIABLE,
+                headers={'Content-Range' : 'bytes */{0}'.format(size)})
+        block_size = getattr(result['file'], 'block_size', streams.BLOCK_SIZE)
+        if len(ranges) == 1:
+            first, last = ranges[0]
+            result['file'] = streams.RangeFile(result['file'], first,
+                last - first + 1, block_size)
+            headers['Content-Range'] = httputil.content_range(first, last,
+                size)
+        else:
+            boundary = uuid.uuid4().hex
+            result['file'] = streams.MultiRangeFile(result['file'], ranges,
+                size, mime, boundary, block_size)
+            headers['Content-Type'] = \
+                'multipart/byteranges; boundary={0}'.format(boundary)
+        headers['Content-Length'] = str(result['file'].length)
+        result['status'] = exc.HTTP_PARTIAL_CONTENT
+
+    def cmd_url(self, target, options=None):
+        """
+        Returns a time-limited direct URL of a file.
+
+        See :meth:`~pym_elfinder.volume.volumedriver.VolumeDriver.signed_url()`.
+        ``options`` may be a dict with key ``ttl``, the lifetime of the URL
+        in seconds.
+
+        :returns: Dict(url=str, expires=int)
+        """
+        ttl = None
+        if isinstance(options, dict) and options.get('ttl') not in (None, ''):
+            try:
+                ttl = int(options['ttl'])
+            except ValueError:
+                raise exc.FinderError(exc.ERROR_INV_PARAMS, 'url')
+        vol = self._volume_from_hash(target)
+        return vol.signed_url(target, ttl)
+
+    def cmd_zipdl(self, targets, name=None, compress=True):
+        """
+        Prepares headers and a zip stream to download several items at once.
+
+        The archive is not created on a volume. Instead, key ``file`` is an
+        :class:`~pym_elfinder.archivers.ZipStream` that generates the archive
+        while it is iterated, e.g. for Pyramid::
+
+            response.app_iter = finder.response['file']
+
+        Since the size of the archive is not known in advance, header
+        ``Content-Length`` is not set.
+
+        :param targets: List of hashes of files and directories
+        :param name: File name of archive; default is derived from the first
+                     target
+        :param compress: True to deflate members, False to store them
+        :returns: Dict with keys ``file`` and ``headers``
+        """
+        if not targets:
+            raise exc.FinderError(exc.ERROR_INV_PARAMS, 'zipdl')
+        if isinstance(compress, str):
+            compress = compress.lower() not in ('0', 'false', 'no', '')
+        entries = []
+        for target in targets:
+            vol = self._volume_from_hash(target)
+            entries.append(vol.zip_entries([ target ]))
+        if not name:
+            stat = self._volume_from_hash(targets[0]).stat_file(targets[0])
+            name = stat['name'] if len(targets) == 1 else 'download'
+            name += '.zip'
+
+        def chain():
+            for it in entries:
+                yield from it
+
+        stream = archivers.ZipStream(chain(),
+            archivers.ZIP_DEFLATED if compress else archivers.ZIP_STORED)
+        headers = {
+            'Content-Type' : 'application/zip',
+            'Content-Disposition' : 'attachment;{0}'.format(
+                self._disposition_filename(name)),
+            'Content-Transfer-Encoding' : 'binary'
+        }
+        return dict(file=stream, headers=headers)
+
     def cmd_get(self, target):
         """
         Gets content of a file.
+
+        Headers ``ETag`` and ``Last-Modified`` are set. If the client's copy
+        is still valid (see :attr:`if_none_match`), the file is not read,
+        the result has no key ``content``, and ``status`` is 304 Not
+        Modified.
         """
         vol = self._volume_from_hash(target)
-        return dict(content=vol.get_content(target))
+        validators = {}
+        content = vol.get_content(target, self._precondition(validators))
+        if content is None:
+            return self._not_modified(validators)
+        return dict(content=content,
+            headers=self._validator_headers(validators))
 
     def cmd_put(self, target, content, mimes=None):
         """
@@ -522,11 +807,130 @@ class Finder:
         vol = self._volume_from_hash(target)
         return dict(changed=[ vol.put_content(target, content, mimes) ] )
 
+    def cmd_info(self, targets, options=None):
+        """
+        Returns info about several items.
+
+        Targets are grouped by volume, and each volume resolves its targets
+        in one go. Items that do not exist or are hidden are left out.
+
+        ``options`` may select the fields to return, as list of field names,
+        as comma-separated string or as dict with key ``fields``. Selecting
+        only cheap fields like ``name``, ``size`` and ``ts`` avoids sniffing
+        mime-types and listing directories. See
+        :meth:`~pym_elfinder.volume.volumedriver.VolumeDriver.stat_fields()`.
+        If no fields are selected, complete stats are returned.
+
+        :param targets: List of hashes of items
+        :param options: Field selection
+        :returns: Dict(files=list(...))
+        """
+        if isinstance(options, dict):
+            fields = options.get('fields')
+        else:
+            fields = options
+        if isinstance(fields, str):
+            fields = [ f.strip() for f in fields.split(',') if f.strip() ]
+        if not fields:
+            fields = None
+        # Group targets by volume, keeping order of first appearance
+        by_volume = {}
+        for target in targets:
+            vol = self._volume_from_hash(target)
+            by_volume.setdefault(vol, []).append(target)
+        stats = {}
+        for vol, hashes in by_volume.items():
+            for stat in vol.info(hashes, fields):
+                stats[stat['hash']] = stat
+        files = [ stats[t] for t in dict.fromkeys(targets) if t in stats ]
+        return dict(files=files)
+
+    def cmd_lsarchive(self, target, offset=0, limit=None):
+        """
+        Lists members of an archive without extracting it.
+
+        Result is paginated: ``offset`` members are skipped and at most
+        ``limit`` members are returned. Key ``more`` tells whether the
+        archive has more members after the returned ones.
+
+        :param target: Hash of archive file
+        :param offset: Number of members to skip
+        :param limit: Maximum number of members to return
+        :returns: Dict(list=list(...), offset=int, more=bool)
+        """
+        try:
+            offset = max(int(offset), 0)
+            limit = int(limit) if limit not in (None, '') else None
+        except ValueError:
+            raise exc.FinderError(exc.ERROR_INV_PARAMS, 'lsarchive')
+        vol = self._volume_from_hash(target)
+        members, more = vol.ls_archive(target, offset, limit)
+        return dict(list=members, offset=offset, more=more)
+
 
     # =======================================================================
 
     # ===[ HELPERS ]=======
 
+    def _disposition_filename(self, name):
+        """
+        Returns filename parameter of header ``Content-Disposition``.
+
+        Format depends on the user agent, see :attr:`user_agent`.
+        """
+        quoted_name = urllib.parse.quote(name)
+        # ASCII only
+        if '%' in quoted_name:
+            filename = 'filename="%s"' % name
+        # Setup for specific UAs
+        elif self.user_agent:
+            # IE < 9 does not support RFC 6266 (RFC 2231/RFC 5987)
+            if re.search('MSIE [4-8]', self.user_agent):
+                filename = 'filename="%s"' % quoted_name
+            # Safari
+            elif not 'Chrome' in self.user_agent and 'Safari' in self.user_agent:
+                filename = 'filename="%s"' % name.replace('"','')
+            # RFC 6266 (RFC 2231/RFC 5987)
+            else:
+                filename = "filename*=UTF-8''%s" % quoted_name
+        # Default to be standards compliant!
+        # RFC 6266 (RFC 2231/RFC 5987)
+        else:
+            filename = "filename*=UTF-8''%s" % quoted_name
+        return filename
+
+    def _precondition(self, validators):
+        """
+        Returns callable that evaluates the conditional request headers.
+
+        The callable is to be passed as ``precondition`` to the volume. It
+        stores ETag and modification time of the file in dict
+        ``validators``, and returns False if the client's copy is still
+        valid.
+        """
+        def precondition(stat, etag):
+            validators['etag'] = etag
+            validators['ts'] = stat['ts']
+            return not httputil.not_modified(etag, stat['ts'],
+                self.if_none_match, self.if_modified_since)
+        return precondition
+
+    def _validator_headers(self, validators):
+        """
+        Returns HTTP headers ``ETag`` and ``Last-Modified``.
+        """
+        return {
+            'ETag' : validators['etag'],
+            'Last-Modified' : httputil.http_date(validators['ts'])
+        }
+
+    def _not_modified(self, validators):
+        """
+        Returns result for status 304 Not Modified.
+        """
+        return dict(status=exc.HTTP_NOT_MODIFIED,
+            headers=self._validator_headers(validators))
+
     def _volume_from_hash(self, hash_):
         """
         Returns volume instance from given hash.
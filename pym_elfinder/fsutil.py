@@ -0,0 +1,449 @@
+# -*- coding: utf-8 -*-
+
+"""
+Kernel-side copies of files on the local filesystem.
+
+A file is copied by the cheapest means the platform offers:
+
+1. As a reflink with ioctl ``FICLONE``, e.g. on XFS or btrfs. The copy shares
+   the extents of the source until one of them is changed, so copying takes
+   no time regardless of size.
+2. With ``copy_file_range()``, which lets the kernel, or even the storage,
+   copy the data without passing it through user space.
+3. With ``sendfile()``, which at least avoids the copy into user space.
+4. By reading and writing blocks.
+
+Only the data segments of sparse files are copied, as told by ``SEEK_DATA``
+and ``SEEK_HOLE``, so holes stay holes.
+
+Directory trees are copied by a pool of threads, see :func:`copy_tree()`,
+and removed in the background, see :class:`Purger`.
+"""
+
+import os
+import errno
+import queue
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+FICLONE = 0x40049409
+"""
+Request code of ioctl ``FICLONE`` on Linux.
+"""
+
+BLOCK_SIZE = 1024 * 1024
+"""
+Size of blocks if data is copied through Python.
+"""
+
+COPY_SIZE = 64 * 1024 * 1024
+"""
+Maximum number of bytes copied by one system call.
+"""
+
+_NOT_SUPPORTED = (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+    errno.ENOTTY, errno.EBADF, errno.EPERM)
+"""
+Errors that mean a method does not work for these files, so that the next
+one has to be tried.
+"""
+
+
+def clone(src_fd, dst_fd):
+    """
+    Makes ``dst_fd`` a reflink of ``src_fd``.
+
+    :returns: True on success, False if reflinks are not supported here
+    """
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+    except OSError as e:
+        if e.errno in _NOT_SUPPORTED:
+            return False
+        raise
+    return True
+
+
+def data_segments(fd, size):
+    """
+    Yields the data segments of a file as 2-tuples (offset, length).
+
+    If the platform cannot tell holes, the whole file is one segment.
+    """
+    seek_data = getattr(os, 'SEEK_DATA', None)
+    seek_hole = getattr(os, 'SEEK_HOLE', None)
+    if seek_data is None or seek_hole is None:
+        if size:
+            yield (0, size)
+        return
+    pos = 0
+    while pos < size:
+        try:
+            start = os.lseek(fd, pos, seek_data)
+        except OSError as e:
+            if e.errno == errno.ENXIO:
+                # Only a hole is left
+                return
+            if e.errno in _NOT_SUPPORTED and pos == 0:
+                yield (0, size)
+                return
+            raise
+        end = os.lseek(fd, start, seek_hole)
+        yield (start, min(end, size) - start)
+        pos = end
+
+
+def _copy_segment(src_fd, dst_fd, offset, length, method):
+    """
+    Copies a segment at the same offset in both files.
+
+    :param method: List with the name of the method to try first; is
+                   changed if a method turns out not to work.
+    """
+    end = offset + length
+    pos = offset
+    while pos < end:
+        want = min(COPY_SIZE, end - pos)
+        if method[0] == 'copy_file_range':
+            try:
+                n = os.copy_file_range(src_fd, dst_fd, want, pos, pos)
+            except OSError as e:
+                if e.errno not in _NOT_SUPPORTED or pos > offset:
+                    raise
+                method[0] = 'sendfile'
+                continue
+        elif method[0] == 'sendfile':
+            try:
+                os.lseek(dst_fd, pos, os.SEEK_SET)
+                n = os.sendfile(dst_fd, src_fd, pos, want)
+            except OSError as e:
+                if e.errno not in _NOT_SUPPORTED or pos > offset:
+                    raise
+                method[0] = 'read'
+                continue
+        else:
+            data = os.pread(src_fd, min(want, BLOCK_SIZE), pos)
+            n = 0
+            while n < len(data):
+                n += os.pwrite(dst_fd, data[n:], pos + n)
+        if not n:
+            # Source shrank while copying
+            break
+        pos += n
+
+
+def _first_method():
+    if hasattr(os, 'copy_file_range'):
+        return 'copy_file_range'
+    if hasattr(os, 'sendfile'):
+        return 'sendfile'
+    return 'read'
+
+
+def copy_fd(src_fd, dst_fd, size=None):
+    """
+    Copies the content of ``src_fd`` into the empty file ``dst_fd``.
+
+    :param src_fd: OS-level file descriptor of source, opened for reading
+    :param dst_fd: OS-level file descriptor of destination, opened for
+                   writing
+    :param size: Size of source; is determined if None
+    :returns: Name of the method that was used, 'clone',
+              'copy_file_range', 'sendfile' or 'read'
+    """
+    if size is None:
+        size = os.fstat(src_fd).st_size
+    if clone(src_fd, dst_fd):
+        return 'clone'
+    method = [ _first_method() ]
+    for offset, length in data_segments(src_fd, size):
+        _copy_segment(src_fd, dst_fd, offset, length, method)
+    # Restore a hole at the end
+    os.ftruncate(dst_fd, size)
+    return method[0]
+
+
+def copy_file(src, dst, follow_symlinks=True):
+    """
+    Copies a file with its mode bits, like :func:`shutil.copy()`, but
+    kernel-side, see :func:`copy_fd()`.
+
+    Is a drop-in for ``copy_function`` of :func:`shutil.copytree()`.
+
+    :param src: Path of source file
+    :param dst: Path of destination file or directory
+    :returns: ``dst``
+    """
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    if not follow_symlinks and os.path.islink(src):
+        os.symlink(os.readlink(src), dst)
+        return dst
+    src_fd = os.open(src, os.O_RDONLY)
+    try:
+        st = os.fstat(src_fd)
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+            st.st_mode & 0o777)
+        try:
+            copy_fd(src_fd, dst_fd, st.st_size)
+            os.fchmod(dst_fd, st.st_mode & 0o7777)
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+    return dst
+
+
+def _scan_tree(src, dst, follow_symlinks=False):
+    """
+    Walks a directory tree with :func:`os.scandir()`.
+
+    :param follow_symlinks: If True, symlinks are resolved and listed as the
+                            dirs or files they point to. A symlink to one of
+                            its own ancestors raises OSError ``ELOOP``.
+    :returns: 3-tuple of lists:
+              [0] 3-tuples (source dir, destination dir, stat of source dir),
+                  parents before children,
+              [1] 3-tuples (source file, destination file, size),
+              [2] 2-tuples (source symlink, destination); empty if
+                  ``follow_symlinks`` is True
+    """
+    dirs = [ (src, dst, os.stat(src)) ]
+    files = []
+    links = []
+    # Chains of (device, inode) from the top to each dir, to detect loops
+    ancestors = { src : ((dirs[0][2].st_dev, dirs[0][2].st_ino),) }
+    i = 0
+    while i < len(dirs):
+        s, d, _ = dirs[i]
+        i += 1
+        with os.scandir(s) as it:
+            for e in it:
+                target = os.path.join(d, e.name)
+                if e.is_symlink() and not follow_symlinks:
+                    links.append((e.path, target))
+                elif e.is_dir():
+                    st = e.stat()
+                    if follow_symlinks:
+                        key = (st.st_dev, st.st_ino)
+                        if key in ancestors[s]:
+                            raise OSError(errno.ELOOP,
+                                os.strerror(errno.ELOOP), e.path)
+                        ancestors[e.path] = ancestors[s] + (key,)
+                    dirs.append((e.path, target, st))
+                else:
+                    files.append((e.path, target, e.stat().st_size))
+    return dirs, files, links
+
+
+def copy_tree(src, dst, threads=4, symlinks=False):
+    """
+    Copies a directory tree.
+
+    The tree is walked with :func:`os.scandir()`, and all directories are
+    created first. Then the files are copied with :func:`copy_file()` by a
+    pool of ``threads`` threads, which pays off most for many small files,
+    or across devices. At last, the modes of the directories are set.
+
+    Like :func:`shutil.copytree()`, symlinks are followed by default, and
+    the dirs and files they point to are copied. So a relative link cannot
+    point outside of the copy.
+
+    :param src: Path of source directory
+    :param dst: Path of destination directory; must not exist
+    :param threads: Number of threads copying files
+    :param symlinks: If True, symlinks are copied as symlinks
+    :returns: Dict with the number of copied ``files`` and ``dirs``, and
+              the number of ``bytes`` in the files
+    :raises: OSError of the first copy that failed; the copied part of the
+             tree is removed
+    """
+    dirs, files, links = _scan_tree(src, dst, follow_symlinks=not symlinks)
+    # Fails if dst exists, which then must not be removed
+    os.mkdir(dst, 0o700)
+    try:
+        for _, d, _ in dirs[1:]:
+            os.mkdir(d, 0o700)
+        for s, d in links:
+            os.symlink(os.readlink(s), d)
+        if threads > 1 and len(files) > 1:
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                futures = [ pool.submit(copy_file, s, d)
+                    for s, d, _ in files ]
+                try:
+                    for f in futures:
+                        f.result()
+                except BaseException:
+                    for f in futures:
+                        f.cancel()
+                    raise
+        else:
+            for s, d, _ in files:
+                copy_file(s, d)
+        for _, d, st in reversed(dirs):
+            os.chmod(d, st.st_mode & 0o7777)
+    except BaseException:
+        shutil.rmtree(dst, ignore_errors=True)
+        raise
+    return dict(files=len(files), dirs=len(dirs),
+        bytes=sum(size for _, _, size in files))
+
+
+def move(src, dst, threads=4):
+    """
+    Moves a file or directory tree.
+
+    It is renamed if possible. Across devices, it is copied with
+    :func:`copy_file()` or :func:`copy_tree()`, and then removed. Like a
+    rename, that keeps symlinks as symlinks.
+
+    :param src: Path of source
+    :param dst: Path of destination; must not exist
+    :param threads: Number of threads copying files of a tree
+    :returns: Dict with the number of copied ``files`` and ``dirs``, and
+              the number of ``bytes`` in the files; all 0 if renamed
+    :raises: OSError; if copying failed, the partial copy is removed
+    """
+    try:
+        os.rename(src, dst)
+        return dict(files=0, dirs=0, bytes=0)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    is_dir = os.path.isdir(src) and not os.path.islink(src)
+    try:
+        if is_dir:
+            stats = copy_tree(src, dst, threads, symlinks=True)
+        elif os.path.islink(src):
+            os.symlink(os.readlink(src), dst)
+            stats = dict(files=0, dirs=0, bytes=0)
+        else:
+            copy_file(src, dst)
+            stats = dict(files=1, dirs=0, bytes=os.path.getsize(dst))
+    except BaseException:
+        if is_dir:
+            shutil.rmtree(dst, ignore_errors=True)
+        else:
+            try:
+                os.remove(dst)
+            except OSError:
+                pass
+        raise
+    if is_dir:
+        shutil.rmtree(src)
+    else:
+        os.remove(src)
+    return stats
+
+
+def remove_tree(path, threads=4):
+    """
+    Removes a directory tree.
+
+    Files are unlinked by a pool of ``threads`` threads, then the
+    directories are removed, deepest first. Items that vanished meanwhile
+    are ignored.
+
+    :returns: Number of removed files and directories
+    """
+    dirs, files, links = _scan_tree(path, path)
+    victims = [ s for s, _, _ in files ] + [ s for s, _ in links ]
+
+    def unlink(p):
+        try:
+            os.unlink(p)
+        except FileNotFoundError:
+            pass
+
+    if threads > 1 and len(victims) > 1:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(unlink, victims))
+    else:
+        for p in victims:
+            unlink(p)
+    for s, _, _ in reversed(dirs):
+        try:
+            os.rmdir(s)
+        except FileNotFoundError:
+            pass
+    return len(victims) + len(dirs)
+
+
+class Purger(object):
+    """
+    Removes directory trees in a background thread.
+
+    A tree to be removed is first renamed into a purge area, which is
+    instantaneous, and then handed to :meth:`submit()`. The caller need not
+    wait until its content is deleted.
+
+    The thread is a daemon. Trees left over when the process exits are
+    found again in the purge area, see :meth:`submit_all()`.
+    """
+
+    def __init__(self, threads=4):
+        """
+        :param threads: Number of threads unlinking the files of one tree
+        """
+        self.threads = threads
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, path):
+        """
+        Schedules a tree for removal, unless it is already scheduled.
+        """
+        with self._lock:
+            if path in self._pending:
+                return
+            self._pending.add(path)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run,
+                    name='purger', daemon=True)
+                self._thread.start()
+        self._queue.put(path)
+
+    def submit_all(self, purge_dir):
+        """
+        Schedules all trees in a purge area for removal.
+        """
+        try:
+            with os.scandir(purge_dir) as it:
+                paths = [ e.path for e in it ]
+        except OSError:
+            return
+        for p in paths:
+            self.submit(p)
+
+    def _run(self):
+        while True:
+            path = self._queue.get()
+            try:
+                if os.path.isdir(path) and not os.path.islink(path):
+                    remove_tree(path, self.threads)
+                else:
+                    os.unlink(path)
+            except OSError:
+                # Left for the next submit_all()
+                pass
+            finally:
+                with self._lock:
+                    self._pending.discard(path)
+                self._queue.task_done()
+
+    def wait(self):
+        """
+        Blocks until all scheduled trees are removed.
+        """
+        self._queue.join()
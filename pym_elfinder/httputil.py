@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+"""
+HTTP helpers.
+
+Finder itself does not speak HTTP, but it prepares status and headers for the
+caller, who transports the result to the client. These functions help with
+the details.
+"""
+
+import re
+from email.utils import formatdate, parsedate_to_datetime
+
+
+MAX_RANGES = 20
+"""
+Maximum number of ranges accepted in one ``Range`` header.
+
+A request for more ranges is served as if it had no ``Range`` header.
+"""
+
+RE_RANGE_SPEC = re.compile(r'^\s*(\d*)\s*-\s*(\d*)\s*$')
+
+
+def parse_range(header, size):
+    """
+    Parses value of HTTP header ``Range`` (RFC 7233).
+
+    Only byte ranges are supported. Suffix ranges (``-500``) and open ranges
+    (``9500-``) are resolved against ``size``.
+
+    :param header: Value of ``Range`` header
+    :param size: Size of the entity in bytes
+    :returns: List of 2-tuples (first byte, last byte), inclusive. Empty list
+              if no range is satisfiable. None if header is missing, invalid,
+              or not for unit "bytes", in which case the whole entity must
+              be sent.
+    """
+    if not header:
+        return None
+    try:
+        unit, specs = header.split('=', 1)
+    except ValueError:
+        return None
+    if unit.strip().lower() != 'bytes':
+        return None
+    specs = specs.split(',')
+    if len(specs) > MAX_RANGES:
+        return None
+    ranges = []
+    for spec in specs:
+        m = RE_RANGE_SPEC.match(spec)
+        if not m:
+            return None
+        first, last = m.groups()
+        if not first and not last:
+            return None
+        if not first:
+            # Suffix range: the last N bytes
+            n = int(last)
+            if n == 0 or size == 0:
+                continue
+            first = max(size - n, 0)
+            last = size - 1
+        else:
+            first = int(first)
+            last = int(last) if last else size - 1
+            if last < first and m.group(2):
+                return None
+            if first >= size:
+                continue
+            last = min(last, size - 1)
+        ranges.append((first, last))
+    return ranges
+
+
+def content_range(first, last, size):
+    """
+    Returns value of header ``Content-Range`` for given range.
+    """
+    return 'bytes {0}-{1}/{2}'.format(first, last, size)
+
+
+def http_date(ts):
+    """
+    Returns timestamp formatted as HTTP date, e.g. for ``Last-Modified``.
+    """
+    return formatdate(ts, usegmt=True)
+
+
+def parse_http_date(value):
+    """
+    Parses an HTTP date, e.g. from ``If-Modified-Since``.
+
+    :returns: Unix timestamp, or None if value is invalid.
+    """
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def not_modified(etag, ts, if_none_match=None, if_modified_since=None):
+    """
+    Tells whether the client's copy of an entity is still valid.
+
+    Evaluates the conditional request headers as RFC 7232 demands for GET
+    requests: ``If-None-Match`` takes precedence, and is compared weakly;
+    ``If-Modified-Since`` is only evaluated if ``If-None-Match`` is absent.
+
+    :param etag: Current ETag of entity
+    :param ts: Current modification time of entity
+    :param if_none_match: Value of header ``If-None-Match``
+    :param if_modified_since: Value of header ``If-Modified-Since``
+    :returns: True if response may be 304 Not Modified
+    """
+    if if_none_match:
+        if if_none_match.strip() == '*':
+            return True
+        tags = [ t.strip() for t in if_none_match.split(',') ]
+        return _weak(etag) in [ _weak(t) for t in tags ]
+    if if_modified_since:
+        since = parse_http_date(if_modified_since)
+        if since is not None:
+            return int(ts) <= since
+    return False
+
+
+def _weak(etag):
+    """
+    Returns ETag without weakness indicator.
+    """
+    return etag[2:] if etag.startswith('W/') else etag
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+
+"""
+Streaming parser for ``multipart/form-data``.
+
+Web frameworks usually spool uploaded files to temporary files before the
+application sees them, so each byte is written to disk twice. With this
+parser, the request body is read while the parts are consumed: the content
+of a file part is read straight from the request stream, and can be handed
+to command ``upload`` to be written into the volume only once.
+
+Example for a WSGI app::
+
+    fields, files = multipart.parse_upload(environ['wsgi.input'],
+        environ['CONTENT_TYPE'], environ.get('CONTENT_LENGTH'))
+    finder.run('upload', dict(target=fields['target'], upload=files))
+
+The parts are read strictly in order. ``files`` is a generator, and reading
+a part after the next one was requested is not possible.
+"""
+
+from email.message import Message
+
+from . import exceptions as exc
+
+
+BLOCK_SIZE = 64 * 1024
+"""
+Size of blocks read from the request stream.
+"""
+
+MAX_HEADER_SIZE = 16 * 1024
+"""
+Maximum size of the headers of one part.
+"""
+
+MAX_FIELD_SIZE = 1024 * 1024
+"""
+Maximum size of the value of a form field that is not a file.
+"""
+
+
+def boundary_from_content_type(content_type):
+    """
+    Returns the boundary from value of header ``Content-Type``.
+
+    :raises: FinderError if it is not ``multipart/form-data`` or lacks a
+             boundary
+    """
+    m = Message()
+    m['content-type'] = content_type or ''
+    boundary = m.get_param('boundary')
+    if m.get_content_type() != 'multipart/form-data' or not boundary:
+        raise exc.FinderError(exc.PYM_ERROR_MULTIPART, 'Content-Type')
+    return boundary
+
+
+class Part(object):
+    """
+    A part of a multipart body.
+
+    Content is read lazily from the request stream via :meth:`read`.
+    Attribute ``file`` is the part itself, so that a file part can be
+    passed to command ``upload`` like a ``cgi.FieldStorage``.
+    """
+
+    def __init__(self, parser, headers):
+        self._parser = parser
+        self.headers = headers
+        """
+        Headers of part, as :class:`email.message.Message`.
+        """
+        self.name = headers.get_param('name', header='content-disposition')
+        """
+        Name of form field.
+        """
+        self.filename = headers.get_filename()
+        """
+        Name of uploaded file; None if part is not a file.
+        """
+        self.content_type = headers.get_content_type()
+        self.file = self
+        self._done = False
+
+    def read(self, size=-1):
+        """
+        Reads content of part.
+
+        :param size: Read at most this many bytes; -1 for all
+        """
+        if self._done:
+            return b''
+        chunks = []
+        n = 0
+        while size < 0 or n < size:
+            data = self._parser._read_body(BLOCK_SIZE if size < 0
+                else size - n)
+            if not data:
+                self._done = True
+                break
+            chunks.append(data)
+            n += len(data)
+        return b''.join(chunks)
+
+    def value(self, max_size=MAX_FIELD_SIZE):
+        """
+        Returns content of a form field as string.
+
+        :raises: FinderError if content exceeds ``max_size``
+        """
+        data = self.read(max_size + 1)
+        if len(data) > max_size:
+            raise exc.FinderError(exc.PYM_ERROR_MULTIPART, self.name)
+        charset = self.headers.get_content_charset() or 'utf-8'
+        return data.decode(charset, 'replace')
+
+    def drain(self):
+        """
+        Skips the rest of the content.
+        """
+        while not self._done:
+            if not self._parser._read_body(BLOCK_SIZE):
+                self._done = True
+
+    def close(self):
+        """
+        Does nothing; unread content is skipped when the next part is read.
+        """
+        pass
+
+
+class MultipartParser(object):
+    """
+    Reads the parts of a ``multipart/form-data`` body from a stream.
+
+    Iterating yields :class:`Part` objects. Before the next part is
+    yielded, the rest of the current one is skipped.
+    """
+
+    def __init__(self, stream, boundary, content_length=None,
+            block_size=BLOCK_SIZE, max_header_size=MAX_HEADER_SIZE):
+        """
+        :param stream: Request stream, e.g. ``wsgi.input``
+        :param boundary: Multipart boundary
+        :param content_length: Length of body; if given, no more than this
+                               is read from ``stream``
+        :param block_size: Size of blocks read from the stream
+        :param max_header_size: Maximum size of the headers of one part
+        """
+        if isinstance(boundary, str):
+            boundary = boundary.encode('latin-1')
+        self._stream = stream
+        self._remaining = (int(content_length)
+            if content_length not in (None, '') else None)
+        self._delim = b'\r\n--' + boundary
+        self._block_size = block_size
+        self._max_header_size = max_header_size
+        # Leading CRLF lets first boundary be found like all others
+        self._buf = bytearray(b'\r\n')
+        self._eof = False
+        self._in_body = False
+        self._part = None
+
+    def _fill(self):
+        """
+        Reads next block from stream into buffer.
+
+        :returns: False if stream is exhausted
+        """
+        if self._eof:
+            return False
+        n = self._block_size
+        if self._remaining is not None:
+            n = min(n, self._remaining)
+        data = self._stream.read(n) if n else b''
+        if not data:
+            self._eof = True
+            return False
+        if self._remaining is not None:
+            self._remaining -= len(data)
+        self._buf += data
+        return True
+
+    def _read_body(self, size):
+        """
+        Returns next bytes of content of current part, b'' at its end.
+        """
+        if not self._in_body:
+            return b''
+        delim = self._delim
+        while True:
+            i = self._buf.find(delim)
+            if i == 0:
+                self._in_body = False
+                return b''
+            if i > 0:
+                n = min(i, size)
+            else:
+                # Keep a possibly incomplete delimiter in the buffer
+                n = min(len(self._buf) - len(delim) + 1, size)
+            if n > 0:
+                data = bytes(self._buf[:n])
+                del self._buf[:n]
+                return data
+            if not self._fill():
+                raise exc.FinderError(exc.PYM_ERROR_MULTIPART, 'EOF')
+
+    def _next_part(self):
+        """
+        Skips to next delimiter, and reads headers of next part.
+
+        :returns: Part, or None after closing delimiter
+        """
+        if self._part is not None:
+            self._part.drain()
+            self._part = None
+        # Find delimiter; in the preamble, data before it is skipped
+        delim = self._delim
+        while True:
+            i = self._buf.find(delim)
+            if i >= 0:
+                del self._buf[:i + len(delim)]
+                break
+            del self._buf[:max(len(self._buf) - len(delim) + 1, 0)]
+            if not self._fill():
+                raise exc.FinderError(exc.PYM_ERROR_MULTIPART, 'EOF')
+        while len(self._buf) < 2 and self._fill():
+            pass
+        if self._buf[:2] == b'--':
+            return None
+        # Headers end with an empty line
+        while True:
+            i = self._buf.find(b'\r\n\r\n')
+            if i >= 0:
+                break
+            if len(self._buf) > self._max_header_size or not self._fill():
+                raise exc.FinderError(exc.PYM_ERROR_MULTIPART, 'headers')
+        if i > self._max_header_size:
+            raise exc.FinderError(exc.PYM_ERROR_MULTIPART, 'headers')
+        raw = bytes(self._buf[:i]).decode('utf-8', 'replace')
+        del self._buf[:i + 4]
+        headers = Message()
+        # First line is the rest of the delimiter line, e.g. padding
+        for line in raw.split('\r\n')[1:]:
+            if ':' not in line:
+                raise exc.FinderError(exc.PYM_ERROR_MULTIPART, 'headers')
+            name, value = line.split(':', 1)
+            headers[name.strip()] = value.strip()
+        # Content follows directly; the delimiter includes the CRLF
+        # preceding it, so an empty content is found at once.
+        self._in_body = True
+        self._part = Part(self, headers)
+        return self._part
+
+    def __iter__(self):
+        while True:
+            part = self._next_part()
+            if part is None:
+                return
+            yield part
+
+
+def parse_upload(stream, content_type, content_length=None,
+        max_field_size=MAX_FIELD_SIZE):
+    """
+    Parses the body of an upload request.
+
+    Form fields before the first file are read immediately; it is expected
+    that the client sends ``cmd``, ``target`` etc. before the files, as
+    elFinder does. File parts are yielded lazily, and fields between or
+    after them are added to ``fields`` while the files are consumed.
+
+    Values of fields whose name ends with ``[]`` are collected in lists,
+    with the brackets removed from the name.
+
+    :param stream: Request stream
+    :param content_type: Value of header ``Content-Type``
+    :param content_length: Value of header ``Content-Length``
+    :param max_field_size: Maximum size of the value of a form field
+    :returns: 2-tuple:
+              [0] Dict of form fields,
+              [1] Generator of file parts, see :class:`Part`
+    """
+    parser = MultipartParser(stream, boundary_from_content_type(content_type),
+        content_length)
+    parts = iter(parser)
+    fields = {}
+
+    def add_field(part):
+        value = part.value(max_field_size)
+        if part.name.endswith('[]'):
+            fields.setdefault(part.name[:-2], []).append(value)
+        else:
+            fields[part.name] = value
+
+    first = None
+    for part in parts:
+        if part.filename is not None:
+            first = part
+            break
+        add_field(part)
+
+    def files():
+        part = first
+        while part is not None:
+            if part.filename:
+                yield part
+            elif part.filename is None:
+                add_field(part)
+            # else: file input without a selected file
+            part = next(parts, None)
+
+    return (fields, files())
@@ -8,8 +8,15 @@ Contains several decorators to limit execution of commands.
 Contains file access policy.
 
 Contains name validation policy.
+
+Contains signing and validation of time-limited direct URLs.
 """
 
+import hashlib
+import hmac
+import time
+import urllib.parse
+
 ###   class EntryExit(object):
 ###       def __init__(self, func, *args, **kw):
 ###           self._func = func
@@ -56,3 +63,75 @@ Contains name validation policy.
 ###        print("After", self._func.__name__)
 ###        return res
 
+
+def url_signature(secret, path, expires):
+    """
+    Returns signature of a direct URL.
+
+    Signature is the HMAC-SHA256 of path and expiry time, as hex string.
+
+    :param secret: Secret key, str or bytes
+    :param path: Path of file relative to the volume's URL, with '/' as
+                 separator and not URL-quoted
+    :param expires: Unix timestamp after which the URL is invalid
+    :returns: Signature
+    """
+    if isinstance(secret, str):
+        secret = secret.encode('utf-8')
+    msg = '{0}\n{1}'.format(path, int(expires)).encode('utf-8')
+    return hmac.new(secret, msg, hashlib.sha256).hexdigest()
+
+
+def sign_url(secret, base_url, path, expires):
+    """
+    Returns signed direct URL of a file.
+
+    Query parameters ``expires`` and ``signature`` are appended to the URL.
+
+    :param secret: Secret key
+    :param base_url: URL of the volume's root
+    :param path: Path of file relative to the volume's root, with '/' as
+                 separator
+    :param expires: Unix timestamp after which the URL is invalid
+    :returns: URL
+    """
+    return '{0}/{1}?{2}'.format(base_url.rstrip('/'),
+        urllib.parse.quote(path),
+        urllib.parse.urlencode(dict(expires=int(expires),
+            signature=url_signature(secret, path, expires))))
+
+
+def validate_signed_url(secret, path, query, now=None):
+    """
+    Tells whether a signed direct URL is valid.
+
+    Call this from the front server (e.g. via an auth subrequest) or from a
+    lightweight WSGI app that serves the files, e.g.::
+
+        path = environ['PATH_INFO'][len('/files/'):]
+        if not validate_signed_url(SECRET, path, environ['QUERY_STRING']):
+            start_response('403 Forbidden', [])
+            ...
+
+    :param secret: Secret key
+    :param path: Path of requested file relative to the volume's URL,
+                 URL-quoted or not
+    :param query: Query string of request, or dict with keys ``expires``
+                  and ``signature``
+    :param now: Current Unix timestamp; default is the current time
+    :returns: True if signature matches and URL has not expired
+    """
+    if isinstance(query, str):
+        query = dict(urllib.parse.parse_qsl(query))
+    try:
+        expires = int(query['expires'])
+        signature = query['signature']
+    except (KeyError, TypeError, ValueError):
+        return False
+    if now is None:
+        now = time.time()
+    if expires < now:
+        return False
+    path = urllib.parse.unquote(path).lstrip('/')
+    return hmac.compare_digest(signature,
+        url_signature(secret, path, expires))
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+
+"""
+File-like objects to stream file contents to the client.
+
+All of them can be read with ``read()`` like a file, or iterated over to get
+the content in blocks, e.g. to be used as WSGI ``app_iter``.
+"""
+
+import io
+import os
+
+
+BLOCK_SIZE = 64 * 1024
+"""
+Default size of blocks when iterating over a stream.
+"""
+
+READAHEAD = 2 * 1024 * 1024
+"""
+Number of bytes at the start of a file the kernel is asked to read ahead.
+"""
+
+
+def _seek(fd, pos):
+    """
+    Positions file object at ``pos``.
+
+    If the file object is not seekable, reads and discards data up to
+    ``pos``, which works only forwards.
+    """
+    try:
+        fd.seek(pos)
+        return
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        pass
+    n = pos
+    while n > 0:
+        data = fd.read(min(n, BLOCK_SIZE))
+        if not data:
+            break
+        n -= len(data)
+
+
+class FileWrapper(object):
+    """
+    Wrapper around a file opened for streaming it to the client.
+
+    Exposes ``fileno()``, so that a WSGI server's ``wsgi.file_wrapper`` can
+    send the file with ``sendfile()`` without copying it through Python.
+    See :meth:`wsgi()`. Otherwise, iterating yields blocks of
+    ``block_size`` bytes.
+
+    On creation, the kernel is advised that the file will be read
+    sequentially, and to read ahead its first ``readahead`` bytes.
+    """
+
+    def __init__(self, fd, block_size=BLOCK_SIZE, readahead=READAHEAD):
+        """
+        :param fd: Underlying file object, opened in binary mode
+        :param block_size: Size of blocks when iterating
+        :param readahead: Number of bytes to read ahead; 0 disables advice
+        """
+        self._fd = fd
+        self.block_size = block_size
+        if readahead:
+            self._advise(readahead)
+
+    def _advise(self, readahead):
+        try:
+            fileno = self._fd.fileno()
+            os.posix_fadvise(fileno, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            os.posix_fadvise(fileno, 0, readahead, os.POSIX_FADV_WILLNEED)
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            # Not available on this platform or for this kind of file
+            pass
+
+    def wsgi(self, environ):
+        """
+        Returns iterable to be used as WSGI response body.
+
+        If the server provides ``wsgi.file_wrapper``, that is used, which
+        typically sends the file with ``sendfile()``. Else, the wrapper
+        itself is returned.
+
+        :param environ: WSGI environment
+        """
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if file_wrapper is None:
+            return self
+        return file_wrapper(self, self.block_size)
+
+    def fileno(self):
+        return self._fd.fileno()
+
+    def read(self, size=-1):
+        return self._fd.read(size)
+
+    def readinto(self, b):
+        return self._fd.readinto(b)
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        return self._fd.seek(pos, whence)
+
+    def tell(self):
+        return self._fd.tell()
+
+    def __iter__(self):
+        while True:
+            data = self._fd.read(self.block_size)
+            if not data:
+                break
+            yield data
+
+    def close(self):
+        self._fd.close()
+
+    @property
+    def closed(self):
+        return self._fd.closed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class RangeFile(object):
+    """
+    Read-only view of a byte range of a file object.
+
+    The underlying file object is positioned at the start of the range, and
+    reading stops at its end.
+    """
+
+    def __init__(self, fd, start, length, block_size=BLOCK_SIZE):
+        """
+        :param fd: Underlying file object
+        :param start: Offset of first byte
+        :param length: Number of bytes
+        :param block_size: Size of blocks when iterating
+        """
+        self._fd = fd
+        self._start = start
+        self._length = length
+        self._remaining = length
+        self.block_size = block_size
+        _seek(fd, start)
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._fd.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def __iter__(self):
+        while True:
+            data = self.read(self.block_size)
+            if not data:
+                break
+            yield data
+
+    def tell(self):
+        return self._length - self._remaining
+
+    def close(self):
+        self._fd.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def length(self):
+        """Number of bytes in range."""
+        return self._length
+
+
+class MultiRangeFile(object):
+    """
+    Body of a ``multipart/byteranges`` response.
+
+    Reading yields the parts for the given ranges, each with its own
+    ``Content-Type`` and ``Content-Range`` headers, separated by
+    ``boundary``.
+    """
+
+    def __init__(self, fd, ranges, size, mime, boundary,
+            block_size=BLOCK_SIZE):
+        """
+        :param fd: Underlying file object; must be seekable if the ranges
+                   are not in ascending order
+        :param ranges: List of 2-tuples (first byte, last byte), inclusive
+        :param size: Size of complete file
+        :param mime: Mime-type of file
+        :param boundary: Multipart boundary
+        :param block_size: Size of blocks when iterating
+        """
+        self._fd = fd
+        self.block_size = block_size
+        self._parts = []
+        for first, last in ranges:
+            head = ('\r\n--{0}\r\nContent-Type: {1}\r\n'
+                'Content-Range: bytes {2}-{3}/{4}\r\n\r\n').format(
+                boundary, mime, first, last, size).encode('latin-1')
+            self._parts.append((head, first, last - first + 1))
+        self._tail = '\r\n--{0}--\r\n'.format(boundary).encode('latin-1')
+        self._length = (sum(len(h) + n for h, _, n in self._parts)
+            + len(self._tail))
+        self._gen = self._generate()
+        self._buf = b''
+
+    def _generate(self):
+        for head, start, length in self._parts:
+            yield head
+            yield from RangeFile(self._fd, start, length, self.block_size)
+        yield self._tail
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            data = self._buf + b''.join(self._gen)
+            self._buf = b''
+            return data
+        while len(self._buf) < size:
+            try:
+                self._buf += next(self._gen)
+            except StopIteration:
+                break
+        data, self._buf = self._buf[:size], self._buf[size:]
+        return data
+
+    def __iter__(self):
+        if self._buf:
+            data, self._buf = self._buf, b''
+            yield data
+        yield from self._gen
+
+    def close(self):
+        self._fd.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def length(self):
+        """Total number of bytes of the multipart body."""
+        return self._length
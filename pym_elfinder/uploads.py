@@ -0,0 +1,572 @@
+# -*- coding: utf-8 -*-
+
+"""
+Staging of uploads.
+
+Implements the storage side of elFinder's chunked upload protocol: a file is
+sent in several chunks, possibly in parallel and possibly after a dropped
+connection, and each chunk is written into a staging file at its offset.
+When all chunks have arrived, the staging file is moved into the target
+directory.
+
+The staging area is a directory on the local filesystem, e.g. the
+quarantine directory of a local volume.
+
+Also implements the single-pass copy of an uploaded file, which enforces
+size limits while the data streams, and the content index that lets
+identical uploads share their storage.
+"""
+
+import io
+import os
+import re
+import stat
+import time
+import shutil
+import hashlib
+import threading
+
+from . import exceptions as exc
+
+
+BLOCK_SIZE = 1024 * 1024
+"""
+Size of blocks when uploaded data is copied through Python.
+"""
+
+COPY_SIZE = 8 * 1024 * 1024
+"""
+Maximum number of bytes copied by one call of a zero-copy system call.
+"""
+
+SNIFF_SIZE = 8 * 1024
+"""
+Number of bytes at the start of an upload used to detect its mime-type.
+"""
+
+RE_CHUNK_NAME = re.compile(r'^(.+)\.(\d+)_(\d+)\.part$', re.DOTALL)
+"""
+Name of a chunk as sent by the client: "<filename>.<index>_<last index>.part"
+"""
+
+
+class _Limit(object):
+    """
+    Upper bound for the size of an uploaded file.
+    """
+
+    def __init__(self, max_size=None, quota=None):
+        """
+        :param max_size: Maximum size of file, None for unlimited
+        :param quota: Free space of volume, None for unlimited
+        """
+        self.max_size = max_size
+        self.quota = quota
+        bounds = [ n for n in (max_size, quota) if n is not None ]
+        self.size = min(bounds) if bounds else None
+
+    def check(self, n):
+        """
+        Raises FinderError if ``n`` bytes exceed the limit.
+        """
+        if self.size is None or n <= self.size:
+            return
+        if self.max_size is not None and n > self.max_size:
+            raise exc.FinderError(exc.ERROR_UPLOAD_FILE_SIZE)
+        raise exc.FinderError(exc.PYM_ERROR_QUOTA_EXCEEDED.format(self.quota))
+
+    def want(self, n):
+        """
+        Returns number of bytes to request next, given ``n`` bytes were
+        copied; one more than allowed, to detect an overflow.
+        """
+        if self.size is None:
+            return COPY_SIZE
+        return max(min(COPY_SIZE, self.size - n + 1), 1)
+
+
+def _source_fd(src):
+    """
+    Returns OS-level file descriptor and current offset of ``src``, if it is
+    a regular file, else None.
+    """
+    try:
+        fd = src.fileno()
+        if not stat.S_ISREG(os.fstat(fd).st_mode):
+            return None
+        return fd, src.tell()
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        return None
+
+
+def _copy_zero(in_fd, offset, out_fd, limit):
+    """
+    Copies from ``in_fd`` starting at ``offset`` with a zero-copy system
+    call. Data never enters user space.
+
+    :returns: Number of bytes copied, or None if no zero-copy system call
+              works for these files and nothing was copied.
+    """
+    n = 0
+    copy_range = getattr(os, 'copy_file_range', None)
+    sendfile = getattr(os, 'sendfile', None)
+    while True:
+        want = limit.want(n)
+        if copy_range:
+            try:
+                k = copy_range(in_fd, out_fd, want, offset + n)
+            except OSError:
+                if n:
+                    raise
+                copy_range = None
+                continue
+        elif sendfile:
+            try:
+                k = sendfile(out_fd, in_fd, offset + n, want)
+            except OSError:
+                if n:
+                    raise
+                return None
+        else:
+            return None
+        if not k:
+            return n
+        n += k
+        limit.check(n)
+
+
+def copy_upload(src, out_fd, max_size=None, quota=None, block_size=BLOCK_SIZE,
+        inspect=None, digest=None):
+    """
+    Copies an uploaded file in a single pass, enforcing limits on the fly.
+
+    If ``src`` is backed by a regular file, e.g. a spooled upload, the
+    content is copied by the kernel with ``copy_file_range()`` or
+    ``sendfile()``. Else it is read in blocks of ``block_size``. Source
+    need not be seekable, and is read only once.
+
+    ``inspect`` is called with the first :data:`SNIFF_SIZE` bytes (fewer if
+    the file is smaller) before anything is written, e.g. to check the
+    mime-type. If it raises, copying stops.
+
+    ``digest`` is a hash object, e.g. ``hashlib.sha256()``, that is updated
+    with the content while it is written. Then the content must pass
+    through Python, and no zero-copy system call is used.
+
+    :param src: File-like object, read from its current position
+    :param out_fd: OS-level file descriptor of destination
+    :param max_size: Maximum size of file in bytes, None for unlimited
+    :param quota: Free space on volume in bytes, None for unlimited
+    :param block_size: Size of blocks if data is copied through Python
+    :param inspect: Callable(head), optional
+    :param digest: Hash object, optional
+    :returns: Number of bytes copied
+    :raises: FinderError as soon as a limit is exceeded
+    """
+    limit = _Limit(max_size, quota)
+    source = _source_fd(src) if digest is None else None
+    if source:
+        if inspect:
+            # Peek at head without moving the file position
+            try:
+                head = os.pread(source[0], SNIFF_SIZE, source[1])
+            except (AttributeError, OSError):
+                source = None
+            else:
+                inspect(head)
+                inspect = None
+    if source:
+        n = _copy_zero(source[0], source[1], out_fd, limit)
+        if n is not None:
+            return n
+    n = 0
+    buf = bytearray(block_size)
+    view = memoryview(buf)
+    readinto = getattr(src, 'readinto', None)
+    head = bytearray()
+    while True:
+        if readinto:
+            k = readinto(view)
+            data = view[:k] if k else b''
+        else:
+            data = src.read(block_size)
+            k = len(data)
+        if inspect:
+            # Hold data back until head is complete
+            head += data
+            if k and len(head) < SNIFF_SIZE:
+                continue
+            inspect(bytes(head[:SNIFF_SIZE]))
+            inspect = None
+            data = head
+            k = len(head)
+        if not k:
+            return n
+        n += k
+        limit.check(n)
+        if digest is not None:
+            digest.update(data)
+        while data:
+            w = os.write(out_fd, data)
+            data = data[w:]
+
+
+def known_size(src):
+    """
+    Returns number of bytes left to read in an uploaded file, if this can be
+    told without reading it, else None.
+
+    :param src: File-like object
+    """
+    try:
+        st = os.fstat(src.fileno())
+        if stat.S_ISREG(st.st_mode):
+            return max(st.st_size - src.tell(), 0)
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        pass
+    try:
+        return max(len(src.getbuffer()) - src.tell(), 0)
+    except (AttributeError, ValueError):
+        return None
+
+
+class QuotaReservation(object):
+    """
+    Free space of a volume, shared by the uploads of one batch.
+
+    Uploads reserve their size before they are written, so that concurrent
+    uploads cannot exceed the quota together.
+    """
+
+    def __init__(self, free):
+        """
+        :param free: Free space in bytes
+        """
+        self._free = free
+        self.lock = threading.RLock()
+        """
+        Lock to hold while an upload of unknown size is written, see
+        :attr:`available`.
+        """
+
+    @property
+    def available(self):
+        """
+        Bytes not yet reserved.
+        """
+        return self._free
+
+    def reserve(self, n):
+        """
+        Reserves ``n`` bytes.
+
+        :returns: True on success, False if not enough space is left
+        """
+        with self.lock:
+            if n > self._free:
+                return False
+            self._free -= n
+            return True
+
+
+def parse_chunk_name(chunk):
+    """
+    Parses name of a chunk.
+
+    :param chunk: Name of chunk, see :data:`RE_CHUNK_NAME`
+    :returns: 3-tuple (filename, index, last index), or None if ``chunk`` is
+              not a chunk name.
+    """
+    m = RE_CHUNK_NAME.match(chunk or '')
+    if not m:
+        return None
+    index, last = int(m.group(2)), int(m.group(3))
+    if index > last:
+        return None
+    return (m.group(1), index, last)
+
+
+def parse_chunk_range(range_):
+    """
+    Parses range of a chunk as sent by the client: "<start>,<length>,<total>"
+
+    :returns: 3-tuple (start, length, total size)
+    :raises: FinderError if range is invalid
+    """
+    try:
+        start, length, total = [ int(x) for x in range_.split(',') ]
+    except (AttributeError, ValueError):
+        raise exc.FinderError(exc.ERROR_INV_PARAMS, 'upload', 'range')
+    if start < 0 or length < 0 or start + length > total:
+        raise exc.FinderError(exc.ERROR_INV_PARAMS, 'upload', 'range')
+    return (start, length, total)
+
+
+class ChunkStore(object):
+    """
+    Staging area for chunked uploads.
+
+    Each upload gets its own directory, named by its key. It contains:
+
+    - ``data``: The staging file. Chunks are written into it at their
+      offsets, so they may arrive in any order and in parallel.
+    - ``meta``: Last chunk index and total size, as announced by the first
+      chunk.
+    - ``part.<index>``: Marker, created after chunk ``index`` was written
+      completely.
+    - ``merged``: Lock directory, created by the request that completes the
+      upload, so that exactly one request finishes it.
+    """
+
+    def __init__(self, path, dir_mode=0o700, file_mode=0o600):
+        """
+        :param path: Path of staging directory; is created if necessary
+        :param dir_mode: Mode of created directories
+        :param file_mode: Mode of created files
+        """
+        self.path = path
+        self.dir_mode = dir_mode
+        self.file_mode = file_mode
+
+    def key(self, cid, filename):
+        """
+        Returns key of an upload.
+
+        :param cid: Upload ID chosen by the client
+        :param filename: Name of uploaded file
+        """
+        s = '{0}_{1}'.format(cid, filename).encode('utf-8')
+        return hashlib.md5(s).hexdigest()
+
+    def _dir(self, key):
+        if not re.match(r'^[0-9a-f]{32}$', key or ''):
+            raise exc.FinderError(exc.ERROR_INV_PARAMS, 'upload', 'chunk')
+        return os.path.join(self.path, key)
+
+    def data_path(self, key):
+        """
+        Returns path of staging file of an upload.
+        """
+        return os.path.join(self._dir(key), 'data')
+
+    def _read_meta(self, dir_):
+        try:
+            with open(os.path.join(dir_, 'meta')) as fh:
+                last, total = fh.read().split()
+            return int(last), int(total)
+        except (OSError, IOError, ValueError):
+            return None
+
+    def _write_meta(self, dir_, last, total):
+        fn = os.path.join(dir_, 'meta')
+        tmp = '{0}.{1}'.format(fn, os.getpid())
+        with open(tmp, 'w') as fh:
+            fh.write('{0} {1}'.format(last, total))
+        os.replace(tmp, fn)
+
+    def write(self, key, index, last, start, length, total, fd):
+        """
+        Writes a chunk into the staging file of an upload.
+
+        :param key: Key of upload
+        :param index: Index of chunk
+        :param last: Index of last chunk
+        :param start: Offset of chunk in file
+        :param length: Length of chunk
+        :param total: Size of complete file
+        :param fd: File-like object with content of chunk
+        :returns: True if all chunks have arrived now, and the caller is the
+                  one to finish the upload.
+        :raises: FinderError
+        """
+        dir_ = self._dir(key)
+        try:
+            os.makedirs(dir_, self.dir_mode, exist_ok=True)
+            meta = self._read_meta(dir_)
+            if meta is None:
+                self._write_meta(dir_, last, total)
+            elif meta != (last, total):
+                raise exc.FinderError(exc.ERROR_UPLOAD_TRANSFER, key)
+            out = os.open(os.path.join(dir_, 'data'),
+                os.O_WRONLY | os.O_CREAT, self.file_mode)
+            try:
+                pos = start
+                while pos < start + length:
+                    data = fd.read(min(BLOCK_SIZE, start + length - pos))
+                    if not data:
+                        break
+                    while data:
+                        n = os.pwrite(out, data, pos)
+                        pos += n
+                        data = data[n:]
+                if pos != start + length or fd.read(1):
+                    # Chunk is shorter or longer than announced
+                    raise exc.FinderError(exc.ERROR_UPLOAD_TRANSFER, key)
+            finally:
+                os.close(out)
+            os.close(os.open(os.path.join(dir_, 'part.{0}'.format(index)),
+                os.O_WRONLY | os.O_CREAT, self.file_mode))
+        except (OSError, IOError) as e:
+            raise exc.FinderError(exc.ERROR_UPLOAD_TRANSFER, e)
+        if len(self.received(key)) < last + 1:
+            return False
+        return self._lock(dir_)
+
+    def _lock(self, dir_):
+        try:
+            os.mkdir(os.path.join(dir_, 'merged'))
+        except FileExistsError:
+            return False
+        return True
+
+    def received(self, key):
+        """
+        Returns sorted list of indexes of chunks that have arrived.
+        """
+        try:
+            names = os.listdir(self._dir(key))
+        except OSError:
+            return []
+        return sorted(int(n[5:]) for n in names
+            if n.startswith('part.') and n[5:].isdigit())
+
+    def status(self, key):
+        """
+        Returns status of an upload, to let the client resume it.
+
+        :returns: Dict with keys ``received`` (list of indexes of chunks
+                  that arrived), ``last`` (index of last chunk) and ``size``
+                  (size of complete file). ``last`` and ``size`` are None if
+                  no chunk arrived yet.
+        """
+        meta = self._read_meta(self._dir(key)) or (None, None)
+        return dict(received=self.received(key), last=meta[0], size=meta[1])
+
+    def is_complete(self, key):
+        """
+        Returns True if all chunks of an upload arrived and the staging file
+        has the announced size.
+        """
+        dir_ = self._dir(key)
+        meta = self._read_meta(dir_)
+        if meta is None:
+            return False
+        last, total = meta
+        try:
+            size = os.path.getsize(os.path.join(dir_, 'data'))
+        except OSError:
+            return False
+        return self.received(key) == list(range(last + 1)) and size == total
+
+    def discard(self, key):
+        """
+        Removes staging directory of an upload.
+        """
+        shutil.rmtree(self._dir(key), ignore_errors=True)
+
+    def purge(self, max_age):
+        """
+        Removes staging directories of uploads that were abandoned.
+
+        :param max_age: Remove uploads whose last chunk arrived longer than
+                        this many seconds ago
+        """
+        limit = time.time() - max_age
+        try:
+            with os.scandir(self.path) as it:
+                stale = [ e.path for e in it
+                    if e.is_dir() and e.stat().st_mtime < limit ]
+        except OSError:
+            return
+        for p in stale:
+            shutil.rmtree(p, ignore_errors=True)
+
+
+class ContentIndex(object):
+    """
+    Index of uploaded files by the hash of their content.
+
+    Each entry is a hardlink to a file with that content, named by its hex
+    digest, and placed in a subdirectory named by the first two digits. A
+    new upload whose content is already known can then be replaced by
+    another hardlink to the same inode, see :meth:`link()`.
+
+    An entry whose file was removed from the volume has a link count of 1.
+    Such orphans are removed while entries of the same subdirectory are
+    added, so the index is cleaned up along the way.
+    """
+
+    def __init__(self, path, dir_mode=0o700, max_age=24 * 3600):
+        """
+        :param path: Path of index directory; is created if necessary
+        :param dir_mode: Mode of created directories
+        :param max_age: Remove orphaned entries older than this many seconds
+        """
+        self.path = path
+        self.dir_mode = dir_mode
+        self.max_age = max_age
+
+    def _entry(self, digest):
+        if not re.match(r'^[0-9a-f]{32,128}$', digest or ''):
+            raise exc.FinderError(exc.ERROR_INV_PARAMS, 'upload', 'digest')
+        return os.path.join(self.path, digest[:2], digest)
+
+    def lookup(self, digest, path):
+        """
+        Returns path of an indexed file with the same content as ``path``.
+
+        The indexed file must be on the same device and have the same size,
+        and must not be ``path`` itself.
+
+        :param digest: Hex digest of content
+        :param path: Path of file
+        :returns: Path of indexed file, or None
+        """
+        entry = self._entry(digest)
+        try:
+            st = os.stat(entry)
+            own = os.stat(path)
+        except OSError:
+            return None
+        if (st.st_dev != own.st_dev or st.st_size != own.st_size
+                or st.st_ino == own.st_ino):
+            return None
+        return entry
+
+    def add(self, digest, path):
+        """
+        Adds ``path`` to the index, replacing a stale entry.
+
+        Errors are ignored; the file is just not deduplicated then.
+
+        :param digest: Hex digest of content
+        :param path: Path of file
+        """
+        entry = self._entry(digest)
+        dir_ = os.path.dirname(entry)
+        tmp = '{0}.{1}.{2}'.format(entry, os.getpid(), threading.get_ident())
+        try:
+            os.makedirs(dir_, self.dir_mode, exist_ok=True)
+            os.link(path, tmp)
+            os.replace(tmp, entry)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        self._purge(dir_)
+
+    def _purge(self, dir_):
+        """
+        Removes orphaned entries from a subdirectory of the index.
+        """
+        limit = time.time() - self.max_age
+        try:
+            with os.scandir(dir_) as it:
+                for e in it:
+                    st = e.stat(follow_symlinks=False)
+                    if st.st_nlink == 1 and st.st_ctime < limit:
+                        os.remove(e.path)
+        except OSError:
+            pass
@@ -1,12 +1,58 @@
 # -*- coding: utf-8 -*-
 
 import os
-#import re
+import re
+import json
+import hashlib
+import stat as stat_module
 import shutil
+import tempfile
+import time
+import threading
+import urllib.parse
+import uuid
+from collections import OrderedDict
 import magic
 
 from .volumedriver import VolumeDriver
 from .. import exceptions as exc
+from .. import fsutil
+from .. import streams
+from .. import uploads
+
+
+MIME_CACHE_SIZE = 10000
+"""
+Maximum number of files whose mimetypes are cached.
+"""
+
+_MIME_CACHE = OrderedDict()
+"""
+Cached mimetypes, key is path, value is 2-tuple (signature, mimetype).
+Least recently used entries are dropped first.
+"""
+_MIME_LOCK = threading.Lock()
+
+_PURGER = fsutil.Purger()
+"""
+Removes trees from the purge areas of all volumes in the background.
+"""
+
+TRASH_CHECK_INTERVAL = 3600
+"""
+Seconds between two checks of a trash for expired items.
+"""
+
+_TRASH_CHECKED = {}
+"""
+Time of last check for expired items, key is path of trash.
+"""
+
+RE_TRASH_ID = re.compile(r'^([0-9a-f]+)-[0-9a-f]{12}$')
+"""
+ID of an item in trash: time of removal and a random part, both in hex.
+"""
+
 
 class Driver(VolumeDriver):
     """
@@ -21,11 +67,203 @@ class Driver(VolumeDriver):
         self._options['alias']    = '' #alias to replace root dir_ name
         self._options['dirMode']  = 0o755 #new dirs mode
         self._options['fileMode'] = 0o644 #new files mode
+        self._options['quarantine'] = '.quarantine' #quarantine folder name, e.g. for staging uploads (is hidden)
+        # Offload downloads to web server, e.g.
+        #   {'header': 'X-Accel-Redirect', 'prefix': '/protected/files'}
+        #   {'header': 'X-Sendfile'}
+        # For X-Accel-Redirect, "prefix" is the URI of the internal location
+        # that maps to the root dir. For X-Sendfile, the optional "prefix"
+        # replaces the root dir in the file path the web server sees.
+        self._options['offload'] = None
+        # Size of blocks when streaming a file that the server does not send
+        # with sendfile()
+        self._options['stream_block_size'] = 256 * 1024
+        # Deduplicate uploads: an uploaded file whose content is already on
+        # the volume becomes a hardlink to that file. Needs the quarantine
+        # dir for the content index. Note that all links share the mtime.
+        self._options['dedup'] = False
+        self._unsynced = set()
+        """
+        Paths written during the current command, to be synced by
+        :meth:`flush()` if option ``durability`` is 'batch'.
+        """
+        self._sync_lock = threading.Lock()
+        self._sync_stats = dict(files=0, time=0.0)
+        """
+        Number of synced paths and seconds spent syncing in the current
+        command, see :meth:`debug_info()`.
+        """
+        self._last_sync = None
+        # Number of threads copying the files of a directory tree
+        self._options['copyThreads'] = 8
+        self._copy_stats = dict(files=0, dirs=0, bytes=0)
+        """
+        Number of files, dirs and bytes copied by paste, duplicate or a move
+        across devices in the current command.
+        """
+        self._last_copy = None
+
+    def _init_security(self):
+        super()._init_security()
+        if self._options['quarantine']:
+            # Added behind all other ACEs, so that no ACE can reveal it.
+            self._acl.append({
+                'pattern' : r'^/{0}(/|$)'.format(
+                    re.escape(self._options['quarantine'])),
+                'read' : False,
+                'write' : False,
+                'locked' : True,
+                'hidden' : True
+            })
 
     def _before_mount(self):
         self._root_realpath = os.path.realpath(self._root_path)
-        # TODO Init quarantine dir (where archives are extracted to)
-        #      and thumbnails
+        if self._options['durability'] not in ('none', 'file', 'batch'):
+            raise exc.FinderError(exc.ERROR_CONF, 'durability')
+        offload = self._options['offload']
+        if offload and (not offload.get('header') or (
+                offload['header'].lower() == 'x-accel-redirect'
+                and not offload.get('prefix'))):
+            raise exc.FinderError(exc.ERROR_CONF, 'offload')
+        if self._options['quarantine']:
+            # Resume removal of trees left over by another process
+            _PURGER.submit_all(self._joinpath(self._root_path,
+                self._options['quarantine'], 'purge'))
+        if self._options['trash']:
+            self._purge_trash()
+        # TODO Init thumbnails
+
+    def _quarantine_path(self, *args):
+        """
+        Returns path inside the quarantine dir, and creates it if necessary.
+
+        The quarantine dir is created on first use.
+
+        :param args: Names of subdirectories
+        :raises: FinderError if quarantine is disabled or cannot be created
+        """
+        if not self._options['quarantine']:
+            raise exc.FinderError(exc.ERROR_PERM_DENIED)
+        path = self._joinpath(self._root_path, self._options['quarantine'],
+            *args)
+        try:
+            os.makedirs(path, 0o700, exist_ok=True)
+        except OSError as e:
+            raise exc.FinderError(exc.ERROR_MKDIR, e)
+        return path
+
+    def _make_durable(self, *paths, tree=None):
+        """
+        Syncs new or changed files or dirs and their parent dirs to disk,
+        according to option ``durability``.
+
+        With 'file', they are synced at once. With 'batch', they are
+        remembered, and synced together by :meth:`flush()`; until then, a
+        file that was written under a temporary name and renamed may be
+        unsynced, i.e. empty or partial after a crash.
+
+        :param paths: Paths of files or dirs; a path that no longer exists,
+                      e.g. of a removed file, is skipped, but its parent
+                      dir is synced.
+        :param tree: Path of a new directory tree, that is synced with all
+                     its content
+        """
+        mode = self._options['durability']
+        if mode == 'none':
+            return
+        todo = set(paths)
+        if tree:
+            todo.update(self._walk_paths(tree))
+        todo.update([ self._dirname(p) for p in todo ])
+        if mode == 'batch':
+            with self._sync_lock:
+                self._unsynced |= todo
+            return
+        self._fsync(todo)
+
+    def _sync_before_rename(self, fd):
+        """
+        Syncs a file written under a temporary name, before it is renamed
+        to its final name, if option ``durability`` is 'file'.
+
+        So the final name never refers to an incomplete file, even if the
+        system crashes right after the rename.
+
+        :param fd: OS-level file descriptor of file
+        """
+        if self._options['durability'] != 'file':
+            return
+        t0 = time.time()
+        try:
+            os.fsync(fd)
+        except OSError as e:
+            raise exc.FinderError(exc.ERROR_SAVE, e)
+        with self._sync_lock:
+            self._sync_stats['files'] += 1
+            self._sync_stats['time'] += time.time() - t0
+
+    def _fsync(self, paths):
+        """
+        Syncs given paths to disk.
+
+        Deeper paths are synced first, so that the content of a file is on
+        disk before the directory entry that refers to it.
+        """
+        t0 = time.time()
+        n = 0
+        for path in sorted(paths, key=len, reverse=True):
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                raise exc.FinderError(exc.ERROR_SAVE, e)
+            try:
+                os.fsync(fd)
+            except OSError as e:
+                raise exc.FinderError(exc.ERROR_SAVE, e)
+            finally:
+                os.close(fd)
+            n += 1
+        with self._sync_lock:
+            self._sync_stats['files'] += n
+            self._sync_stats['time'] += time.time() - t0
+
+    def flush(self):
+        """
+        Syncs all paths written during the current command, if option
+        ``durability`` is 'batch', and closes the statistics of the command.
+        """
+        with self._sync_lock:
+            paths, self._unsynced = self._unsynced, set()
+        try:
+            if paths:
+                self._fsync(paths)
+        finally:
+            with self._sync_lock:
+                self._last_sync = dict(self._sync_stats)
+                self._sync_stats = dict(files=0, time=0.0)
+                self._last_copy = dict(self._copy_stats)
+                self._copy_stats = dict(files=0, dirs=0, bytes=0)
+
+    @property
+    def copied(self):
+        """
+        Dict with the number of ``files``, ``dirs`` and ``bytes`` copied by
+        the last command, by paste, duplicate or a move across devices.
+        """
+        return self._last_copy or dict(files=0, dirs=0, bytes=0)
+
+    def debug_info(self):
+        """
+        Returns debug info for client, with the timing of syncs to disk
+        unless option ``durability`` is 'none'.
+        """
+        info = super().debug_info()
+        if self._options['durability'] != 'none':
+            info['durability'] = dict(mode=self._options['durability'],
+                **(self._last_sync or dict(files=0, time=0.0)))
+        return info
 
     #*********************************************************************#
     #*                               FS API                              *#
@@ -91,7 +329,7 @@ class Driver(VolumeDriver):
         Returns True if path is parent or child of parent.
         """
         path = path.rstrip(self._sep)
-        parent = path.rstrip(self._sep)
+        parent = parent.rstrip(self._sep)
         return (path == parent
             or path.startswith(parent + self._sep)
         )
@@ -145,26 +383,130 @@ class Driver(VolumeDriver):
         stat['hidden'] = False
         return stat
 
+    def _stat_light(self, path):
+        """
+        Returns a minimal stat for given path.
+
+        Unlike :meth:`_stat` no mime-type is determined. A symlink is
+        resolved like in :meth:`_stat`: if it is broken or leads out of the
+        root, it is reported as an unreadable and unwriteable file of size
+        0, so nothing about its target is revealed.
+
+        :returns: Dict with keys ``size``, ``ts``, ``dir``, ``read`` and
+                  ``write``
+        """
+        try:
+            st = os.lstat(path)
+        except OSError:
+            raise exc.FinderError(exc.ERROR_FILE_NOT_FOUND, self._aliaspath(path))
+        if stat_module.S_ISLNK(st.st_mode) and path != self._root_path:
+            broken = dict(size=0, ts=st.st_mtime, dir=False, read=False,
+                write=False)
+            target = self._readlink(path)
+            if not target or target == path:
+                return broken
+            try:
+                st = os.stat(target)
+            except OSError:
+                return broken
+            path = target
+        is_dir = stat_module.S_ISDIR(st.st_mode)
+        return dict(
+            size=0 if is_dir else st.st_size,
+            ts=st.st_mtime,
+            dir=is_dir,
+            read=os.access(path, os.R_OK),
+            write=os.access(path, os.W_OK)
+        )
+
+    def _local_path(self, path):
+        """
+        Returns ``path``, as items are plain files in the local filesystem.
+        """
+        return path
+
+    def offload_value(self, path):
+        """
+        Returns value of the internal-redirect header for given file.
+
+        See option ``offload``.
+        """
+        offload = self._options['offload']
+        if offload['header'].lower() == 'x-accel-redirect':
+            rel = self._relpath(path).replace(self._sep, '/')
+            return '{0}/{1}'.format(offload['prefix'].rstrip('/'),
+                urllib.parse.quote(rel))
+        prefix = offload.get('prefix')
+        if prefix:
+            return os.path.join(prefix, self._relpath(path))
+        return path
+
+    def etag(self, path, stat):
+        """
+        Returns a strong entity tag for given file.
+
+        Tag is derived from inode, modification time in nanoseconds and
+        size.
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return super().etag(path, stat)
+        return '"{0:x}-{1:x}-{2:x}"'.format(st.st_ino, st.st_mtime_ns,
+            st.st_size)
+
     def _update_quota(self):
         top = self._root_path
+        trees = [ top ]
+        if self._options['trash']:
+            # Items in trash still occupy their storage
+            trees.append(self._trash_path(create=False))
         self._used_size = 0
-        for root, dirs, files in os.walk(top):
-            self._used_size += sum(
-                os.path.getsize(os.path.join(root, name)) for name in files)
+        linked = set()
+        for tree in trees:
+            for root, dirs, files in os.walk(tree):
+                if root == top and self._options['quarantine'] in dirs:
+                    # Staged uploads are not counted
+                    dirs.remove(self._options['quarantine'])
+                if tree != top and self._dirname(root) == tree:
+                    # Metadata of an item in trash
+                    files = [ n for n in files if n == 'data' ]
+                for name in files:
+                    try:
+                        st = os.stat(os.path.join(root, name))
+                    except OSError:
+                        continue
+                    if st.st_nlink > 1:
+                        # Hardlinks, e.g. of deduplicated uploads, occupy
+                        # their storage only once
+                        if (st.st_dev, st.st_ino) in linked:
+                            continue
+                        linked.add((st.st_dev, st.st_ino))
+                    self._used_size += st.st_size
         return self._used_size
     
     def _has_subdirs(self, path):
         """
         Returns True if path is dir and has at least one child directory.
         """
-        #if 'some_dir' in path:
-        #    import ipdb; ipdb.set_trace()
-        for entry in os.listdir(path):
-            p = path + self._sep + entry
-            if os.path.isdir(p) and not self.acl_perm(path=p, perm_name='hidden'):
+        for p in self._subdirs(path):
+            if not self.acl_perm(path=p, perm_name='hidden'):
                 return True
         return False
 
+    def _subdirs(self, path):
+        """
+        Returns list of paths of the child directories of given path.
+
+        Uses :func:`os.scandir`, which in most cases tells the type of an
+        entry without an extra ``stat()`` call.
+        """
+        try:
+            with os.scandir(path) as it:
+                return [ entry.path for entry in it if entry.is_dir() ]
+        except OSError:
+            return []
+
     def _tree_stats(self, path, depth, exclude=None):
         """
         Returns list of stats of all directories in a tree.
@@ -190,7 +532,7 @@ class Driver(VolumeDriver):
             for d in dirs:
                 if self._joinpath(root, d) in exclude:
                     continue
-                stats.append( self.stat(os.path.join(root, d)) )
+                stats.append( self.cached_stat(os.path.join(root, d)) )
         return stats
 
     def _ls_stats(self, path):
@@ -236,9 +578,60 @@ class Driver(VolumeDriver):
     def _mimetype(self, path):
         """
         Returns path's mimetype.
+
+        Mimetypes are cached, see :meth:`cache_mime()`.
         """
-        return magic.Magic(mime=True).from_file(
+        try:
+            sig = self._mime_signature(path)
+        except OSError:
+            sig = None
+        if sig:
+            with _MIME_LOCK:
+                cached = _MIME_CACHE.get(path)
+                if cached and cached[0] == sig:
+                    _MIME_CACHE.move_to_end(path)
+                    return cached[1]
+        mime = magic.Magic(mime=True).from_file(
             path.encode('utf-8')).decode('utf-8')
+        if sig:
+            self._store_mime(path, sig, mime)
+        return mime
+
+    def _mimetype_buffer(self, data):
+        """
+        Returns mimetype of data.
+        """
+        mime = magic.Magic(mime=True).from_buffer(bytes(data))
+        if isinstance(mime, bytes):
+            mime = mime.decode('utf-8')
+        return mime
+
+    def _mime_signature(self, path):
+        """
+        Returns signature of file that invalidates its cached mimetype
+        when the file changes.
+        """
+        st = os.stat(path)
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _store_mime(self, path, sig, mime):
+        with _MIME_LOCK:
+            _MIME_CACHE[path] = (sig, mime)
+            _MIME_CACHE.move_to_end(path)
+            while len(_MIME_CACHE) > MIME_CACHE_SIZE:
+                _MIME_CACHE.popitem(last=False)
+
+    def cache_mime(self, path, mime):
+        """
+        Remembers mimetype of a file, e.g. as detected during upload.
+
+        Cache is shared by all volumes of the process. An entry is valid as
+        long as inode, size and modification time of the file are unchanged.
+        """
+        try:
+            self._store_mime(path, self._mime_signature(path), mime)
+        except OSError:
+            pass
     
     def _readlink(self, path):
         """
@@ -260,13 +653,15 @@ class Driver(VolumeDriver):
         """
         Returns file-like object for given path.
 
-        File is opened in binary mode for reading.
+        File is opened in binary mode for reading, and wrapped in a
+        :class:`~pym_elfinder.streams.FileWrapper`, which supports
+        ``sendfile()`` via ``wsgi.file_wrapper``.
         """
         try:
-            fd = open(path, 'rb')
+            fd = open(path, 'rb', buffering=0)
         except (OSError, IOError) as e:
             raise exc.FinderError(e)
-        return fd
+        return streams.FileWrapper(fd, self._options['stream_block_size'])
 
     def _get_content(self, path, encoding=None):
         """
@@ -303,6 +698,13 @@ class Driver(VolumeDriver):
         :param encoding: Encoding to use for text files
         :returns: Path of changed file
         """
+        try:
+            if os.stat(path).st_nlink > 1:
+                # Content is shared with other links, e.g. deduplicated
+                # uploads, and must not change for them.
+                return self._replace_content(path, content, encoding)
+        except OSError as e:
+            raise exc.FinderError(exc.ERROR_SAVE, e)
         flags = os.O_WRONLY | os.O_EXCL | os.O_TRUNC
         if encoding:
             bytes_ = content.encode(encoding)
@@ -319,19 +721,53 @@ class Driver(VolumeDriver):
                 os.close(fd)
         except (OSError, IOError) as e:
             raise exc.FinderError(exc.ERROR_SAVE, e)
+        self._make_durable(path)
+        return path
+
+    def _replace_content(self, path, content, encoding=None):
+        """
+        Writes new content into a new file that replaces ``path``.
+
+        Unlike :meth:`_put_content()`, other hardlinks to the file keep the
+        old content.
+        """
+        bytes_ = content.encode(encoding) if encoding else content
+        try:
+            mode = os.stat(path).st_mode & 0o7777
+            fd, tmp_path = tempfile.mkstemp(dir=self._dirname(path),
+                prefix='.', suffix='.put')
+            try:
+                try:
+                    os.write(fd, bytes_)
+                    self._sync_before_rename(fd)
+                finally:
+                    os.close(fd)
+                os.chmod(tmp_path, mode)
+                os.replace(tmp_path, path)
+            except:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except (OSError, IOError) as e:
+            raise exc.FinderError(exc.ERROR_SAVE, e)
+        self._make_durable(path)
         return path
 
     
     #********************  file/dir manipulations *************************#
     
-    def _mkdir(self, cur_path, name, mode=None):
+    def _mkdir(self, cur_path, name, mode=None, exist_ok=False):
         """
         Creates a directory if it does not exist.
 
         :param path: Path of current directory
         :param name: Name of directory to create
         :param mode: Octal mode
-        :returns: Absolute name of created dir
+        :param exist_ok: If True, an existing directory is no error
+        :returns: Absolute name of created dir. If ``exist_ok`` is True,
+                  2-tuple (absolute name, True if dir was created)
         :raises: FinderError if dir exists or any OSError occured
         """
         if mode is None:
@@ -339,9 +775,14 @@ class Driver(VolumeDriver):
         path = self._joinpath(cur_path, name)
         try:
             os.mkdir(path, mode)
+        except FileExistsError as e:
+            if exist_ok and os.path.isdir(path) and not os.path.islink(path):
+                return (path, False)
+            raise exc.FinderError(exc.ERROR_MKDIR, e, name)
         except OSError as e:
             raise exc.FinderError(exc.ERROR_MKDIR, e, name)
-        return path
+        self._make_durable(path)
+        return (path, True) if exist_ok else path
 
     def _mkfile(self, cur_path, name, mode=None):
         """
@@ -361,34 +802,68 @@ class Driver(VolumeDriver):
             # In Python 3.3 we can use the new "x" mode for built-in open()
         except OSError as e:
             raise exc.FinderError(exc.ERROR_MKFILE, e, name)
+        self._make_durable(path)
         return path
 
     def _copy(self, src, dst_dir, name):
         """
         Copies a file or directory.
 
+        Files are copied kernel-side, as reflinks where the filesystem
+        supports them, see :mod:`pym_elfinder.fsutil`.
+
         :param src: 
         :returns: Path to the newly created file or directory.
         """
         dst = self._joinpath(dst_dir, name)
         try:
             if os.path.isdir(src):
-                shutil.copytree(src, dst) # Py3.3: shutil.copy() itself returns dst
+                self._count_copied(fsutil.copy_tree(src, dst,
+                    self._options['copyThreads']))
+                self._make_durable(tree=dst)
             else:
-                shutil.copy(src, dst) # Py3.3: shutil.copytree() itself returns dst
+                fsutil.copy_file(src, dst)
+                self._count_copied(dict(files=1, dirs=0,
+                    bytes=os.path.getsize(dst)))
+                self._make_durable(dst)
             return dst
         except (IOError, OSError) as e: # Py3.3: OSError; <Py3.3: IOError
             raise exc.FinderError(exc.ERROR_COPY, e)
 
+    def _count_copied(self, stats):
+        """
+        Adds stats of a copy to those of the current command.
+        """
+        with self._sync_lock:
+            for k, v in stats.items():
+                self._copy_stats[k] += v
+
+    def _walk_paths(self, top):
+        """
+        Returns list of paths of ``top`` and of all files and dirs below.
+        """
+        paths = [ top ]
+        for root, dirs, files in os.walk(top):
+            paths.extend(self._joinpath(root, n) for n in dirs + files)
+        return paths
+
     def _move(self, src, dst_dir, name):
         """
         Moves a file or directory.
+
+        It is renamed, or, across devices, copied like in :meth:`_copy()`
+        and then removed.
         
         :returns: Destination path.
         """
         dst = self._joinpath(dst_dir, name)
         try:
-            shutil.move(src, dst) # Py3.3: shutil.move() itself returns dst
+            stats = fsutil.move(src, dst, self._options['copyThreads'])
+            self._count_copied(stats)
+            if stats['files'] or stats['dirs']:
+                self._make_durable(src, tree=dst)
+            else:
+                self._make_durable(src, dst)
             return dst
         except (IOError, OSError) as e:
             raise exc.FinderError(exc.ERROR_MOVE, e)
@@ -401,6 +876,176 @@ class Driver(VolumeDriver):
                 os.unlink(path)
         except OSError as e:
             raise exc.FinderError(exc.ERROR_RM, self._basename(path), e)
+        self._make_durable(path)
+        return path
+
+    def _trash_path(self, create=True):
+        """
+        Returns path of trash dir, as given by option ``trash``.
+
+        :param create: Create trash dir if it does not exist
+        :raises: FinderError if trash is in the quarantine dir, and
+                 quarantine is disabled
+        """
+        trash = self._options['trash']
+        if os.path.isabs(trash):
+            if create:
+                try:
+                    os.makedirs(trash, 0o700, exist_ok=True)
+                except OSError as e:
+                    raise exc.FinderError(exc.ERROR_MKDIR, e)
+            return trash
+        if not create:
+            return self._joinpath(self._root_path,
+                self._options['quarantine'] or '', trash)
+        return self._quarantine_path(trash)
+
+    def _trash_entry(self, id_):
+        if not RE_TRASH_ID.match(id_ or ''):
+            raise exc.FinderError(exc.ERROR_FILE_NOT_FOUND)
+        return self._joinpath(self._trash_path(create=False), id_)
+
+    def _to_trash(self, path, meta):
+        """
+        Moves an item into trash.
+
+        Each item gets its own dir in trash, containing ``meta.json`` with
+        the given metadata, and the item itself, renamed to ``data``. As
+        the item is only renamed, this takes constant time regardless of
+        its size.
+
+        :param path: Path of item
+        :param meta: Dict with metadata, see :meth:`trash_list()`
+        """
+        id_ = '{0:x}-{1}'.format(int(meta['ts']), uuid.uuid4().hex[:12])
+        entry = self._joinpath(self._trash_path(), id_)
+        try:
+            os.mkdir(entry, 0o700)
+            try:
+                with open(self._joinpath(entry, 'meta.json'), 'w') as fh:
+                    json.dump(meta, fh)
+                os.rename(path, self._joinpath(entry, 'data'))
+            except:
+                shutil.rmtree(entry, ignore_errors=True)
+                raise
+        except OSError as e:
+            raise exc.FinderError(exc.ERROR_RM, self._basename(path), e)
+        self._make_durable(path, entry, self._joinpath(entry, 'meta.json'),
+            self._joinpath(entry, 'data'))
+        return id_
+
+    def _read_trash_meta(self, entry):
+        """
+        Returns metadata of an item in trash, or None if it is incomplete.
+        """
+        try:
+            with open(self._joinpath(entry, 'meta.json')) as fh:
+                meta = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if not os.path.lexists(self._joinpath(entry, 'data')):
+            return None
+        return meta
+
+    def _trash_entries(self):
+        """
+        Yields 2-tuples (ID, metadata) of the items in trash.
+        """
+        try:
+            with os.scandir(self._trash_path(create=False)) as it:
+                entries = [ (e.name, e.path) for e in it
+                    if RE_TRASH_ID.match(e.name) ]
+        except OSError:
+            return
+        for id_, entry in entries:
+            meta = self._read_trash_meta(entry)
+            if meta is not None:
+                yield (id_, meta)
+
+    def _trash_meta(self, id_):
+        """
+        Returns metadata of an item in trash.
+
+        :raises: FinderError if there is no such item
+        """
+        meta = self._read_trash_meta(self._trash_entry(id_))
+        if meta is None:
+            raise exc.FinderError(exc.ERROR_FILE_NOT_FOUND)
+        return meta
+
+    def _trash_size(self, id_):
+        """
+        Returns total size of the files of an item in trash.
+        """
+        return self._tree_size(self._joinpath(self._trash_entry(id_), 'data'))
+
+    def _from_trash(self, id_, dst_dir, name):
+        """
+        Moves an item from trash to ``dst_dir``, and removes its entry.
+
+        :returns: Path of restored item
+        """
+        entry = self._trash_entry(id_)
+        dst = self._joinpath(dst_dir, name)
+        try:
+            os.rename(self._joinpath(entry, 'data'), dst)
+        except OSError as e:
+            raise exc.FinderError(exc.ERROR_MOVE, e)
+        shutil.rmtree(entry, ignore_errors=True)
+        self._make_durable(dst, entry)
+        return dst
+
+    def _purge_trash(self):
+        """
+        Hands items that are longer in trash than option ``trashTTL`` to the
+        background purger.
+
+        The trash is checked at most every :data:`TRASH_CHECK_INTERVAL`
+        seconds per process. The time of removal is part of the ID of an
+        item, so that only the trash dir is listed.
+        """
+        trash = self._trash_path(create=False)
+        now = time.time()
+        if now - _TRASH_CHECKED.get(trash, 0) < TRASH_CHECK_INTERVAL:
+            return
+        _TRASH_CHECKED[trash] = now
+        limit = now - self._options['trashTTL']
+        try:
+            with os.scandir(trash) as it:
+                expired = [ e.path for e in it
+                    if RE_TRASH_ID.match(e.name)
+                    and int(RE_TRASH_ID.match(e.name).group(1), 16) < limit ]
+        except OSError:
+            return
+        for p in expired:
+            _PURGER.submit(p)
+
+    def _remove_tree(self, path):
+        """
+        Removes a directory tree in the background.
+
+        The tree is renamed into the purge area in the quarantine dir, which
+        is atomic and instantaneous, and its content is deleted by a
+        background thread, see :class:`~pym_elfinder.fsutil.Purger`. As the
+        quarantine dir is not counted, the quota is freed at once.
+
+        If the tree cannot be renamed, e.g. because it is on another
+        filesystem, it is removed before this method returns.
+        """
+        if not os.path.isdir(path) or os.path.islink(path):
+            return self._remove(path)
+        try:
+            victim = self._joinpath(self._quarantine_path('purge'),
+                uuid.uuid4().hex)
+            os.rename(path, victim)
+        except (exc.FinderError, OSError):
+            try:
+                fsutil.remove_tree(path, self._options['copyThreads'])
+            except OSError as e:
+                raise exc.FinderError(exc.ERROR_RM, self._basename(path), e)
+        else:
+            _PURGER.submit(victim)
+        self._make_durable(path)
         return path
 
 ###    def _unlink(self, path):
@@ -417,13 +1062,24 @@ class Driver(VolumeDriver):
 ###        os.rmdir(path)
 ###        return path
 
-    def _save_uploaded(self, fd, dst_path, filename):
+    def _save_uploaded(self, fd, dst_path, filename, max_size=None, quota=None,
+            inspect=None):
         """
         Save the uploaded file object and return its new path.
 
+        The upload is read once, and written into a temporary file in the
+        destination directory, see :func:`~pym_elfinder.uploads.copy_upload()`.
+        If a limit is exceeded, copying stops at once and the temporary file
+        is removed. Else it is renamed atomically to its final name, so that
+        nobody sees a partial file.
+
         :param fd: File descriptor of uploaded file
         :param dst_path: Path of destination directory
         :param filename: Basename of uploaded file
+        :param max_size: Maximum size of file in bytes, None for unlimited
+        :param quota: Free space on volume in bytes, None for unlimited
+        :param inspect: Callable that checks the head of the file before it
+                        is written, see :func:`~pym_elfinder.uploads.copy_upload()`
         :returns: Path to uploaded file
 
         Test code to learn nested try..except..finally constructs:
@@ -473,26 +1129,110 @@ class Driver(VolumeDriver):
             two()
         """
         dst_file_path = self._joinpath(dst_path, filename)
+        digest = hashlib.sha256() if self._options['dedup'] else None
         try:
-            dst_fd = open(dst_file_path, 'wb')
+            dst_fd, tmp_path = tempfile.mkstemp(dir=dst_path, prefix='.',
+                suffix='.upload')
             try:
-                shutil.copyfileobj(fd, dst_fd)
-            # copyfileobj may raise several exceptions, so catch them all.
-            # E.g. - UnsupportedOperation if src is not readable,
-            #      - AttributeError if args are of wrong type, e.g.
-            #        have no attr "read()"
-            #      - etc
-            except Exception as e:
-                raise exc.FinderError(exc.ERROR_UPLOAD, e)
-            finally:
-                # Copy failed, but certainly close destination file
-                dst_fd.close()
-        # Catch error on opening dst fd
-        except (OSError, IOError) as e:
+                try:
+                    uploads.copy_upload(fd, dst_fd, max_size, quota,
+                        inspect=inspect, digest=digest)
+                    self._sync_before_rename(dst_fd)
+                finally:
+                    os.close(dst_fd)
+                os.chmod(tmp_path, self._options['fileMode'])
+                if digest is not None:
+                    tmp_path = self._dedup(tmp_path, digest.hexdigest())
+                os.replace(tmp_path, dst_file_path)
+                # Renaming onto another link to the same file does nothing,
+                # e.g. if the same content was uploaded again under the same
+                # name and deduplicated.
+                if os.path.lexists(tmp_path):
+                    os.remove(tmp_path)
+            except:
+                # Copy failed, remove partial file
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except exc.FinderError:
+            raise # Limit exceeded
+        # Copying may raise several exceptions, so catch them all.
+        # E.g. - UnsupportedOperation if src is not readable,
+        #      - AttributeError if args are of wrong type, e.g.
+        #        have no attr "read()"
+        #      - OSError on creating temporary file
+        #      - etc
+        except Exception as e:
             raise exc.FinderError(exc.ERROR_UPLOAD, e)
         finally:
             # Under all circumstances close the uploaded file
             fd.close()
+        self._make_durable(dst_file_path)
+        return dst_file_path
+
+    def _dedup(self, path, digest):
+        """
+        Deduplicates a freshly uploaded file.
+
+        If the content index knows a file with the same content on the same
+        device, ``path`` is removed, and a hardlink to that file is created
+        instead. Else ``path`` is added to the index.
+
+        :param path: Path of uploaded file, not yet in its final place
+        :param digest: SHA-256 hex digest of content
+        :returns: Path of file to move into the final place
+        """
+        try:
+            index = uploads.ContentIndex(self._quarantine_path('dedup'),
+                max_age=self._options['uploadChunkTTL'])
+        except exc.FinderError:
+            return path # Quarantine is disabled
+        same = index.lookup(digest, path)
+        if same is None:
+            index.add(digest, path)
+            return path
+        link_path = path + '.link'
+        try:
+            os.link(same, link_path)
+        except OSError:
+            # E.g. too many links; keep the copy
+            return path
+        os.remove(path)
+        return link_path
+
+    def _chunk_store(self):
+        """
+        Returns staging area of chunked uploads, inside the quarantine dir.
+        """
+        return uploads.ChunkStore(self._quarantine_path('chunks'))
+
+    def _save_staged(self, staged_path, dst_path, filename):
+        """
+        Moves a staged file into its destination.
+
+        The file is renamed atomically, so that an existing file is replaced
+        in one step. Mode of the file is set to option ``fileMode``.
+
+        :param staged_path: Path of staged file
+        :param dst_path: Path of destination directory
+        :param filename: Basename of file
+        :returns: Path to file
+        """
+        dst_file_path = self._joinpath(dst_path, filename)
+        try:
+            os.chmod(staged_path, self._options['fileMode'])
+            if self._options['durability'] == 'file':
+                fd = os.open(staged_path, os.O_RDONLY)
+                try:
+                    self._sync_before_rename(fd)
+                finally:
+                    os.close(fd)
+            os.replace(staged_path, dst_file_path)
+        except OSError as e:
+            raise exc.FinderError(exc.ERROR_UPLOAD, e)
+        self._make_durable(dst_file_path)
         return dst_file_path
 
     def _rename(self, src, dst):
@@ -500,4 +1240,5 @@ class Driver(VolumeDriver):
             os.rename(src, dst)
         except OSError as e:
             raise exc.FinderError(exc.ERROR_RENAME, e)
+        self._make_durable(src, dst)
         return dst
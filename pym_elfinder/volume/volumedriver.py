@@ -4,6 +4,10 @@ import re
 import os
 import copy
 import mimetypes
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from base64 import b64encode, b64decode
 try:
     from collections.abc import Callable
@@ -11,6 +15,9 @@ except ImportError:
     from collections import Callable
 
 from .. import exceptions as exc
+from .. import archivers
+from .. import security
+from .. import uploads
 
 
 class VolumeDriver(object):
@@ -21,6 +28,10 @@ class VolumeDriver(object):
     Must conform to /^[a-z][a-z0-9]*$/. Used as part of volume ID.
     """
 
+    INFO_FIELDS = ('hash', 'name', 'phash', 'volumeid', 'size', 'ts', 'mime',
+        'read', 'write', 'locked', 'hidden', 'dirs')
+    """Fields that may be requested by :meth:`stat_fields()`."""
+
     def __init__(self, finder):
         """
         Base class of volume drivers.
@@ -79,6 +90,13 @@ class VolumeDriver(object):
         Call :meth:`update_quota()` to set this value correctly. Is updated by Finder
         on each command call.
         """
+        self._stat_cache = {}
+        """
+        Stats of paths, key is path.
+
+        Filled by :meth:`stat()` and read by :meth:`cached_stat()`. Finder
+        clears it on each command call.
+        """
         # ---[ public attribs ]-------
 
     # ===[ MOUNT ]=======
@@ -305,11 +323,154 @@ class VolumeDriver(object):
             stat['thash'] = self.encode(stat['target'])
             del stat['target']
 
-        return stat
+        self._stat_cache[path] = stat
+        return dict(stat)
+
+    def cached_stat(self, path):
+        """
+        Returns info for given path, from the stat cache if possible.
+
+        Use this for read-only operations that may stat the same path several
+        times during one command, e.g. building trees.
+        """
+        try:
+            return dict(self._stat_cache[path])
+        except KeyError:
+            return self.stat(path)
+
+    def clear_cache(self):
+        """
+        Clears the stat cache.
+        """
+        self._stat_cache = {}
    
+    def stat_fields(self, path, fields):
+        """
+        Returns only the requested fields of the info for given path.
+
+        Cheap fields (``name``, ``size``, ``ts``, ``phash``) are served from a
+        minimal stat, without sniffing the mime-type, evaluating subfolders
+        etc. Expensive fields are computed only if they are requested:
+        ``mime`` sniffs the content of files, ``dirs`` lists directories.
+        Key ``hash`` is always present.
+
+        Hidden items are flagged as such in key ``hidden``, even if that was
+        not requested.
+
+        :param path: Path of item
+        :param fields: Iterable of field names, see :attr:`INFO_FIELDS`
+        :returns: Dict
+        """
+        fields = set(fields)
+        light = self._stat_light(path)
+        is_root = (path == self._root_path)
+        stat = { 'hash' : self.encode(path) }
+        if 'name' in fields:
+            stat['name'] = self._root_alias if is_root else self._basename(path)
+        if 'phash' in fields and not is_root:
+            stat['phash'] = self.encode(self._dirname(path))
+        if 'volumeid' in fields and is_root:
+            stat['volumeid'] = self.volume_id
+        if 'size' in fields:
+            stat['size'] = light['size']
+        if 'ts' in fields:
+            stat['ts'] = light['ts']
+        # Mime is needed to tell hiddenness if only certain mimes are shown
+        mime = None
+        if 'mime' in fields or (self._only_mimes and not light['dir']):
+            mime = 'directory' if light['dir'] else self.mimetype(path)
+            if 'mime' in fields:
+                stat['mime'] = mime
+        hidden = not is_root and (
+            self.acl_perm(path=path, perm_name='hidden', val=False)
+            or (mime is not None and not self.mime_accepted(mime)))
+        if hidden or 'hidden' in fields:
+            stat['hidden'] = int(hidden)
+        read = self.acl_perm(path=path, perm_name='read', val=light['read'])
+        if 'read' in fields:
+            stat['read'] = int(read)
+        if 'write' in fields:
+            stat['write'] = int(self.acl_perm(path=path, perm_name='write',
+                val=light['write']))
+        if 'locked' in fields:
+            stat['locked'] = int(is_root or self.acl_perm(path=path,
+                perm_name='locked', val=False))
+        if 'dirs' in fields and light['dir'] and read and not hidden:
+            if not self._options['checkSubfolders'] or self._has_subdirs(path):
+                stat['dirs'] = 1
+        return stat
+
+    def probe(self, path):
+        """
+        Returns whether an item exists, and its permissions.
+
+        Commands that create or overwrite an item need to know only that;
+        unlike :meth:`stat()`, no mime-type is determined, subfolders are
+        not looked for, and no hash is encoded.
+
+        :param path: Path of item
+        :returns: None if item does not exist, else dict with keys ``dir``,
+                  ``read``, ``write``, ``locked`` and ``hidden``. Hiddenness
+                  is told by the ACL only, not by the accepted mime-types.
+        """
+        try:
+            light = self._stat_light(path)
+        except exc.FinderError:
+            return None
+        is_root = (path == self._root_path)
+        return dict(
+            dir=light['dir'],
+            read=int(self.acl_perm(path=path, perm_name='read',
+                val=light['read'])),
+            write=int(self.acl_perm(path=path, perm_name='write',
+                val=light['write'])),
+            locked=int(is_root or self.acl_perm(path=path,
+                perm_name='locked', val=False)),
+            hidden=int(not is_root and self.acl_perm(path=path,
+                perm_name='hidden', val=False))
+        )
+
+    def info(self, hashes, fields=None):
+        """
+        Returns info for several items at once.
+
+        Items that do not exist or are hidden are skipped.
+
+        :param hashes: List of hashes of items
+        :param fields: If None, returns complete stats. Else returns only
+                       these fields, see :meth:`stat_fields()`
+        :returns: List of stats
+        """
+        files = []
+        for hash_ in hashes:
+            try:
+                path = self.decode(hash_)
+                if fields is None:
+                    stat = self.cached_stat(path)
+                else:
+                    stat = self.stat_fields(path, fields)
+            except exc.FinderError:
+                continue
+            if self.is_hidden(stat):
+                continue
+            files.append(stat)
+        return files
+
     def update_quota(self):
         self._update_quota()
 
+    def flush(self):
+        """
+        Makes the changes of the current command durable.
+
+        Finder calls this after each command, also if the command failed.
+        With option ``durability`` set to 'batch', the driver syncs here all
+        files and directories it wrote, which is much cheaper than syncing
+        each one on its own. Base implementation does nothing; drivers that
+        write to storage override it.
+        """
+        pass
+
     # Renamed from scandir()
     def ls_stats_hash(self, hash_):
         """
@@ -367,6 +528,48 @@ class VolumeDriver(object):
         dirs[:0] = [ stat ]
         return dirs
 
+    def parents(self, hash_, depth=0):
+        """
+        Returns stats of all ancestors of a directory and their subfolders.
+
+        Ancestors are resolved up to the root in one pass. Each level is
+        listed only once, and every directory is stat'ed only once, using the
+        stat cache. The subfolders of the directory itself are included
+        down to ``depth``.
+
+        :param hash_: Hash of directory
+        :param depth: Depth of subtree of directory; defaults to tree depth
+                      of volume
+        :returns: List of stats
+        """
+        if not depth:
+            depth = self._tree_depth
+        current = self.stat_dir(hash_)
+        path = self.decode(hash_)
+        tree = [ current ]
+        seen = set([ path ])
+        for st in self._tree_stats(path, depth):
+            p = self.decode(st['hash'])
+            if not self.is_hidden(st) and p not in seen:
+                seen.add(p)
+                tree.append(st)
+        while path != self._root_path:
+            path = self._dirname(path)
+            stat = self.cached_stat(path)
+            if self.is_hidden(stat) or not stat['read']:
+                raise exc.FinderError(exc.ERROR_PERM_DENIED)
+            if path not in seen:
+                seen.add(path)
+                tree.append(stat)
+            for p in self._subdirs(path):
+                if p in seen:
+                    continue
+                seen.add(p)
+                st = self.cached_stat(p)
+                if not self.is_hidden(st):
+                    tree.append(st)
+        return tree
+
     def mkdir(self, cur, name):
         """
         Creates directory and returns its stat
@@ -388,17 +591,79 @@ class VolumeDriver(object):
         # Do not overwrite existing object
         cur_path = self.decode(cur)
         new_path = self._joinpath(cur_path, name)
-        try:
-            self.stat(new_path)
-            exists = True
-        except exc.FinderError:
-            exists = False
-        if exists:
+        if self.probe(new_path):
             raise exc.FinderError(exc.ERROR_EXISTS, name)
 
         # Create subdir and return its stat
         return self.stat( self._mkdir(cur_path, name) )
 
+    def mkdirs(self, cur, dirs):
+        """
+        Creates a tree of directories in one go, e.g. to upload a folder.
+
+        ``dirs`` are paths relative to ``cur``, with '/' as separator, e.g.
+        ``['/photos', '/photos/2013/summer']``. Missing parents are created
+        too, parents before children, each directory only once. Directories
+        that already exist are used as they are. Only existing parents are
+        stat'ed to check permissions; for those created here, the ACL is
+        consulted.
+
+        :param cur: Hash of current directory
+        :param dirs: List of relative paths
+        :returns: 2-tuple:
+                  [0] List of stats of created directories,
+                  [1] Dict that maps each of ``dirs`` to the hash of its
+                      directory
+        """
+        # Check that command is not disabled
+        self.check_command('mkdir')
+        # Need write permission on current dir
+        cur_stat = self.stat_dir(cur)
+        if not self.is_writeable(cur_stat):
+            raise exc.FinderError(exc.ERROR_PERM_DENIED)
+        cur_path = self.decode(cur)
+
+        # Relative paths of all dirs to create, as tuples of names
+        checked = set()
+        wanted = {}
+        for d in dirs:
+            names = tuple(n for n in d.replace('\\', '/').split('/') if n)
+            if not names:
+                raise exc.FinderError(exc.ERROR_INV_PARAMS, 'mkdir', 'dirs')
+            for name in names:
+                if name not in checked:
+                    if name in ('.', '..'):
+                        raise exc.FinderError(exc.ERROR_INVALID_NAME)
+                    self.check_name(name)
+                    checked.add(name)
+            wanted[d] = names
+        todo = set()
+        for names in wanted.values():
+            for i in range(1, len(names) + 1):
+                todo.add(names[:i])
+
+        paths = { () : cur_path }
+        created = []
+        is_created = set()
+        for names in sorted(todo, key=len):
+            parent = paths[names[:-1]]
+            if parent not in is_created and parent != cur_path:
+                # Existing dir, check it like the current dir
+                parent_stat = self.cached_stat(parent)
+                if not self.is_writeable(parent_stat):
+                    raise exc.FinderError(exc.ERROR_PERM_DENIED)
+            elif not self.acl_perm(path=parent, perm_name='write', val=True):
+                raise exc.FinderError(exc.ERROR_PERM_DENIED)
+            path, is_new = self._mkdir(parent, names[-1], exist_ok=True)
+            paths[names] = path
+            if is_new:
+                created.append(path)
+                is_created.add(path)
+        added = [ self.stat(p) for p in created ]
+        hashes = dict((d, self.encode(paths[names]))
+            for d, names in wanted.items())
+        return (added, hashes)
+
     def mkfile(self, cur, name):
         """
         Creates file and returns its stat
@@ -420,12 +685,7 @@ class VolumeDriver(object):
         # Do not overwrite existing object
         cur_path = self.decode(cur)
         new_path = self._joinpath(cur_path, name)
-        try:
-            self.stat(new_path)
-            exists = True
-        except exc.FinderError:
-            exists = False
-        if exists:
+        if self.probe(new_path):
             raise exc.FinderError(exc.ERROR_EXISTS, name)
 
         # Create file and return its stat
@@ -435,71 +695,242 @@ class VolumeDriver(object):
         """
         Paste file to destination
 
+        See :meth:`paste_many()`.
+
         :param src_vol: Source volume
         :param src: Hash of source dir/file
         :param dst: Hash of destination dir/file
         :param cut: True=Move (Source is deleted), False=Copy
+        :returns: 2-tuple (stat of new item, hash of removed source or None)
+        """
+        return self.paste_many(src_vol, [ src ], dst, cut)[0]
+
+    def paste_many(self, src_vol, targets, dst, cut=False):
+        """
+        Pastes items of one volume into a destination directory.
+
+        All items are checked before anything is copied. If the name of an
+        item is taken in the destination, the existing item is overwritten
+        if that is allowed, see :meth:`_may_overwrite()`. Else the new item
+        gets a unique name; the names of all such items are determined with
+        one listing of the destination, see :meth:`unique_names()`. Quota
+        is checked for all items at once.
+
+        :param src_vol: Source volume
+        :param targets: List of hashes of source items
+        :param dst: Hash of destination dir
+        :param cut: True=Move (Sources are deleted), False=Copy
+        :returns: List of 2-tuples (stat of new item, hash of removed source
+                  or None)
         """
         # Check that command is not disabled
         if cut:
             self.check_command('move')
         else:
             self.check_command('copy')
-        
-        src_stat = self.stat_file(src)
-        src_path = self.decode(src)
+
         dst_stat = self.stat_dir(dst)
         dst_path = self.decode(dst)
-        
-        # Check quota
-        if self.free_size < src_stat['size']:
-            raise exc.FinderError(exc.PYM_ERROR_QUOTA_EXCEEDED.format(self.free_size))
-        # Must have write permission on destination and read on source
-        if not self.is_writeable(dst_stat) or not self.is_readable(src_stat):
+        # Must have write permission on destination
+        if not self.is_writeable(dst_stat):
             raise exc.FinderError(exc.ERROR_PERM_DENIED)
-        # On move, do not allow to remove source if source or one of its
-        # children is locked
-        if cut:
-            if src_vol.find_child_by_perm(src_path, 'locked'):
+        # Copy/move from another volume
+        if src_vol != self:
+            if not src_vol._options['copyFrom']:
+                raise exc.FinderError(exc.ERROR_COPY_FROM)
+            if not self._options['copyTo']:
+                raise exc.FinderError(exc.ERROR_COPY_TO)
+            if cut:
+                # Source is removed after copying
+                src_vol.check_command('rm')
+
+        items = []
+        for src in targets:
+            src_stat = src_vol.stat_file(src)
+            src_path = src_vol.decode(src)
+            # Must have read permission on source
+            if not self.is_readable(src_stat):
                 raise exc.FinderError(exc.ERROR_PERM_DENIED)
-        # If dst subitem exists...
-        dst_fullpath = self._joinpath(dst_path, src_stat['name'])
-        can_overwrite = False
-        try:
-            dstfull_stat = self.stat(dst_fullpath)
-        except exc.FinderError:
-            dstfull_stat = False # Dst does not exist
-        else:
-            # Can overwrite dstfull if ...
-            can_overwrite = (
-                # ... have write permission on dstfull 
-                self.is_writeable(dstfull_stat)
-                # ... overwriting is allowed in options
-                and self._options.get('copyOverwrite', False)
-                # ... neither dstfull nor any of its children are locked
-                and not self.find_child_by_perm(dst_fullpath, 'locked', True)
-                # ... and src and dstfull are of same type, i.e.
-                #     do not replace file with dir or dir with file.
-                and self.is_same_type(src_stat['mime'], dstfull_stat['mime'])
-            )
+            # On move, do not allow to remove source if source or one of its
+            # children is locked, or if its directory is not writeable
+            if cut:
+                if src_vol.find_child_by_perm(src_path, 'locked'):
+                    raise exc.FinderError(exc.ERROR_PERM_DENIED)
+                if (src_path == src_vol._root_path or not src_vol.is_writeable(
+                        src_vol.stat(src_vol._dirname(src_path)))):
+                    raise exc.FinderError(exc.ERROR_PERM_DENIED)
+                # Hidden and unreadable items are not copied to another
+                # volume, so they would be lost when the source is removed
+                if src_vol != self and (
+                        src_vol.find_child_by_perm(src_path, 'hidden', 1)
+                        or src_vol.find_child_by_perm(src_path, 'read', 0)):
+                    raise exc.FinderError(exc.ERROR_PERM_DENIED)
+            items.append((src, src_path, src_stat))
+
+        # Check quota; moving inside the volume does not change it
+        if src_vol != self or not cut:
+            size = sum(src_vol._tree_size(src_path)
+                for _, src_path, _ in items)
+            if self.free_size < size:
+                raise exc.FinderError(exc.PYM_ERROR_QUOTA_EXCEEDED.format(self.free_size))
+
+        # Names in destination. An item whose name is taken, by an existing
+        # item that may not be overwritten or by another pasted item, gets
+        # a unique name.
+        names = [ None ] * len(items)
+        # Types of existing items to overwrite, by index
+        overwrite = {}
+        clashes = []
+        for i, (_, src_path, src_stat) in enumerate(items):
+            name = src_stat['name']
+            dst_fullpath = self._joinpath(dst_path, name)
+            probe = None
+            if name not in names:
+                probe = self.probe(dst_fullpath)
+                if not probe or self._may_overwrite(src_vol, src_path,
+                        src_stat, dst_fullpath, probe):
+                    names[i] = name
+                    if probe:
+                        overwrite[i] = probe['dir']
+                    continue
+            clashes.append(i)
+        new_names = self.unique_names(dst_path,
+            [ items[i][2]['name'] for i in clashes ],
+            reserved=[ n for n in names if n is not None ])
+        for i, name in zip(clashes, new_names):
+            names[i] = name
+
+        result = []
+        for i, ((src, src_path, _), dst_name) in enumerate(zip(items, names)):
+            # An item to overwrite is replaced only after the new one was
+            # copied under a temporary name, so it is not lost if copying
+            # fails.
+            tmp_name = dst_name
+            if i in overwrite:
+                tmp_name = '.{0}.{1}.paste'.format(dst_name,
+                    uuid.uuid4().hex[:12])
+            # Copy/move inside current volume
+            if src_vol == self:
+                if cut:
+                    added = self.move(src_path, dst_path, tmp_name)
+                else:
+                    added = self.copy(src_path, dst_path, tmp_name)
+            else:
+                added = self._paste_from(src_vol, src_path, dst_path,
+                    tmp_name, cut)
+            if i in overwrite:
+                path = self._joinpath(dst_path, dst_name)
+                self._remove_existing(path, overwrite[i])
+                added = self._rename(added, path)
+            result.append((self.stat(added), src if cut else None))
+        return result
+
+    def _may_overwrite(self, src_vol, src_path, src_stat, path, probe):
+        """
+        Returns True if a pasted item may overwrite an existing item, i.e.
+        if ...
 
-        if dstfull_stat and can_overwrite:
-            dst_name = self.unique_name(dst_path, src_stat['name'])
+        :param src_vol: Source volume
+        :param src_path: Path of source item
+        :param src_stat: Stat of source item
+        :param path: Path of existing item
+        :param probe: Probe of existing item, see :meth:`probe()`
+        """
+        return bool(
+            # ... it is not the source itself
+            not (src_vol == self and path == src_path)
+            # ... have write permission on existing item
+            and probe['write']
+            # ... overwriting is allowed in options
+            and self._options.get('copyOverwrite', False)
+            # ... neither existing item nor any of its children are locked
+            and not self.find_child_by_perm(path, 'locked', True)
+            # ... and source and existing item are of same type, i.e.
+            #     do not replace file with dir or dir with file.
+            and (src_stat['mime'] == 'directory') == probe['dir']
+        )
+
+    def _remove_existing(self, path, is_dir):
+        """
+        Removes an item that is overwritten by a pasted one.
+        """
+        if is_dir:
+            self._remove_tree(path)
         else:
-            dst_name = src_stat['name']
-        
-        # Copy/move inside current volume
-        if (src_vol == self):
+            self._remove(path)
+
+    def _paste_from(self, src_vol, src_path, dst_path, name, cut=False):
+        """
+        Copies or moves an item from another volume.
+
+        If both volumes keep their items as plain files in the local
+        filesystem, see :meth:`_local_path()`, the item is copied or moved
+        with :meth:`_copy()` or :meth:`_move()`, i.e. kernel-side, or even
+        just renamed if both are on the same filesystem. Else it is streamed
+        through the FS API of both drivers, see :meth:`_stream_from()`.
+
+        :param src_vol: Source volume
+        :param src_path: Path of source item in ``src_vol``
+        :param dst_path: Path of destination directory
+        :param name: Name of item in destination
+        :param cut: True=Move, False=Copy
+        :returns: Path of new item
+        """
+        src_local = src_vol._local_path(src_path)
+        if (src_local is not None and self._local_path(dst_path) is not None
+                and not src_vol.find_child_by_perm(src_path, 'hidden', 1)
+                and not src_vol.find_child_by_perm(src_path, 'read', 0)):
             if cut:
-                added = self.stat(self.move(src_path, dst_path, dst_name))
-                removed = src # Hash!
+                return self._move(src_local, dst_path, name)
+            return self._copy(src_local, dst_path, name)
+        try:
+            path = self._stream_from(src_vol, src_path, dst_path, name)
+        except:
+            # Remove the partial copy
+            partial = self._joinpath(dst_path, name)
+            try:
+                probe = self.probe(partial)
+                if probe:
+                    self._remove_existing(partial, probe['dir'])
+            except exc.FinderError:
+                pass
+            raise
+        if cut:
+            src_vol._remove_tree(src_path)
+        return path
+
+    def _stream_from(self, src_vol, src_path, dst_path, name):
+        """
+        Copies an item from another volume through the FS API.
+
+        The directory structure is created with :meth:`_mkdir()`, and the
+        content of each file is read from ``src_vol`` and written with
+        :meth:`_save_uploaded()` in blocks, so memory use is bounded
+        regardless of the file size. Hidden and unreadable descendants are
+        left out.
+
+        :param src_vol: Source volume
+        :param src_path: Path of source item in ``src_vol``
+        :param dst_path: Path of destination directory
+        :param name: Name of item in destination
+        :returns: Path of new item
+        """
+        top = None
+        stack = [ (src_path, dst_path, name) ]
+        while stack:
+            src, dst_dir, name = stack.pop()
+            if src_vol._stat_light(src)['dir']:
+                path = self._mkdir(dst_dir, name)
+                for p in src_vol._ls_names(src):
+                    st = src_vol.stat(p)
+                    if src_vol.is_hidden(st) or not src_vol.is_readable(st):
+                        continue
+                    stack.append((p, path, st['name']))
             else:
-                added = self.stat(self.copy(src_path, dst_path, dst_name))
-                removed = None
-            return (added, removed)
-        
-        #copy/move from another volume
-        raise NotImplementedError("Copying/Moving over different volumes is not yet implemented.")
+                path = self._save_uploaded(src_vol._file(src), dst_dir, name)
+            if top is None:
+                top = path
+        return top
 
     def move(self, src_path, dst_path, name):
         """
@@ -524,33 +955,176 @@ class VolumeDriver(object):
         Name of copy will be original name suffixed with "(copy #)", where "#"
         is a running number.
         """
+        return self.duplicate_many([ hash_ ])[0]
+
+    def duplicate_many(self, targets):
+        """
+        Creates copies of items.
+
+        Names of the copies are determined with one listing per directory,
+        see :meth:`unique_names()`. Quota is checked for all copies before
+        anything is copied.
+
+        :param targets: List of hashes of items
+        :returns: List of stats of copies
+        """
         self.check_command('duplicate')
         
-        path = self.decode(hash_)
-        dir_ = self._dirname(path)
-        new_name = self.unique_name(dir_, self._basename(path))
+        paths = [ self.decode(hash_) for hash_ in targets ]
+        # Indexes of paths by directory
+        by_dir = OrderedDict()
+        for i, path in enumerate(paths):
+            by_dir.setdefault(self._dirname(path), []).append(i)
+        new_names = [ None ] * len(paths)
+        for dir_, indexes in by_dir.items():
+            names = self.unique_names(dir_,
+                [ self._basename(paths[i]) for i in indexes ])
+            for i, name in zip(indexes, names):
+                new_names[i] = name
 
         # Check quota
-        stat = self.stat(path)
-        if self.free_size < stat['size']:
+        size = sum(self._tree_size(path) for path in set(paths))
+        if self.free_size < size:
             raise exc.FinderError(exc.PYM_ERROR_QUOTA_EXCEEDED.format(self.free_size))
         # TODO check permission to create new item.
 
-        return self.stat(self.copy(path, dir_, new_name))
+        return [ self.stat(self.copy(path, self._dirname(path), name))
+            for path, name in zip(paths, new_names) ]
 
     def remove(self, hash_):
         """
         Removes item.
 
-        Only an empty directory gets removed.
+        A directory is removed with all its content, see
+        :meth:`remove_many()`.
 
         :param hash_: Hash of item to remove
-        :returns: Full path of removed item
+        :returns: Hash of removed item
         """
-        self.check_command('duplicate')
-        path = self.decode(hash_)
-        # TODO check permission to remove this item.
-        return self.encode(self._remove(path))
+        return self.remove_many([ hash_ ])[0]
+
+    def remove_many(self, targets):
+        """
+        Removes items; directories with all their content.
+
+        All items are checked before anything is removed, so that nothing is
+        removed if one of them may not be. An item may not be removed if it
+        is the root, if its directory is not writeable, or if the item or
+        one of its descendants is locked.
+
+        If option ``trash`` is set, items are moved into trash, from where
+        they can be restored, see :meth:`restore()`. Else directories are
+        removed with :meth:`_remove_tree()`; a driver may defer the actual
+        deletion, see e.g. the local filesystem driver.
+
+        :param targets: List of hashes of items
+        :returns: List of hashes of removed items
+        """
+        self.check_command('rm')
+        paths = [ self._check_remove(target) for target in targets ]
+        now = time.time()
+        for path, is_dir in paths:
+            if self._options.get('trash'):
+                self._to_trash(path, dict(path=self._relpath(path),
+                    name=self._basename(path), ts=now, dir=is_dir))
+            elif is_dir:
+                self._remove_tree(path)
+            else:
+                self._remove(path)
+        return [ self.encode(path) for path, _ in paths ]
+
+    def trash_list(self):
+        """
+        Returns the items in trash, most recently removed first.
+
+        :returns: List of dicts with keys ``id`` (to restore the item),
+                  ``name``, ``path`` (alias path of the directory the item
+                  was removed from), ``ts`` (time of removal), ``size``
+                  (total size of files) and ``mime``. Empty if option
+                  ``trash`` is not set.
+        """
+        self.check_command('trash')
+        if not self._options.get('trash'):
+            return []
+        items = []
+        for id_, meta in self._trash_entries():
+            path = self._abspath(meta['path'])
+            # Size is determined here, so that removing stays a rename
+            items.append(dict(id=id_, name=meta['name'],
+                path=self._aliaspath(self._dirname(path)),
+                ts=meta['ts'], size=self._trash_size(id_),
+                mime='directory' if meta['dir'] else
+                    (self.mimetype_internal_detect(meta['name'])
+                    or 'application/octet-stream')))
+        items.sort(key=lambda it: it['ts'], reverse=True)
+        return items
+
+    def restore(self, ids):
+        """
+        Restores items from trash to where they were removed from.
+
+        Missing parent directories are created again. If an item of that
+        name exists, the restored item gets a unique name.
+
+        :param ids: List of IDs of items in trash, see :meth:`trash_list()`
+        :returns: List of stats of restored items
+        :raises: FinderError if an item is not in trash, or option ``trash``
+                 is not set
+        """
+        self.check_command('restore')
+        if not self._options.get('trash'):
+            raise exc.FinderError(exc.ERROR_FILE_NOT_FOUND)
+        added = []
+        for id_ in ids:
+            meta = self._trash_meta(id_)
+            path = self._abspath(meta['path'])
+            dst_dir = self._restore_dir(self._dirname(path))
+            name = self._basename(path)
+            if self._exists(self._joinpath(dst_dir, name)):
+                name = self.unique_name(dst_dir, name, " (restored #)")
+            added.append(self.stat(self._from_trash(id_, dst_dir, name)))
+        return added
+
+    def _restore_dir(self, path):
+        """
+        Returns path of a directory to restore an item into, and creates it
+        with its missing parents.
+
+        :raises: FinderError if directory is not writeable
+        """
+        missing = []
+        p = path
+        while p != self._root_path and not self._exists(p):
+            missing.append(p)
+            p = self._dirname(p)
+        for p in reversed(missing):
+            self._mkdir(self._dirname(p), self._basename(p), exist_ok=True)
+        if not self.is_writeable(self.stat(path)):
+            raise exc.FinderError(exc.ERROR_PERM_DENIED)
+        return path
+
+    def _check_remove(self, target):
+        """
+        Checks that an item may be removed.
+
+        :param target: Hash of item
+        :returns: 2-tuple (path, True if item is a directory)
+        :raises: FinderError if item may not be removed
+        """
+        path = self.decode(target)
+        if path == self._root_path:
+            raise exc.FinderError(exc.ERROR_PERM_DENIED)
+        try:
+            stat = self.stat(path)
+        except exc.FinderError as e:
+            raise exc.FinderError(exc.ERROR_FILE_NOT_FOUND, e)
+        if self.is_hidden(stat):
+            raise exc.FinderError(exc.ERROR_FILE_NOT_FOUND)
+        if not self.is_writeable(self.cached_stat(self._dirname(path))):
+            raise exc.FinderError(exc.ERROR_PERM_DENIED)
+        if self.find_child_by_perm(path, 'locked', True):
+            raise exc.FinderError(exc.ERROR_LOCKED, stat['name'])
+        return (path, stat['mime'] == 'directory')
 
     def upload(self, fo, dst):
         """
@@ -565,47 +1139,315 @@ class VolumeDriver(object):
         # Command "upload" allowed?
         self.check_command('upload')
 
-        dst_dir_stat = self.stat_dir(dst)
-        dst_dir_path = self.decode(dst)
         dst_fn = fo.filename
+        dst_dir_path = self._check_upload_dst(dst, dst_fn)
 
-        # Filename OK?
-        self.check_name(dst_fn)
-        dst_f_path = self._joinpath(dst_dir_path, dst_fn)
-        
-        # Allowed to write into dst dir?
-        if not self.is_writeable(dst_dir_stat):
-            raise exc.FinderError(exc.ERROR_PERM_DENIED)
-        # If file exists, allowed to overwrite?
-        try:
-            stat = self.stat(dst_f_path)
-        except exc.FinderError:
-            pass # File does not exist -> upload OK
+        # Save file on volume and return its stat. Size, quota and mime-type
+        # are checked while copying, so the upload is read only once.
+        return self.stat( self._save_checked(fo, dst_dir_path,
+            max(self.free_size, 0)) )
+
+    def upload_many(self, files, dst, upload_path=None):
+        """
+        Stores several uploaded files concurrently.
+
+        Files are written by a pool of at most ``uploadThreads`` threads.
+        Quota is reserved for the whole batch before writing, so that the
+        concurrent uploads together cannot exceed it: files whose size is
+        known upfront (e.g. spooled to disk) reserve exactly that; files of
+        unknown size are written one at a time against the remaining space.
+
+        A failing file does not abort the others. The stats of all saved
+        files are determined afterwards in one pass.
+
+        If ``files`` is not a list but an iterator, e.g. of parts read by
+        :func:`~pym_elfinder.multipart.parse_upload()` straight from the
+        request, the files are saved one after the other as they arrive.
+
+        To upload a folder, create its directories with :meth:`mkdirs()`
+        first, and pass the hashes of the directories the files go into as
+        ``upload_path``.
+
+        :param files: List of objects of uploaded files, see :meth:`upload()`
+        :param dst: Hash of destination directory
+        :param upload_path: Optional list of hashes of destination
+                            directories, one per file; a missing or empty
+                            entry means ``dst``
+        :returns: 2-tuple:
+                  [0] List of stats of added files, in order of ``files``,
+                  [1] List of 2-tuples (file name, FinderError)
+        """
+        # Command "upload" allowed?
+        self.check_command('upload')
+        upload_path = upload_path or []
+
+        def dst_of(i):
+            return upload_path[i] if i < len(upload_path) and upload_path[i] \
+                else dst
+
+        if not isinstance(files, (list, tuple)):
+            return self._upload_stream(files, dst_of)
+        reservation = uploads.QuotaReservation(max(self.free_size, 0))
+        jobs = []
+        errors = {}
+        for i, fo in enumerate(files):
+            try:
+                dst_dir_path = self._check_upload_dst(dst_of(i), fo.filename)
+                size = uploads.known_size(fo.file)
+                if size is not None:
+                    if size > self._upload_max_size:
+                        raise exc.FinderError(exc.ERROR_UPLOAD_FILE_SIZE)
+                    if not reservation.reserve(size):
+                        raise exc.FinderError(exc.PYM_ERROR_QUOTA_EXCEEDED.format(
+                            reservation.available))
+            except exc.FinderError as e:
+                fo.file.close()
+                errors[i] = e
+                continue
+            jobs.append((i, fo, dst_dir_path, size))
+
+        def save(job):
+            i, fo, dst_dir_path, size = job
+            if size is not None:
+                return self._save_checked(fo, dst_dir_path, size)
+            with reservation.lock:
+                path = self._save_checked(fo, dst_dir_path,
+                    reservation.available)
+                reservation.reserve(self._stat_light(path)['size'])
+            return path
+
+        paths = {}
+        threads = min(int(self._options['uploadThreads']), len(jobs))
+        if threads > 1:
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                futures = [ (job[0], pool.submit(save, job)) for job in jobs ]
+                for i, future in futures:
+                    try:
+                        paths[i] = future.result()
+                    except exc.FinderError as e:
+                        errors[i] = e
         else:
-            if (
-                not self._options['uploadOverwrite']
-                or not self.is_writeable(stat)
-                or self.is_locked(stat)
-            ):
-                raise exc.FinderError(exc.ERROR_PERM_DENIED)
+            for job in jobs:
+                try:
+                    paths[job[0]] = save(job)
+                except exc.FinderError as e:
+                    errors[job[0]] = e
+        # Stat results in one pass
+        added = [ self.stat(paths[i]) for i in sorted(paths) ]
+        return (added, [ (files[i].filename, errors[i])
+            for i in sorted(errors) ])
+
+    def _upload_stream(self, files, dst_of):
+        """
+        Saves files of an iterator one by one, see :meth:`upload_many()`.
+
+        Each file is read once, while it is written into the volume.
+
+        :param files: Iterator of objects of uploaded files
+        :param dst_of: Callable that returns hash of destination directory
+                       for index of file
+        """
+        added = []
+        errors = []
+        free = max(self.free_size, 0)
+        for i, fo in enumerate(files):
+            try:
+                dst_dir_path = self._check_upload_dst(dst_of(i), fo.filename)
+                path = self._save_checked(fo, dst_dir_path, free)
+            except exc.FinderError as e:
+                errors.append((fo.filename, e))
+                continue
+            added.append(path)
+            free -= self._stat_light(path)['size']
+        return ([ self.stat(p) for p in added ], errors)
+
+    def _save_checked(self, fo, dst_dir_path, quota):
+        """
+        Saves an uploaded file, checking size, quota and mime-type inline.
+
+        The mime-type is sniffed from the first bytes of the upload and
+        checked against ``uploadAllow``, ``uploadDeny`` and ``uploadOrder``
+        before anything is written, so a file of a forbidden type is
+        rejected without transferring the rest of it. The detected
+        mime-type is remembered for the new file, see :meth:`cache_mime()`.
+
+        :param fo: Object of uploaded file
+        :param dst_dir_path: Path of destination directory
+        :param quota: Maximum size of file as allowed by quota
+        :returns: Path of saved file
+        """
+        detected = {}
+
+        def inspect(head):
+            mime = self.sniff_mimetype(head, fo.filename)
+            if not self.upload_allowed(mime):
+                raise exc.FinderError(exc.ERROR_UPLOAD_FILE_MIME)
+            detected['mime'] = mime
+
+        path = self._save_uploaded(fo.file, dst_dir_path, fo.filename,
+            self._upload_max_size, quota, inspect)
+        if 'mime' in detected:
+            self.cache_mime(path, detected['mime'])
+        return path
+
+    def upload_chunk(self, fo, dst, chunk, cid, range_):
+        """
+        Stores a chunk of an uploaded file.
+
+        Implements elFinder's chunked upload protocol. The chunks of a file
+        are written into a staging file at their offsets, so they may arrive
+        in any order, in parallel, and be resent after a dropped connection.
+        See :meth:`upload_status()`.
 
-        # Check size
-        def get_size(fd):
-            fd.seek(0, os.SEEK_END) # Seek to the end of the file
-            size = fd.tell() # Get the position of EOF
-            fd.seek(0) # Reset the file position to the beginning
-            return size
-        sz = get_size(fo.file)
-        if sz > self._upload_max_size:
+        When the last missing chunk arrived, the result has keys
+        ``_chunkmerged`` and ``_name``. The client then finishes the upload
+        with another request, see :meth:`upload_chunked()`.
+
+        :param fo: Object of uploaded chunk, with property ``file``
+        :param dst: Hash of destination directory
+        :param chunk: Name of chunk, "<filename>.<index>_<last index>.part"
+        :param cid: Upload ID chosen by the client
+        :param range_: Range of chunk, "<start>,<length>,<total size>"
+        :returns: Dict
+        """
+        # Command "upload" allowed?
+        self.check_command('upload')
+        parsed = uploads.parse_chunk_name(chunk)
+        if not parsed:
+            raise exc.FinderError(exc.ERROR_INV_PARAMS, 'upload', 'chunk')
+        dst_fn, index, last = parsed
+        start, length, total = uploads.parse_chunk_range(range_)
+        self._check_upload_dst(dst, dst_fn)
+        # Check size and quota of complete file upfront
+        if total > self._upload_max_size:
             raise exc.FinderError(exc.ERROR_UPLOAD_FILE_SIZE)
-        # Check quota
-        if self.free_size < sz:
+        if self.free_size < total:
             raise exc.FinderError(exc.PYM_ERROR_QUOTA_EXCEEDED.format(self.free_size))
+        store = self._chunk_store()
+        key = store.key(cid, dst_fn)
+        if index == 0:
+            store.purge(self._options['uploadChunkTTL'])
+        try:
+            complete = store.write(key, index, last, start, length, total,
+                fo.file)
+        finally:
+            fo.file.close()
+        result = dict(added=[])
+        if complete:
+            result['_chunkmerged'] = key
+            result['_name'] = dst_fn
+        return result
 
-        # TODO Check mime types
-        
-        # Save file on volume and return its stat
-        return self.stat( self._save_uploaded(fo.file, dst_dir_path, dst_fn) )
+    def upload_chunked(self, key, dst, name):
+        """
+        Moves a completely uploaded file from staging into its destination.
+
+        Checks of destination, size, quota and mime-type are repeated,
+        since they may have changed while the chunks were uploaded. The
+        staging file is then moved atomically into place.
+
+        :param key: Key of upload, as returned in ``_chunkmerged``
+        :param dst: Hash of destination directory
+        :param name: Name of file, as returned in ``_name``
+        :returns: Stat of uploaded file
+        """
+        self.check_command('upload')
+        dst_dir_path = self._check_upload_dst(dst, name)
+        store = self._chunk_store()
+        if not store.is_complete(key):
+            raise exc.FinderError(exc.ERROR_UPLOAD_TRANSFER, name)
+        staged = store.data_path(key)
+        try:
+            sz = os.path.getsize(staged)
+            if sz > self._upload_max_size:
+                raise exc.FinderError(exc.ERROR_UPLOAD_FILE_SIZE)
+            if self.free_size < sz:
+                raise exc.FinderError(exc.PYM_ERROR_QUOTA_EXCEEDED.format(self.free_size))
+            mime = self.mimetype(staged, name)
+            if not self.upload_allowed(mime):
+                raise exc.FinderError(exc.ERROR_UPLOAD_FILE_MIME)
+            path = self._save_staged(staged, dst_dir_path, name)
+        finally:
+            store.discard(key)
+        self.cache_mime(path, mime)
+        return self.stat(path)
+
+    def upload_status(self, dst, chunk, cid):
+        """
+        Returns status of a chunked upload, so that the client can resume it.
+
+        :param dst: Hash of destination directory
+        :param chunk: Name of any chunk of the upload
+        :param cid: Upload ID chosen by the client
+        :returns: Dict, see :meth:`~pym_elfinder.uploads.ChunkStore.status()`
+        """
+        self.check_command('upload')
+        parsed = uploads.parse_chunk_name(chunk)
+        if not parsed:
+            raise exc.FinderError(exc.ERROR_INV_PARAMS, 'upload', 'chunk')
+        self._check_upload_dst(dst, parsed[0])
+        store = self._chunk_store()
+        return store.status(store.key(cid, parsed[0]))
+
+    def upload_allowed(self, mime):
+        """
+        Tells whether files of given mime-type may be uploaded.
+
+        Evaluates options ``uploadAllow`` and ``uploadDeny`` in the order
+        given by ``uploadOrder``: With order "deny, allow", a mime-type is
+        allowed unless it is denied and not explicitly allowed. With order
+        "allow, deny", it is denied unless it is allowed and not explicitly
+        denied.
+
+        :param mime: Mime-type of uploaded file
+        :returns: True/False
+        """
+        def matches(mimes):
+            return ('all' in mimes
+                or 'All' in mimes
+                or mime in mimes
+                or mime[0:mime.find('/')] in mimes
+            )
+        allowed = matches(self._upload_allow)
+        denied = matches(self._upload_deny)
+        if [ o.lower() for o in self._upload_order ][:1] == ['allow']:
+            return allowed and not denied
+        return allowed or not denied
+
+    def _check_upload_dst(self, dst, name):
+        """
+        Checks that a file with given name may be uploaded into ``dst``.
+
+        :param dst: Hash of destination directory
+        :param name: Name of uploaded file
+        :returns: Path of destination directory
+        """
+        dst_dir_path = self.decode(dst)
+        # Several files of a request go into the same dir, so stat it once
+        try:
+            dst_dir_stat = self.cached_stat(dst_dir_path)
+        except exc.FinderError:
+            raise exc.FinderError(exc.ERROR_DIR_NOT_FOUND)
+        if dst_dir_stat['mime'] != 'directory' or self.is_hidden(dst_dir_stat):
+            raise exc.FinderError(exc.ERROR_DIR_NOT_FOUND)
+
+        # Filename OK?
+        self.check_name(name)
+        dst_f_path = self._joinpath(dst_dir_path, name)
+
+        # Allowed to write into dst dir?
+        if not self.is_writeable(dst_dir_stat):
+            raise exc.FinderError(exc.ERROR_PERM_DENIED)
+        # If file exists, allowed to overwrite?
+        probe = self.probe(dst_f_path)
+        if probe and (
+            not self._options['uploadOverwrite']
+            or probe['dir']
+            or not probe['write']
+            or probe['locked']
+        ):
+            raise exc.FinderError(exc.ERROR_PERM_DENIED)
+        return dst_dir_path
 
     def rename(self, target, name):
         """
@@ -628,7 +1470,7 @@ class VolumeDriver(object):
         removed = target # Hash!
         return (added, removed)
 
-    def file(self, target):
+    def file(self, target, precondition=None):
         """
         Returns file-like object and info for target as a dict.
 
@@ -643,8 +1485,20 @@ class VolumeDriver(object):
 
         ``stat`` is the info as obtained from :meth:`~pym_elfinder.volume.volumedriver.VolumeDriver.stat()`.
 
+        ``etag`` is the entity tag as obtained from :meth:`etag()`.
+
+        ``precondition`` is an optional callable that is called with stat
+        and etag after all checks passed. If it returns False, the file is
+        not opened and the result has no key ``file``.
+
+        If the volume is configured to offload downloads to the web server
+        (option ``offload``), the file is not opened either. Instead, ``file``
+        is None, key ``offload`` has the name of the internal-redirect header,
+        and ``headers`` contains that header, see :meth:`offload_value()`.
+
         :param target: Hash of file
-        :returns: Dict with keys ``file`` and ``stat``
+        :param precondition: Callable(stat, etag)
+        :returns: Dict with keys ``file``, ``stat`` and ``etag``
         """
         # Command is enabled?
         self.check_command('file')
@@ -660,20 +1514,37 @@ class VolumeDriver(object):
         # Have read permission?
         if not self.is_readable(stat):
             raise exc.FinderAccessDenied()
+        result = dict(
+            stat = stat,
+            etag = self.etag(path, stat)
+        )
+        # Does caller need the content at all?
+        if precondition and not precondition(stat, result['etag']):
+            return result
+        # Let web server send the file?
+        offload = self._options.get('offload')
+        if offload:
+            value = self.offload_value(path)
+            if value:
+                result['file'] = None
+                result['offload'] = offload['header']
+                result['headers'] = { offload['header'] : value }
+                return result
         # Open target as file-like object
         try:
-            fd = self._file(path)
+            result['file'] = self._file(path)
         except exc.FinderError as e:
             raise exc.FinderNotFound(e)
-        # Return result
-        return dict(
-            file = fd,
-            stat = stat
-        )
+        return result
 
-    def get_content(self, target):
+    def get_content(self, target, precondition=None):
         """
+        ``precondition`` is an optional callable that is called with stat
+        and etag after all checks passed. If it returns False, the file is
+        not read and None is returned.
+
         :param target: Hash of file
+        :param precondition: Callable(stat, etag)
         :returns: File content as bytes or, for text files, as str
         """
         # Command is enabled?
@@ -690,6 +1561,9 @@ class VolumeDriver(object):
         # Have read permission?
         if not self.is_readable(stat):
             raise exc.FinderError(exc.ERROR_PERM_DENIED)
+        # Does caller need the content at all?
+        if precondition and not precondition(stat, self.etag(path, stat)):
+            return None
         # Get content
         if self.is_binary(stat):
             encoding = None
@@ -732,40 +1606,323 @@ class VolumeDriver(object):
             encoding = 'UTF-8'
         return self.stat(self._put_content(path, content, encoding=encoding))
 
+    def ls_archive(self, target, offset=0, limit=None):
+        """
+        Lists members of an archive without extracting it.
+
+        Only the zip central directory resp. the tar headers are read, member
+        data is never decompressed.
+
+        :param target: Hash of archive file
+        :param offset: Skip this many members
+        :param limit: Return at most this many members; None for all
+        :returns: 2-tuple:
+                  [0] List of dicts with keys ``name``, ``size``, ``mime``
+                      and ``ts``,
+                  [1] True if there are more members after the returned ones
+        """
+        # Command is enabled?
+        self.check_command('lsarchive')
+        path = self.decode(target)
+        # Target exists?
+        try:
+            stat = self.stat(path)
+        except exc.FinderError as e:
+            raise exc.FinderError(exc.ERROR_FILE_NOT_FOUND, e)
+        # Have read permission?
+        if not self.is_readable(stat):
+            raise exc.FinderError(exc.ERROR_PERM_DENIED)
+        # Target is an archive we can list?
+        try:
+            archiver = archivers.LISTERS[stat['mime']]
+        except KeyError:
+            raise exc.FinderError(exc.ERROR_NOT_ARCHIVE)
+        members = []
+        more = False
+        fd = self._file(path)
+        try:
+            try:
+                arc = archiver.open(fd)
+            except Exception as e:
+                raise exc.FinderError(exc.ERROR_NOT_ARCHIVE, e)
+            try:
+                for i, m in enumerate(arc.members()):
+                    if i < offset:
+                        continue
+                    if limit is not None and len(members) >= limit:
+                        more = True
+                        break
+                    if m['dir']:
+                        m['mime'] = 'directory'
+                        m['size'] = 0
+                    else:
+                        m['mime'] = (self.mimetype_internal_detect(m['name'])
+                            or 'application/octet-stream')
+                    del m['dir']
+                    members.append(m)
+            except exc.FinderError:
+                raise
+            except Exception as e:
+                raise exc.FinderError(exc.ERROR_ARCHIVE, e)
+            finally:
+                arc.close()
+        finally:
+            fd.close()
+        return (members, more)
+
+    def zip_entries(self, targets):
+        """
+        Returns entries of the given targets to stream them as zip archive.
+
+        Targets themselves are checked immediately, so that errors are
+        raised before any data is sent. Their descendants are walked lazily
+        while the archive is generated; hidden and unreadable items are left
+        out.
+
+        :param targets: List of hashes of files and directories
+        :returns: Generator of entries as expected by
+                  :class:`~pym_elfinder.archivers.ZipStream`
+        """
+        # Command is enabled?
+        self.check_command('zipdl')
+        paths = []
+        for target in targets:
+            path = self.decode(target)
+            # Target exists?
+            try:
+                stat = self.stat(path)
+            except exc.FinderError as e:
+                raise exc.FinderError(exc.ERROR_FILE_NOT_FOUND, e)
+            if self.is_hidden(stat):
+                raise exc.FinderError(exc.ERROR_FILE_NOT_FOUND)
+            # Have read permission?
+            if not self.is_readable(stat):
+                raise exc.FinderError(exc.ERROR_PERM_DENIED)
+            paths.append((path, stat))
+        return self._zip_walk(paths)
+
+    def _zip_walk(self, paths):
+        """
+        Yields zip entries of given items and their descendants.
+
+        Symlinks to directories below the targets are added as empty
+        directories, they are not followed. Items that vanish or cannot be
+        read while walking are left out.
+
+        :param paths: List of 2-tuples (path, stat)
+        """
+        # Targets themselves are walked even if they are links
+        stack = [ (stat['name'], path, stat, True)
+            for path, stat in reversed(paths) ]
+        while stack:
+            name, path, stat, follow = stack.pop()
+            is_dir = stat['mime'] == 'directory'
+            entry = dict(name=name, ts=stat['ts'], dir=is_dir)
+            if not is_dir:
+                entry['open'] = lambda path=path: self._file(path)
+            yield entry
+            if not is_dir or not follow:
+                continue
+            try:
+                names = sorted(self._ls_names(path))
+            except (OSError, exc.FinderError):
+                continue
+            children = []
+            for p in names:
+                try:
+                    st = self.stat(p)
+                except (OSError, exc.FinderError):
+                    continue
+                if self.is_hidden(st) or not self.is_readable(st):
+                    continue
+                # A link may point to an ancestor, do not descend into it
+                children.append((name + '/' + st['name'], p, st,
+                    'alias' not in st))
+            stack.extend(reversed(children))
+
 
     # ===[ HELPERS ]=======
 
+    def signed_url(self, target, ttl=None):
+        """
+        Returns time-limited direct URL of a file.
+
+        The URL starts with the volume's option ``URL`` and carries query
+        parameters ``expires`` and ``signature``, which a static server or
+        cache validates with
+        :func:`~pym_elfinder.security.validate_signed_url()`. So the file can
+        be served without hitting the connector.
+
+        Signing is enabled by setting option ``url_secret``.
+
+        :param target: Hash of file
+        :param ttl: Lifetime of URL in seconds; default is option
+                    ``url_ttl``. Is capped at option ``url_max_ttl``.
+        :returns: Dict with keys ``url`` and ``expires``
+        :raises: FinderError if ``ttl`` is not positive
+        """
+        self.check_command('url')
+        if ttl is not None and ttl <= 0:
+            raise exc.FinderError(exc.ERROR_INV_PARAMS, 'url', 'ttl')
+        secret = self._options.get('url_secret')
+        if not secret or not self._url:
+            raise exc.FinderError(exc.ERROR_PERM_DENIED)
+        path = self.decode(target)
+        try:
+            stat = self.stat(path)
+        except exc.FinderError as e:
+            raise exc.FinderNotFound(e)
+        if stat['mime'] == 'directory' or self.is_hidden(stat):
+            raise exc.FinderNotFound()
+        if not self.is_readable(stat):
+            raise exc.FinderAccessDenied()
+        if ttl is None:
+            ttl = self._options['url_ttl']
+        else:
+            ttl = min(ttl, self._options['url_max_ttl'])
+        expires = int(time.time() + ttl)
+        rel = self._relpath(path).replace(self._sep, '/')
+        return dict(url=security.sign_url(secret, self._url, rel, expires),
+            expires=expires)
+
+    def _local_path(self, path):
+        """
+        Returns path of an item in the local filesystem, if the driver keeps
+        its items there as plain files.
+
+        Then :meth:`_copy()` and :meth:`_move()` of such a driver accept the
+        local path of an item of another such driver as source, see
+        :meth:`_paste_from()`.
+
+        This default implementation returns None.
+
+        :param path: Path of item
+        :returns: Local path or None
+        """
+        return None
+
+    def _tree_size(self, path):
+        """
+        Returns size of a file, or total size of the files in a directory
+        tree.
+        """
+        stat = self._stat_light(path)
+        if not stat['dir']:
+            return stat['size']
+        size = 0
+        stack = [ path ]
+        while stack:
+            for p in self._ls_names(stack.pop()):
+                stat = self._stat_light(p)
+                if stat['dir']:
+                    stack.append(p)
+                else:
+                    size += stat['size']
+        return size
+
+    def _remove_tree(self, path):
+        """
+        Removes an item, and if it is a directory, all its descendants,
+        deepest first.
+        """
+        paths = []
+        stack = [ path ]
+        while stack:
+            p = stack.pop()
+            paths.append(p)
+            if self._stat_light(p)['dir']:
+                stack.extend(self._ls_names(p))
+        for p in reversed(paths):
+            self._remove(p)
+
+    def offload_value(self, path):
+        """
+        Returns value of the internal-redirect header for given file.
+
+        The web server uses it to send the file itself, e.g. with
+        ``X-Accel-Redirect`` (nginx) or ``X-Sendfile`` (Apache, lighttpd).
+
+        This default implementation returns None, i.e. the volume can not
+        offload downloads. Drivers whose files are accessible to the web
+        server override it.
+
+        :param path: Path of file
+        :returns: Header value or None
+        """
+        return None
+
+    def etag(self, path, stat):
+        """
+        Returns a strong entity tag for given file.
+
+        This default implementation derives the tag from modification time
+        and size. Drivers may override it with something more precise.
+
+        :param path: Path of file
+        :param stat: Stat of file
+        :returns: Quoted ETag string
+        """
+        return '"{0:x}-{1:x}"'.format(int(stat['ts'] * 1000000), stat['size'])
+
     def unique_name(self, path, name, suffix=" (copy #)"):
         """
         Returns a unique new name for given item.
 
         If a hashmark ('#') is present in ``suffix``, it is replaced by a
-        running number.
+        running number. See :meth:`unique_names()`.
         """
-        name, ext = os.path.splitext(name)
-        num = 0
-        re_suff = re.escape(suffix).replace(r"\#", r"(\d+)") + "$"
+        return self.unique_names(path, [ name ], suffix)[0]
 
-        # Check whether name already has a suffix. If so, determine its number. 
-        # Don't bother if suffix shall not contain a number.
-        if '#' in suffix:
-            m = re.match(re_suff, name)
-            if m:
-                num = int(m.group(1))
+    def unique_names(self, path, names, suffix=" (copy #)", reserved=()):
+        """
+        Returns unique new names for several items in the same directory.
+
+        The directory is listed only once. The number in the suffix of a
+        new name is one more than the highest number found in the names of
+        existing copies, and of the item itself, if its name already has a
+        suffix. The new names are also unique among each other.
 
-        # Remove old suffix from name
-        name = re.sub(re_suff, '', name)
-        # Build and append new suffix
-        cnt = 0
-        while True:
-            num += 1
-            new_name = name + suffix.replace("#", str(num)) + ext
-            if not self._exists(self._joinpath(path, new_name)):
-                return new_name
-            cnt += 1
-            if cnt >= 1000:
-                raise exc.FinderError(exc.PYM_ERROR_UNIQUE_NAME, name)
-        return name + ext
+        :param path: Path of directory
+        :param names: List of names of items
+        :param suffix: Suffix to append to the names; '#' is replaced by a
+                       running number
+        :param reserved: Names that are taken, though not (yet) in the
+                         directory
+        :returns: List of new names, in the order of ``names``
+        :raises: FinderError if ``suffix`` has no '#', and a new name is
+                 taken
+        """
+        taken = set(self._basename(p) for p in self._ls_names(path))
+        taken.update(reserved)
+        re_suff = re.escape(suffix).replace(r"\#", r"(\d+)") + "$"
+        highest = {}
+        new_names = []
+        for name in names:
+            name, ext = os.path.splitext(name)
+            # Check whether name already has a suffix. If so, determine its
+            # number, and remove it.
+            num = 0
+            m = re.search(re_suff, name)
+            if m and m.groups():
+                num = int(m.group(1))
+            name = re.sub(re_suff, '', name)
+            if '#' not in suffix:
+                new_name = name + suffix + ext
+                if new_name in taken:
+                    raise exc.FinderError(exc.PYM_ERROR_UNIQUE_NAME, name)
+            else:
+                key = (name, ext)
+                if key not in highest:
+                    re_copy = re.compile('^' + re.escape(name)
+                        + re_suff[:-1] + re.escape(ext) + '$')
+                    highest[key] = max([ int(m.group(1)) for m in
+                        map(re_copy.match, taken) if m ] or [ 0 ])
+                num = max(num, highest[key]) + 1
+                highest[key] = num
+                new_name = name + suffix.replace("#", str(num)) + ext
+            taken.add(new_name)
+            new_names.append(new_name)
+        return new_names
    
     def check_name(self, name):
         """
@@ -820,6 +1977,9 @@ class VolumeDriver(object):
         set. If ``val`` is given, permission must have this value, if ``val``
         is omitted, just the presence of the permission is checked.
 
+        Hidden children are searched as well. Symlinks to directories are
+        checked themselves, but not followed.
+
         :param path: Path of item where search starts
         :param perm: Name of permission
         :param val: A permission value
@@ -848,12 +2008,17 @@ class VolumeDriver(object):
         if stat['mime'] != 'directory':
             return None
 
-        # Search path's children.
-        children_stats = self.ls_stats(path)
-        for stat in children_stats:
-            child_path = self._joinpath(path, stat['name'])
-            # Child is a directory, recurse.
-            if stat['mime'] == 'directory':
+        # Search path's children. Hidden children count too, so they are
+        # listed with the FS API, not with ls_stats().
+        for child_path in self._ls_names(path):
+            try:
+                stat = self.stat(child_path)
+            except exc.FinderError:
+                # Vanished meanwhile or a broken link
+                continue
+            # Child is a directory, recurse; but not into a symlink, which
+            # may lead back to one of its parents.
+            if stat['mime'] == 'directory' and 'alias' not in stat:
                 found = self.find_child_by_perm(child_path, perm, val)
                 if found:
                     return found
@@ -992,6 +2157,32 @@ class VolumeDriver(object):
             mime = self.mimetype_internal_detect(name if name else path)
         return mime
 
+    def sniff_mimetype(self, data, name=''):
+        """
+        Returns mimetype of a file from its first bytes.
+
+        Like :meth:`mimetype()`, but for data that is not yet stored.
+
+        :param data: First bytes of file
+        :param name: Name of file, used if content tells nothing
+        """
+        mime = self._mimetype_buffer(data)
+        if mime in ['inode/x-empty', 'application/empty', 'application/x-empty']:
+            return 'text/plain'
+        if not mime:
+            mime = self.mimetype_internal_detect(name) \
+                or 'application/octet-stream'
+        return mime
+
+    def cache_mime(self, path, mime):
+        """
+        Remembers mimetype of a file, so that it need not be detected again.
+
+        This default implementation does nothing. Drivers that cache
+        mimetypes override it.
+        """
+        pass
+
     def mimetype_internal_detect(self, path):
         """
         Detect file mimetype using "internal" method
@@ -1181,6 +2372,12 @@ class VolumeDriver(object):
             'path' : '',
             #root url, not set to disable sending URL to client (replacement for old "fileURL" option)
             'URL' : '',
+            #secret key to sign direct URLs. not set to disable signed URLs
+            'url_secret' : None,
+            #lifetime of signed URLs in seconds
+            'url_ttl' : 3600,
+            #maximum lifetime of signed URLs in seconds the client may ask for
+            'url_max_ttl' : 24*3600,
             #open this path on initial request instead of root path
             'startPath' : '',
             #how many subdirs levels return per request
@@ -1216,6 +2413,21 @@ class VolumeDriver(object):
             'uploadOrder' : ['deny', 'allow'],
             #maximum upload file size. NOTE - this is size for every uploaded files
             #'uploadMaxSize' : 0,
+            #number of threads to save the files of one upload request
+            'uploadThreads' : 4,
+            #seconds after which the chunks of an abandoned upload are removed
+            'uploadChunkTTL' : 24*3600,
+            #when written files are synced to disk: 'none' leaves it to the
+            #OS, 'file' syncs each file and its dir at once, 'batch' syncs
+            #all of them at the end of the command, see flush(); until then,
+            #a file replaced by rename may be unsynced
+            'durability' : 'none',
+            #trash for removed items: name of a dir in the quarantine dir,
+            #or an absolute path on the same filesystem. None removes items
+            #at once
+            'trash' : None,
+            #seconds after which items in trash are purged
+            'trashTTL' : 30*24*3600,
             #files dates format. CURRENTLY NOT IMPLEMENTED
             'dateFormat' : 'j M Y H:i',
             #files time format. CURRENTLY NOT IMPLEMENTED
@@ -0,0 +1,431 @@
+# -*- coding: utf-8 -*-
+
+import os
+import posixpath
+import threading
+import zipfile
+import time
+from collections import OrderedDict
+
+from .volumedriver import VolumeDriver
+from .. import exceptions as exc
+
+
+_INDEX_CACHE = OrderedDict()
+"""
+Indexes of mounted archives, key is real path of archive.
+
+Value is a dict with keys ``signature`` (mtime and size of archive file),
+``index``, ``children`` and ``used_size``. Mounting the same unchanged
+archive again reuses its index, so the central directory is read only once
+per process. Each volume opens the archive on its own, so dropping an index
+never affects a mounted volume.
+
+Least recently mounted archives are dropped beyond
+:data:`INDEX_CACHE_SIZE` entries.
+"""
+_INDEX_LOCK = threading.Lock()
+
+INDEX_CACHE_SIZE = 32
+"""
+Maximum number of archives in the index cache.
+"""
+
+
+class Driver(VolumeDriver):
+    """
+    elFinder driver for a zip file, mounted as read-only volume.
+
+    Option ``path`` is the path to the zip file. On mount, an in-memory
+    directory index is built from the central directory of the archive. All
+    stats, listings and trees are served from that index; the content of a
+    file is streamed by decompressing just this member.
+
+    Directories that have no entry of their own in the archive are
+    synthesized from the paths of their members.
+    """
+
+    DRIVER_ID = 'z'
+
+    READONLY_CMDS = ['mkdir', 'mkfile', 'rm', 'rename', 'duplicate', 'paste',
+        'copy', 'move', 'upload', 'put', 'archive', 'extract', 'resize',
+        'trash', 'restore']
+    """
+    Commands that are always disabled on this volume.
+    """
+
+    def __init__(self, finder):
+        super().__init__(finder)
+        self._sep = '/'
+        self._archive_path = None
+        self._zip = None
+        self._index = None
+        self._children = None
+
+    def _init_paths(self):
+        self._sep = '/'
+        self._archive_path = os.path.abspath(self._options['path'])
+        # Root path is the top of the archive
+        self._root_path = self._sep
+        self._root_alias = self._options.get('alias',
+            os.path.basename(self._archive_path))
+
+    def _init_security(self):
+        super()._init_security()
+        self._disabled_cmds = list(self._disabled_cmds) + [ cmd
+            for cmd in self.READONLY_CMDS if cmd not in self._disabled_cmds ]
+        # Added behind all other ACEs, so that no ACE can grant write
+        # permission.
+        self._acl.append({
+            'pattern' : r'.*',
+            'write' : False
+        })
+
+    def _before_mount(self):
+        if not os.path.exists(self._archive_path):
+            raise exc.FinderError(exc.ERROR_FILE_NOT_FOUND,
+                self._archive_path)
+        try:
+            zf = zipfile.ZipFile(self._archive_path)
+        except (OSError, IOError, zipfile.BadZipFile) as e:
+            raise exc.FinderError(exc.ERROR_NOT_ARCHIVE, e)
+        # Signature of the file we actually opened, so that index and open
+        # file match even if the archive is replaced meanwhile
+        st = os.fstat(zf.fp.fileno())
+        key = os.path.realpath(self._archive_path)
+        signature = (st.st_mtime, st.st_size)
+        try:
+            with _INDEX_LOCK:
+                entry = _INDEX_CACHE.get(key)
+                if not entry or entry['signature'] != signature:
+                    # Archive is new or was changed
+                    entry = self._build_index(zf, signature, st.st_mtime)
+                    _INDEX_CACHE[key] = entry
+                    _INDEX_CACHE.move_to_end(key)
+                    while len(_INDEX_CACHE) > INDEX_CACHE_SIZE:
+                        _INDEX_CACHE.popitem(last=False)
+                else:
+                    _INDEX_CACHE.move_to_end(key)
+        except:
+            zf.close()
+            raise
+        self._zip = zf
+        self._index = entry['index']
+        self._children = entry['children']
+        self._used_size = entry['used_size']
+
+    def umount(self):
+        """
+        Closes the archive of this volume.
+
+        Members that are still being read stay readable until they are
+        closed themselves.
+        """
+        if self._zip:
+            self._zip.close()
+            self._zip = None
+        super().umount()
+
+    def _build_index(self, zf, signature, ts):
+        """
+        Reads the central directory of the archive and builds the index.
+
+        :param zf: The open :class:`zipfile.ZipFile`
+        :param signature: Signature of archive file to store in the index
+        :param ts: Modification time of synthesized directories
+        :returns: Dict to be stored in the index cache
+        """
+        index = { self._root_path : dict(dir=True, ts=ts, size=0, info=None) }
+        children = { self._root_path : [] }
+        used_size = 0
+
+        def add_dir(path):
+            if path in index:
+                return
+            parent = posixpath.dirname(path)
+            add_dir(parent)
+            index[path] = dict(dir=True, ts=ts, size=0, info=None)
+            children[path] = []
+            children[parent].append(posixpath.basename(path))
+
+        for info in zf.infolist():
+            path = posixpath.normpath('/' + info.filename)
+            # Skip weird names, e.g. with '..' or the root itself
+            if path == self._root_path or path.startswith('//') \
+                    or '/../' in path + '/':
+                continue
+            if info.is_dir():
+                add_dir(path)
+                index[path]['ts'] = time.mktime(info.date_time + (0, 0, -1))
+                continue
+            parent = posixpath.dirname(path)
+            add_dir(parent)
+            if path not in index:
+                children[parent].append(posixpath.basename(path))
+            index[path] = dict(dir=False, size=info.file_size, info=info,
+                ts=time.mktime(info.date_time + (0, 0, -1)))
+            used_size += info.file_size
+        return dict(signature=signature, index=index, children=children,
+            used_size=used_size)
+
+    def _entry(self, path):
+        """
+        Returns index entry of path.
+
+        :raises: FinderError if path is not in archive.
+        """
+        try:
+            return self._index[path]
+        except KeyError:
+            raise exc.FinderError(exc.ERROR_FILE_NOT_FOUND,
+                self._aliaspath(path))
+
+    def _readonly(self, *args, **kw):
+        raise exc.FinderError(exc.ERROR_PERM_DENIED)
+
+    #*********************************************************************#
+    #*                               FS API                              *#
+    #*********************************************************************#
+
+    def _dirname(self, path):
+        """
+        Returns directory name of path.
+        """
+        return posixpath.dirname(path)
+
+    def _basename(self, path):
+        """
+        Returns file name of path.
+        """
+        return posixpath.basename(path)
+
+    def _joinpath(self, *args):
+        """
+        Joins given arguments with directory separator.
+        """
+        return posixpath.join(*args)
+
+    def _normpath(self, path):
+        """
+        Returns normalized path, i.e. removes '..', obsolete '/' etc.
+        """
+        return posixpath.normpath(path)
+
+    def _relpath(self, path):
+        """
+        Converts absolute path into path relative to root.
+        """
+        if path == self._root_path or path == '':
+            return ''
+        if not path.startswith(self._root_path):
+            raise exc.FinderError(exc.PYM_ERROR_INVALID_PATH, path)
+        return path[len(self._root_path):]
+
+    def _abspath(self, path):
+        """
+        Converts relative path into absolute path starting with root.
+        """
+        if path == self._sep:
+            return self._root_path
+        else:
+            return self._joinpath(self._root_path, path)
+
+    def _aliaspath(self, path):
+        """
+        Replaces root path part of ``path`` with root's alias name.
+        """
+        if path == self._root_path:
+            return self._root_alias
+        else:
+            return self._joinpath(self._root_alias, self._relpath(path))
+
+    def _inpath(self, path, parent):
+        """
+        Returns True if path is parent or child of parent.
+        """
+        path = path.rstrip(self._sep)
+        parent = parent.rstrip(self._sep)
+        return (path == parent
+            or path.startswith(parent + self._sep)
+        )
+
+    #***************** file stat ********************#
+
+    def _stat(self, path):
+        """
+        Return stat for given path from the index.
+        """
+        entry = self._entry(path)
+        stat = {}
+        if entry['dir']:
+            stat['mime'] = 'directory'
+            stat['size'] = 0
+            stat['dirs'] = any(self._index[self._joinpath(path, n)]['dir']
+                for n in self._children[path])
+        else:
+            stat['mime'] = self.mimetype(path)
+            stat['size'] = entry['size']
+        stat['ts'] = entry['ts']
+        stat['read'] = True
+        stat['write'] = False
+        stat['locked'] = False
+        stat['hidden'] = False
+        return stat
+
+    def _stat_light(self, path):
+        """
+        Returns a minimal stat for given path from the index.
+        """
+        entry = self._entry(path)
+        return dict(size=entry['size'], ts=entry['ts'], dir=entry['dir'],
+            read=True, write=False)
+
+    def etag(self, path, stat):
+        """
+        Returns a strong entity tag for given member.
+
+        Tag is derived from the CRC-32 of the member's content, which is
+        stored in the central directory, and its size.
+        """
+        info = self._entry(path)['info']
+        if info is None:
+            return super().etag(path, stat)
+        return '"{0:08x}-{1:x}"'.format(info.CRC, info.file_size)
+
+    def _update_quota(self):
+        # Read-only volume; used size is the uncompressed size of all
+        # members, determined once on mount.
+        return self._used_size
+
+    def _has_subdirs(self, path):
+        """
+        Returns True if path is dir and has at least one child directory.
+        """
+        for p in self._subdirs(path):
+            if not self.acl_perm(path=p, perm_name='hidden'):
+                return True
+        return False
+
+    def _subdirs(self, path):
+        """
+        Returns list of paths of the child directories of given path.
+        """
+        return [ p for p in self._ls_names(path) if self._index[p]['dir'] ]
+
+    def _tree_stats(self, path, depth, exclude=None):
+        """
+        Returns list of stats of all directories in a tree.
+
+        :param path: Start in this directory
+        :param depth: Go maximum this deep.
+        :param exclude: List of (sub)directories to exclude from result
+        :returns: List of stats
+        """
+        if not exclude:
+            exclude = []
+        elif isinstance(exclude, str):
+            exclude = [ exclude ]
+        stats = []
+        level = [ path ]
+        for _ in range(depth):
+            next_level = []
+            for dir_ in level:
+                for name in self._children.get(dir_, []):
+                    p = self._joinpath(dir_, name)
+                    if not self._index[p]['dir'] or p in exclude:
+                        continue
+                    stats.append(self.cached_stat(p))
+                    next_level.append(p)
+            level = next_level
+        return stats
+
+    def _ls_stats(self, path):
+        """
+        Returns list of stats of items in given path.
+        """
+        return [ self.stat(self._joinpath(path, name))
+            for name in self._children.get(path, []) ]
+
+    def _ls_names(self, path):
+        """
+        Returns list of names of items in given path.
+        """
+        return [ self._joinpath(path, name)
+            for name in self._children.get(path, []) ]
+
+    def _dimensions(self, path, mime):
+        """
+        Dimensions of archive members are not determined.
+        """
+        return None
+
+    def _exists(self, path):
+        return path in self._index
+
+    #******************** file/dir content *********************#
+
+    def _mimetype(self, path):
+        """
+        Returns path's mimetype.
+
+        Mime-type is guessed from the name only, so that no member has to be
+        decompressed.
+        """
+        return (self.mimetype_internal_detect(path)
+            or 'application/octet-stream')
+
+    def _readlink(self, path):
+        """
+        Archive members are never treated as symlinks.
+        """
+        return None
+
+    def _file(self, path):
+        """
+        Returns file-like object for given path.
+
+        Reading from it decompresses the member on the fly.
+        """
+        entry = self._entry(path)
+        if entry['dir']:
+            raise exc.FinderError(exc.ERROR_NOT_FILE)
+        if not self._zip:
+            # Volume was unmounted
+            raise exc.FinderError(exc.ERROR_OPEN, self._aliaspath(path))
+        try:
+            return self._zip.open(entry['info'])
+        except (OSError, IOError, RuntimeError, ValueError,
+                zipfile.BadZipFile) as e:
+            raise exc.FinderError(exc.ERROR_OPEN, e)
+
+    def _get_content(self, path, encoding=None):
+        """
+        Returns content of file.
+
+        :param path: Path to file
+        :param encoding: Encoding to use for text files
+        :returns: File content as bytes (binary mode) or str (text mode)
+        """
+        fd = self._file(path)
+        try:
+            s = fd.read()
+        except (OSError, IOError, zipfile.BadZipFile) as e:
+            raise exc.FinderError(exc.ERROR_OPEN, e)
+        finally:
+            fd.close()
+        if encoding:
+            s = s.decode(encoding)
+        return s
+
+    #********************  file/dir manipulations *************************#
+
+    _put_content = _readonly
+    _mkdir = _readonly
+    _mkfile = _readonly
+    _copy = _readonly
+    _move = _readonly
+    _remove = _readonly
+    _save_uploaded = _readonly
+    _save_staged = _readonly
+    _chunk_store = _readonly
+    _rename = _readonly
@@ -4,6 +4,7 @@
 Helpers for the test suite.
 """
 
+import io
 import os
 from glob import glob
 import anyjson as json
@@ -214,6 +215,23 @@ def create_finder(opts=None):
     return finder
 
 
+class Upload(object):
+    """
+    Uploaded file as passed to command ``upload``, like a
+    ``cgi.FieldStorage``.
+    """
+
+    def __init__(self, filename, file):
+        """
+        :param filename: Name of uploaded file
+        :param file: File-like object, or bytes of content
+        """
+        self.filename = filename
+        if isinstance(file, bytes):
+            file = io.BytesIO(file)
+        self.file = file
+
+
 def diff_dicts(a, b):
     """
     Returns a visually pleasant diff of two dicts.
@@ -35,3 +35,26 @@ class TestUniqueName(unittest.TestCase):
         for i in range(1, 3):
             os.remove(os.path.join(path,"{0} (copy {1}){2}".format(
                 basename, i, ext))) 
+
+    def test_batch(self):
+        finder = Finder(lib.DEF_OPTS, cache=lib.dummy_cache)
+        finder.mount_volumes()
+        vol = finder.default_volume
+        path = os.path.join(lib.FIXTURES_DIR, 'files', 'some_dir')
+        existing = ["bar.txt", "bar (copy 2).txt", "bar (copy 7).txt",
+            "baz"]
+        for fn in existing:
+            touch(os.path.join(path, fn))
+        try:
+            # Highest number plus one, gaps are not filled; names are
+            # unique among each other
+            self.assertEqual(
+                vol.unique_names(path, ["bar.txt", "bar (copy 2).txt",
+                    "baz", "bar.txt", "new.txt"]),
+                ["bar (copy 8).txt", "bar (copy 9).txt", "baz (copy 1)",
+                    "bar (copy 10).txt", "new (copy 1).txt"])
+            self.assertEqual(vol.unique_name(path, "bar.txt", " (#)"),
+                "bar (1).txt")
+        finally:
+            for fn in existing:
+                os.remove(os.path.join(path, fn))
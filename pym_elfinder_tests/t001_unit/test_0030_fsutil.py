@@ -0,0 +1,143 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from pym_elfinder import fsutil
+
+
+class TestFsutil(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.src = os.path.join(self.dir, 'src')
+        self.dst = os.path.join(self.dir, 'dst')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def _make_sparse(self):
+        # Data, a hole of 8 MB, data, and a hole at the end
+        with open(self.src, 'wb') as fh:
+            fh.write(b'a' * 4096)
+            fh.seek(8 * 1024 * 1024, os.SEEK_CUR)
+            fh.write(b'b' * 4096)
+            fh.truncate(fh.tell() + 1024 * 1024)
+        os.chmod(self.src, 0o640)
+
+    def _read(self, fn):
+        with open(fn, 'rb') as fh:
+            return fh.read()
+
+    def test_copy_file(self):
+        self._make_sparse()
+        fsutil.copy_file(self.src, self.dst)
+        self.assertEqual(self._read(self.src), self._read(self.dst))
+        self.assertEqual(os.stat(self.dst).st_mode & 0o777, 0o640)
+        # Holes are not filled
+        self.assertLessEqual(os.stat(self.dst).st_blocks,
+            os.stat(self.src).st_blocks)
+
+    def test_methods(self):
+        self._make_sparse()
+        size = os.path.getsize(self.src)
+        for method in ('sendfile', 'read'):
+            src_fd = os.open(self.src, os.O_RDONLY)
+            dst_fd = os.open(self.dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+            try:
+                for offset, length in fsutil.data_segments(src_fd, size):
+                    fsutil._copy_segment(src_fd, dst_fd, offset, length,
+                        [ method ])
+                os.ftruncate(dst_fd, size)
+            finally:
+                os.close(src_fd)
+                os.close(dst_fd)
+            self.assertEqual(self._read(self.src), self._read(self.dst),
+                method)
+
+    def test_copy_tree(self):
+        os.makedirs(os.path.join(self.src, 'sub'))
+        with open(os.path.join(self.src, 'sub', 'f'), 'wb') as fh:
+            fh.write(b'content')
+        for i in range(20):
+            with open(os.path.join(self.src, str(i)), 'wb') as fh:
+                fh.write(b'x' * i)
+        os.symlink('sub/f', os.path.join(self.src, 'link'))
+        os.chmod(os.path.join(self.src, 'sub'), 0o750)
+        stats = fsutil.copy_tree(self.src, self.dst, threads=4)
+        # Link is followed
+        self.assertEqual(stats, dict(files=22, dirs=2, bytes=14 + 190))
+        self.assertEqual(self._read(os.path.join(self.dst, 'sub', 'f')),
+            b'content')
+        self.assertEqual(self._read(os.path.join(self.dst, '19')), b'x' * 19)
+        self.assertFalse(os.path.islink(os.path.join(self.dst, 'link')))
+        self.assertEqual(self._read(os.path.join(self.dst, 'link')),
+            b'content')
+        self.assertEqual(
+            os.stat(os.path.join(self.dst, 'sub')).st_mode & 0o777, 0o750)
+        shutil.rmtree(self.dst)
+        fsutil.copy_tree(self.src, self.dst, symlinks=True)
+        self.assertEqual(os.readlink(os.path.join(self.dst, 'link')), 'sub/f')
+
+    def test_copy_tree_escaping_link(self):
+        outside = os.path.join(self.dir, 'outside')
+        os.makedirs(os.path.join(self.src, 'sub'))
+        with open(outside, 'wb') as fh:
+            fh.write(b'secret')
+        os.symlink('../../outside', os.path.join(self.src, 'sub', 'link'))
+        fsutil.copy_tree(self.src, self.dst)
+        # Copy has the content, not a link that resolves elsewhere
+        link = os.path.join(self.dst, 'sub', 'link')
+        self.assertFalse(os.path.islink(link))
+        self.assertEqual(self._read(link), b'secret')
+
+    def test_copy_tree_failed(self):
+        os.makedirs(os.path.join(self.src, 'sub'))
+        for i in range(5):
+            with open(os.path.join(self.src, 'sub', str(i)), 'wb') as fh:
+                fh.write(b'x')
+        copy_file = fsutil.copy_file
+
+        def failing_copy(src, dst):
+            if src.endswith('3'):
+                raise OSError('failed')
+            return copy_file(src, dst)
+
+        fsutil.copy_file = failing_copy
+        try:
+            with self.assertRaises(OSError):
+                fsutil.copy_tree(self.src, self.dst)
+        finally:
+            fsutil.copy_file = copy_file
+        # Nothing partial is left behind
+        self.assertFalse(os.path.exists(self.dst))
+
+    def test_copy_tree_loop(self):
+        os.makedirs(os.path.join(self.src, 'sub'))
+        os.symlink('..', os.path.join(self.src, 'sub', 'up'))
+        with self.assertRaises(OSError):
+            fsutil.copy_tree(self.src, self.dst)
+        self.assertFalse(os.path.exists(self.dst))
+
+    def test_move(self):
+        os.makedirs(os.path.join(self.src, 'sub'))
+        stats = fsutil.move(self.src, self.dst)
+        # Same device: renamed
+        self.assertEqual(stats, dict(files=0, dirs=0, bytes=0))
+        self.assertTrue(os.path.isdir(os.path.join(self.dst, 'sub')))
+        self.assertFalse(os.path.exists(self.src))
+
+    def test_empty(self):
+        open(self.src, 'wb').close()
+        fsutil.copy_file(self.src, self.dst)
+        self.assertEqual(os.path.getsize(self.dst), 0)
+
+    def test_purger(self):
+        os.makedirs(os.path.join(self.src, 'a', 'b'))
+        for i in range(10):
+            open(os.path.join(self.src, 'a', str(i)), 'w').close()
+        os.symlink('a', os.path.join(self.src, 'link'))
+        purger = fsutil.Purger()
+        purger.submit(self.src)
+        purger.wait()
+        self.assertFalse(os.path.exists(self.src))
@@ -1,9 +1,12 @@
 import unittest
 import os
+import copy
+import shutil
 
 from pprint import pprint
 
 import pym_elfinder.exceptions as exc
+from pym_elfinder.volume import localfilesystem
 from .. import lib
 from .. import lib_localfilesystem as lfs
 
@@ -18,6 +21,8 @@ class TestCmdRm(unittest.TestCase):
         cls.file_2 = os.path.join(lfs.DIR, 'file_2.txt')
         cls.dir_1 = os.path.join(lfs.DIR, 'dir_1')
         cls.file_1_1 = os.path.join(lfs.DIR, 'dir_1', 'file_1_1.txt')
+        cls.quarantine = os.path.join(lib.DEF_OPTS['roots'][0]['path'],
+            '.quarantine')
 
     def test_rm_files(self):
         """
@@ -48,7 +53,7 @@ class TestCmdRm(unittest.TestCase):
 
     def test_rm_non_empty_dir(self):
         """
-        Test removal of dir_1
+        Test removal of dir_1 with its content
         """
         os.mkdir(self.dir_1)
         lfs.mkfile(self.file_1_1)
@@ -58,13 +63,57 @@ class TestCmdRm(unittest.TestCase):
         cmd, args = lib.prepare_request(req)
         assert cmd == 'rm'
         
-        with self.assertRaisesRegexp(exc.FinderError, exc.ERROR_RM):
-            self.finder.run(cmd, args, debug=True)
+        self.finder.run(cmd, args, debug=True)
         
         r = self.finder.response
-        self.assertTrue('error' in r)
-        self.assertEqual(r['error'][0], exc.ERROR_RM)
-        
-        os.remove(self.file_1_1)
-        os.rmdir(self.dir_1)
+        self.assertEqual(r['removed'], args['targets'])
+        self.assertFalse(os.path.exists(self.dir_1))
+        localfilesystem._PURGER.wait()
+        self.assertEqual(os.listdir(os.path.join(self.quarantine, 'purge')),
+            [])
+        shutil.rmtree(self.quarantine)
 
+    def test_rm_locked(self):
+        """
+        Test that nothing is removed if one item contains a locked item
+        """
+        opts = copy.deepcopy(lib.DEF_OPTS)
+        opts['roots'][0]['acl'] = [
+            dict(pattern=r'/file_1_1\.txt$', locked=True)
+        ]
+        finder = lib.create_finder(opts)
+        vol = finder.default_volume
+        lfs.mkfile(self.file_1)
+        os.mkdir(self.dir_1)
+        lfs.mkfile(self.file_1_1)
+        try:
+            with self.assertRaises(exc.FinderError) as cm:
+                finder.run('rm', dict(targets=[ vol.encode(self.file_1),
+                    vol.encode(self.dir_1) ]))
+            self.assertEqual(cm.exception.args[0], exc.ERROR_LOCKED)
+            self.assertTrue(os.path.exists(self.file_1))
+            self.assertTrue(os.path.exists(self.file_1_1))
+        finally:
+            os.remove(self.file_1)
+            shutil.rmtree(self.dir_1)
+
+    def test_rm_hidden_locked(self):
+        """
+        Test that a dir with a hidden and locked item is not removed
+        """
+        opts = copy.deepcopy(lib.DEF_OPTS)
+        opts['roots'][0]['acl'] = [
+            dict(pattern=r'/\.htaccess$', hidden=True, locked=True)
+        ]
+        finder = lib.create_finder(opts)
+        vol = finder.default_volume
+        os.mkdir(self.dir_1)
+        htaccess = os.path.join(self.dir_1, '.htaccess')
+        lfs.mkfile(htaccess)
+        try:
+            with self.assertRaises(exc.FinderError) as cm:
+                finder.run('rm', dict(targets=[ vol.encode(self.dir_1) ]))
+            self.assertEqual(cm.exception.args[0], exc.ERROR_LOCKED)
+            self.assertTrue(os.path.exists(htaccess))
+        finally:
+            shutil.rmtree(self.dir_1)
@@ -0,0 +1,65 @@
+import unittest
+import os
+import tarfile
+import zipfile
+
+import pym_elfinder.exceptions as exc
+from .. import lib
+from .. import lib_localfilesystem as lfs
+
+
+class TestCmdLsArchive(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.finder = lib.create_finder()
+        cls.zip_fn = os.path.join(lfs.DIR, 'archive.zip')
+        cls.tar_fn = os.path.join(lfs.DIR, 'archive.tar.gz')
+
+    def setUp(self):
+        with zipfile.ZipFile(self.zip_fn, 'w', zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr('docs/', '')
+            for i in range(5):
+                zf.writestr('docs/file_{0}.txt'.format(i), 'x' * (i + 1))
+        with tarfile.open(self.tar_fn, 'w:gz') as tf:
+            tf.add(os.path.join(lfs.DIR, 'deeper2.txt'), 'deeper2.txt')
+            tf.add(os.path.join(lfs.DIR, 'image.jpg'), 'image.jpg')
+
+    def tearDown(self):
+        os.remove(self.zip_fn)
+        os.remove(self.tar_fn)
+
+    def test_zip_paginated(self):
+        vol = self.finder.default_volume
+        args = dict(target=vol.encode(self.zip_fn), offset='2', limit='3')
+        self.finder.run('lsarchive', args)
+        r = self.finder.response
+        self.assertEqual(r['offset'], 2)
+        self.assertTrue(r['more'])
+        self.assertEqual([m['name'] for m in r['list']],
+            ['docs/file_1.txt', 'docs/file_2.txt', 'docs/file_3.txt'])
+        self.assertEqual([m['size'] for m in r['list']], [2, 3, 4])
+        self.assertEqual(r['list'][0]['mime'], 'text/plain')
+
+        args = dict(target=vol.encode(self.zip_fn), offset='0')
+        self.finder.run('lsarchive', args)
+        r = self.finder.response
+        self.assertFalse(r['more'])
+        self.assertEqual(len(r['list']), 6)
+        self.assertEqual(r['list'][0]['mime'], 'directory')
+
+    def test_tar(self):
+        vol = self.finder.default_volume
+        args = dict(target=vol.encode(self.tar_fn))
+        self.finder.run('lsarchive', args)
+        r = self.finder.response
+        self.assertEqual([m['name'] for m in r['list']],
+            ['deeper2.txt', 'image.jpg'])
+        self.assertEqual(r['list'][1]['size'], 76603)
+        self.assertEqual(r['list'][1]['mime'], 'image/jpeg')
+
+    def test_not_an_archive(self):
+        vol = self.finder.default_volume
+        args = dict(target=vol.encode(os.path.join(lfs.DIR, 'deeper2.txt')))
+        with self.assertRaisesRegex(exc.FinderError, exc.ERROR_NOT_ARCHIVE):
+            self.finder.run('lsarchive', args)
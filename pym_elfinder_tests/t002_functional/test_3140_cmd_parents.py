@@ -0,0 +1,44 @@
+import unittest
+import os
+import shutil
+
+from .. import lib
+from .. import lib_localfilesystem as lfs
+
+
+class TestCmdParents(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.finder = lib.create_finder()
+        cls.top = os.path.join(lfs.DIR, 'dir_a')
+
+    def setUp(self):
+        os.makedirs(os.path.join(self.top, 'dir_b', 'dir_c', 'dir_d'))
+        os.mkdir(os.path.join(self.top, 'dir_b2'))
+        lfs.mkfile(os.path.join(self.top, 'file.txt'))
+
+    def tearDown(self):
+        shutil.rmtree(self.top)
+
+    def test_parents(self):
+        vol = self.finder.default_volume
+        target = os.path.join(self.top, 'dir_b', 'dir_c')
+        self.finder.run('parents', dict(target=vol.encode(target)))
+        tree = self.finder.response['tree']
+        names = sorted(st['name'] for st in tree)
+        # Ancestors, their subfolders, the target and its subfolders
+        self.assertEqual(names, ['dir_a', 'dir_b', 'dir_b2', 'dir_c',
+            'dir_d', 'files', 'some_dir'])
+        hashes = [ st['hash'] for st in tree ]
+        self.assertEqual(len(hashes), len(set(hashes)))
+        for st in tree:
+            self.assertEqual(st['mime'], 'directory')
+
+    def test_parents_of_root(self):
+        vol = self.finder.default_volume
+        self.finder.run('parents', dict(target=vol.root_hash()))
+        tree = self.finder.response['tree']
+        self.assertEqual(tree[0]['hash'], vol.root_hash())
+        self.assertEqual(sorted(st['name'] for st in tree),
+            ['files', 'some_dir'])
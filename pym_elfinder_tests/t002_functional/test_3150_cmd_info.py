@@ -0,0 +1,79 @@
+import unittest
+import os
+import tempfile
+
+from .. import lib
+from .. import lib_localfilesystem as lfs
+
+
+class TestCmdInfo(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.finder = lib.create_finder()
+        cls.vol = cls.finder.default_volume
+        cls.targets = [
+            cls.vol.encode(os.path.join(lfs.DIR, 'image.jpg')),
+            cls.vol.encode(lfs.DIR),
+            cls.vol.encode(os.path.join(lfs.DIR, 'does_not_exist.txt')),
+            cls.vol.encode(os.path.join(lfs.DIR, 'deeper2.txt')),
+        ]
+
+    def test_info_full(self):
+        self.finder.run('info', dict(targets=self.targets))
+        files = self.finder.response['files']
+        self.assertEqual([f['name'] for f in files],
+            ['image.jpg', 'some_dir', 'deeper2.txt'])
+        self.assertEqual(files[0], self.vol.stat(
+            os.path.join(lfs.DIR, 'image.jpg')))
+
+    def test_info_cheap_fields(self):
+        # Must not sniff mime-types
+        def fail(path):
+            raise AssertionError("Sniffed mime-type of " + path)
+        self.vol._mimetype = fail
+        try:
+            self.finder.run('info', dict(targets=self.targets,
+                options='name,size,ts'))
+        finally:
+            del self.vol._mimetype
+        files = self.finder.response['files']
+        self.assertEqual(len(files), 3)
+        self.assertEqual(sorted(files[0].keys()),
+            ['hash', 'name', 'size', 'ts'])
+        self.assertEqual(files[0]['size'], 76603)
+        self.assertEqual(files[1]['size'], 0)
+        self.assertEqual(files[2]['name'], 'deeper2.txt')
+
+    def test_info_expensive_fields(self):
+        self.finder.run('info', dict(targets=self.targets,
+            options=dict(fields=['name', 'mime', 'read', 'dirs'])))
+        files = self.finder.response['files']
+        self.assertEqual(files[0]['mime'], 'image/jpeg')
+        self.assertEqual(files[0]['read'], 1)
+        self.assertEqual(files[1]['mime'], 'directory')
+        self.assertFalse('dirs' in files[1])
+
+    def test_info_link_out_of_root(self):
+        fd, outside = tempfile.mkstemp()
+        os.write(fd, b'secret data')
+        os.close(fd)
+        link = os.path.join(lfs.DIR, 'escape.txt')
+        inside = os.path.join(lfs.DIR, 'inside.txt')
+        os.symlink(outside, link)
+        os.symlink('deeper2.txt', inside)
+        try:
+            self.finder.run('info', dict(targets=[ self.vol.encode(link),
+                self.vol.encode(inside) ], options='name,size,ts,read'))
+            files = self.finder.response['files']
+            # Nothing about the target outside the root is revealed
+            self.assertEqual(files[0]['size'], 0)
+            self.assertEqual(files[0]['read'], 0)
+            self.assertEqual(files[0]['ts'], os.lstat(link).st_mtime)
+            # Links inside the root are resolved
+            self.assertEqual(files[1]['size'],
+                os.path.getsize(os.path.join(lfs.DIR, 'deeper2.txt')))
+        finally:
+            os.remove(link)
+            os.remove(inside)
+            os.remove(outside)
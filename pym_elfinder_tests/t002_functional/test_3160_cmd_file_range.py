@@ -0,0 +1,71 @@
+import unittest
+import os
+
+import pym_elfinder.exceptions as exc
+from .. import lib
+from .. import lib_localfilesystem as lfs
+
+
+class TestCmdFileRange(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.finder = lib.create_finder()
+        cls.src = os.path.join(lfs.DIR, 'image.jpg')
+        with open(cls.src, 'rb') as fh:
+            cls.data = fh.read()
+        cls.target = cls.finder.default_volume.encode(cls.src)
+
+    def tearDown(self):
+        self.finder.http_range = None
+        if self.finder.response and 'file' in self.finder.response:
+            self.finder.response['file'].close()
+
+    def test_no_range(self):
+        self.finder.run('file', dict(target=self.target))
+        r = self.finder.response
+        self.assertFalse('status' in r)
+        self.assertEqual(self.finder.headers['Accept-Ranges'], 'bytes')
+        self.assertEqual(r['file'].read(), self.data)
+
+    def test_single_range(self):
+        self.finder.http_range = 'bytes=100-199'
+        self.finder.run('file', dict(target=self.target))
+        r = self.finder.response
+        h = self.finder.headers
+        self.assertEqual(r['status'], exc.HTTP_PARTIAL_CONTENT)
+        self.assertEqual(h['Content-Range'], 'bytes 100-199/76603')
+        self.assertEqual(h['Content-Length'], '100')
+        self.assertEqual(b''.join(r['file']), self.data[100:200])
+
+    def test_suffix_range(self):
+        self.finder.http_range = 'bytes=-10'
+        self.finder.run('file', dict(target=self.target))
+        h = self.finder.headers
+        self.assertEqual(h['Content-Range'], 'bytes 76593-76602/76603')
+        self.assertEqual(self.finder.response['file'].read(),
+            self.data[-10:])
+
+    def test_multi_range(self):
+        self.finder.http_range = 'bytes=0-9, 50000-'
+        self.finder.run('file', dict(target=self.target))
+        r = self.finder.response
+        h = self.finder.headers
+        self.assertTrue(h['Content-Type'].startswith('multipart/byteranges'))
+        boundary = h['Content-Type'].split('boundary=')[1]
+        body = r['file'].read()
+        self.assertEqual(len(body), int(h['Content-Length']))
+        parts = body.split(b'--' + boundary.encode('ascii'))
+        self.assertEqual(len(parts), 4)
+        self.assertTrue(parts[1].endswith(b'\r\n\r\n' + self.data[:10]
+            + b'\r\n'))
+        self.assertTrue(b'Content-Range: bytes 50000-76602/76603' in parts[2])
+        self.assertTrue(parts[2].endswith(self.data[50000:] + b'\r\n'))
+
+    def test_unsatisfiable(self):
+        self.finder.http_range = 'bytes=80000-'
+        with self.assertRaises(exc.FinderError) as cm:
+            self.finder.run('file', dict(target=self.target))
+        self.assertEqual(cm.exception.status, exc.HTTP_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(cm.exception.headers['Content-Range'],
+            'bytes */76603')
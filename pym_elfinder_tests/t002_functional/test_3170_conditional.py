@@ -0,0 +1,70 @@
+import unittest
+import os
+
+import pym_elfinder.exceptions as exc
+from .. import lib
+from .. import lib_localfilesystem as lfs
+
+
+class TestConditionalRequests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.finder = lib.create_finder()
+        cls.src = os.path.join(lfs.DIR, 'conditional.txt')
+
+    def setUp(self):
+        lfs.mkfile(self.src, "Some contents.")
+        self.target = self.finder.default_volume.encode(self.src)
+
+    def tearDown(self):
+        self.finder.if_none_match = None
+        self.finder.if_modified_since = None
+        if 'file' in self.finder.response:
+            self.finder.response['file'].close()
+        os.remove(self.src)
+
+    def test_file_etag(self):
+        self.finder.run('file', dict(target=self.target))
+        etag = self.finder.headers['ETag']
+        self.assertTrue(etag.startswith('"'))
+        self.assertTrue('Last-Modified' in self.finder.headers)
+        self.finder.response['file'].close()
+
+        # Must not open the file
+        vol = self.finder.default_volume
+        def fail(path):
+            raise AssertionError("Opened " + path)
+        vol._file = fail
+        try:
+            self.finder.if_none_match = 'W/"foo", ' + etag
+            self.finder.run('file', dict(target=self.target))
+        finally:
+            del vol._file
+        r = self.finder.response
+        self.assertEqual(r['status'], exc.HTTP_NOT_MODIFIED)
+        self.assertFalse('file' in r)
+        self.assertEqual(self.finder.headers['ETag'], etag)
+
+    def test_file_modified(self):
+        self.finder.run('file', dict(target=self.target))
+        etag = self.finder.headers['ETag']
+        self.finder.response['file'].close()
+        with open(self.src, 'a') as fh:
+            fh.write("More contents.")
+        self.finder.if_none_match = etag
+        self.finder.run('file', dict(target=self.target))
+        r = self.finder.response
+        self.assertFalse('status' in r)
+        self.assertNotEqual(self.finder.headers['ETag'], etag)
+        self.assertEqual(r['file'].read(), b"Some contents.More contents.")
+
+    def test_get_if_modified_since(self):
+        self.finder.run('get', dict(target=self.target))
+        self.assertEqual(self.finder.response['content'], "Some contents.")
+        last_modified = self.finder.headers['Last-Modified']
+        self.finder.if_modified_since = last_modified
+        self.finder.run('get', dict(target=self.target))
+        r = self.finder.response
+        self.assertEqual(r['status'], exc.HTTP_NOT_MODIFIED)
+        self.assertFalse('content' in r)
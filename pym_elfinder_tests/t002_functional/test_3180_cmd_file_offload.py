@@ -0,0 +1,63 @@
+import unittest
+import os
+import copy
+
+import pym_elfinder.exceptions as exc
+from .. import lib
+from .. import lib_localfilesystem as lfs
+
+
+class TestCmdFileOffload(unittest.TestCase):
+
+    def setUp(self):
+        self.fn = os.path.join(lfs.DIR, 'offload me.txt')
+        lfs.mkfile(self.fn)
+
+    def tearDown(self):
+        os.remove(self.fn)
+
+    def _finder(self, offload):
+        opts = copy.deepcopy(lib.DEF_OPTS)
+        opts['roots'][0]['offload'] = offload
+        return lib.create_finder(opts)
+
+    def test_accel_redirect(self):
+        finder = self._finder({'header': 'X-Accel-Redirect',
+            'prefix': '/protected/'})
+        vol = finder.default_volume
+        finder.http_range = 'bytes=0-1'
+        finder.run('file', dict(target=vol.encode(self.fn)))
+        r = finder.response
+        self.assertIsNone(r['file'])
+        self.assertNotIn('status', r)
+        self.assertEqual(finder.headers['X-Accel-Redirect'],
+            '/protected/some_dir/offload%20me.txt')
+        self.assertNotIn('Content-Length', finder.headers)
+        self.assertIn('ETag', finder.headers)
+
+    def test_sendfile(self):
+        finder = self._finder({'header': 'X-Sendfile'})
+        vol = finder.default_volume
+        finder.run('file', dict(target=vol.encode(self.fn)))
+        self.assertIsNone(finder.response['file'])
+        self.assertEqual(finder.headers['X-Sendfile'], self.fn)
+
+    def test_sendfile_prefix(self):
+        finder = self._finder({'header': 'X-Sendfile', 'prefix': '/srv'})
+        vol = finder.default_volume
+        finder.run('file', dict(target=vol.encode(self.fn)))
+        self.assertEqual(finder.headers['X-Sendfile'], '/srv/some_dir/offload me.txt')
+
+    def test_disabled_by_default(self):
+        finder = lib.create_finder()
+        vol = finder.default_volume
+        finder.run('file', dict(target=vol.encode(self.fn)))
+        self.assertIsNotNone(finder.response['file'])
+        finder.response['file'].close()
+        self.assertNotIn('X-Sendfile', finder.headers)
+
+    def test_invalid(self):
+        for offload in ({'prefix': '/srv'}, {'header': 'X-Accel-Redirect'}):
+            finder = self._finder(offload)
+            self.assertFalse(finder.volumes)
+            self.assertEqual(finder.mount_errors[0].args[0], exc.ERROR_CONF)
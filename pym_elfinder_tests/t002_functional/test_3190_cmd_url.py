@@ -0,0 +1,87 @@
+import unittest
+import os
+import copy
+import time
+import urllib.parse
+
+import pym_elfinder.exceptions as exc
+import pym_elfinder.security as security
+from .. import lib
+from .. import lib_localfilesystem as lfs
+
+
+SECRET = 'not so secret'
+
+
+class TestCmdUrl(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        opts = copy.deepcopy(lib.DEF_OPTS)
+        opts['roots'][0]['URL'] = 'http://static.example.com/files/'
+        opts['roots'][0]['url_secret'] = SECRET
+        cls.finder = lib.create_finder(opts)
+
+    def setUp(self):
+        self.fn = os.path.join(lfs.DIR, 'big file.bin')
+        lfs.mkfile(self.fn)
+
+    def tearDown(self):
+        os.remove(self.fn)
+
+    def _split(self, url):
+        parts = urllib.parse.urlsplit(url)
+        path = parts.path[len('/files/'):]
+        return path, parts.query
+
+    def test_url(self):
+        vol = self.finder.default_volume
+        self.finder.run('url', dict(target=vol.encode(self.fn)))
+        r = self.finder.response
+        self.assertTrue(r['url'].startswith(
+            'http://static.example.com/files/some_dir/big%20file.bin?'))
+        path, query = self._split(r['url'])
+        self.assertTrue(security.validate_signed_url(SECRET, path, query))
+
+    def test_tampered(self):
+        vol = self.finder.default_volume
+        self.finder.run('url', dict(target=vol.encode(self.fn)))
+        path, query = self._split(self.finder.response['url'])
+        self.assertFalse(security.validate_signed_url(SECRET,
+            path.replace('big', 'other'), query))
+        self.assertFalse(security.validate_signed_url('wrong', path, query))
+        self.assertFalse(security.validate_signed_url(SECRET, path, ''))
+
+    def test_expired(self):
+        vol = self.finder.default_volume
+        self.finder.run('url', dict(target=vol.encode(self.fn),
+            options=dict(ttl=10)))
+        r = self.finder.response
+        path, query = self._split(r['url'])
+        self.assertTrue(security.validate_signed_url(SECRET, path, query,
+            now=r['expires']))
+        self.assertFalse(security.validate_signed_url(SECRET, path, query,
+            now=r['expires'] + 1))
+
+    def test_directory(self):
+        vol = self.finder.default_volume
+        with self.assertRaises(exc.FinderError):
+            self.finder.run('url', dict(target=vol.encode(lfs.DIR)))
+
+    def test_disabled_by_default(self):
+        finder = lib.create_finder()
+        vol = finder.default_volume
+        with self.assertRaises(exc.FinderError):
+            finder.run('url', dict(target=vol.encode(self.fn)))
+
+    def test_ttl_limits(self):
+        vol = self.finder.default_volume
+        for ttl in (0, -5):
+            with self.assertRaisesRegex(exc.FinderError, exc.ERROR_INV_PARAMS):
+                self.finder.run('url', dict(target=vol.encode(self.fn),
+                    options=dict(ttl=ttl)))
+        self.finder.run('url', dict(target=vol.encode(self.fn),
+            options=dict(ttl=999999999)))
+        r = self.finder.response
+        self.assertLessEqual(r['expires'] - time.time(),
+            vol._options['url_max_ttl'])
@@ -0,0 +1,62 @@
+import unittest
+import os
+import copy
+
+from pym_elfinder import streams
+from .. import lib
+from .. import lib_localfilesystem as lfs
+
+
+class TestFileStream(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        opts = copy.deepcopy(lib.DEF_OPTS)
+        opts['roots'][0]['stream_block_size'] = 1000
+        cls.finder = lib.create_finder(opts)
+        cls.data = bytes(range(256)) * 10
+
+    def setUp(self):
+        self.fn = os.path.join(lfs.DIR, 'stream.bin')
+        with open(self.fn, 'wb') as fh:
+            fh.write(self.data)
+
+    def tearDown(self):
+        os.remove(self.fn)
+
+    def _file(self):
+        vol = self.finder.default_volume
+        self.finder.run('file', dict(target=vol.encode(self.fn)))
+        return self.finder.response['file']
+
+    def test_blocks(self):
+        with self._file() as fd:
+            self.assertIsInstance(fd, streams.FileWrapper)
+            blocks = list(fd)
+        self.assertEqual([ len(b) for b in blocks ], [1000, 1000, 560])
+        self.assertEqual(b''.join(blocks), self.data)
+
+    def test_fileno(self):
+        with self._file() as fd:
+            self.assertEqual(os.fstat(fd.fileno()).st_size, len(self.data))
+
+    def test_wsgi(self):
+        calls = []
+        def file_wrapper(f, block_size):
+            calls.append(block_size)
+            return f
+        with self._file() as fd:
+            self.assertIs(fd.wsgi({}), fd)
+            self.assertIs(fd.wsgi({'wsgi.file_wrapper' : file_wrapper}), fd)
+        self.assertEqual(calls, [1000])
+
+    def test_range(self):
+        vol = self.finder.default_volume
+        self.finder.http_range = 'bytes=100-2099'
+        try:
+            self.finder.run('file', dict(target=vol.encode(self.fn)))
+        finally:
+            self.finder.http_range = None
+        with self.finder.response['file'] as fd:
+            self.assertEqual(fd.block_size, 1000)
+            self.assertEqual(b''.join(fd), self.data[100:2100])
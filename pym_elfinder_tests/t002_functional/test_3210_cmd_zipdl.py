@@ -0,0 +1,71 @@
+import unittest
+import os
+import io
+import shutil
+import zipfile
+
+import pym_elfinder.exceptions as exc
+from .. import lib
+from .. import lib_localfilesystem as lfs
+
+
+class TestCmdZipdl(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.finder = lib.create_finder()
+        cls.top = os.path.join(lfs.DIR, 'zipdl')
+
+    def setUp(self):
+        os.makedirs(os.path.join(self.top, 'sub', 'empty'))
+        with open(os.path.join(self.top, 'a.txt'), 'wb') as fh:
+            fh.write(b'A' * 300000)
+        with open(os.path.join(self.top, 'sub', 'b.txt'), 'wb') as fh:
+            fh.write(b'Bee')
+
+    def tearDown(self):
+        shutil.rmtree(self.top)
+
+    def _run(self, targets, **kw):
+        vol = self.finder.default_volume
+        args = dict(targets=[ vol.encode(os.path.join(self.top, t))
+            for t in targets ])
+        args.update(kw)
+        self.finder.run('zipdl', args)
+        return self.finder.response
+
+    def test_zipdl(self):
+        r = self._run(['a.txt', 'sub'])
+        self.assertEqual(self.finder.headers['Content-Type'], 'application/zip')
+        self.assertIn('download.zip', self.finder.headers['Content-Disposition'])
+        self.assertNotIn('Content-Length', self.finder.headers)
+        chunks = list(r['file'])
+        self.assertGreater(len(chunks), 1)
+        zf = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+        self.assertEqual(zf.namelist(), ['a.txt', 'sub/', 'sub/b.txt',
+            'sub/empty/'])
+        self.assertEqual(zf.read('a.txt'), b'A' * 300000)
+        self.assertEqual(zf.read('sub/b.txt'), b'Bee')
+        info = zf.getinfo('a.txt')
+        # Data descriptor, compressed
+        self.assertTrue(info.flag_bits & 0x08)
+        self.assertEqual(info.compress_type, zipfile.ZIP_DEFLATED)
+        self.assertLess(info.compress_size, info.file_size)
+
+    def test_store(self):
+        r = self._run(['sub'], compress='0')
+        self.assertIn('sub.zip', self.finder.headers['Content-Disposition'])
+        zf = zipfile.ZipFile(io.BytesIO(b''.join(r['file'])))
+        self.assertEqual(zf.getinfo('sub/b.txt').compress_type,
+            zipfile.ZIP_STORED)
+
+    def test_not_found(self):
+        with self.assertRaises(exc.FinderError):
+            self._run(['missing.txt'])
+
+    def test_link_loop(self):
+        os.symlink('..', os.path.join(self.top, 'sub', 'up'))
+        r = self._run(['sub'])
+        zf = zipfile.ZipFile(io.BytesIO(b''.join(r['file'])))
+        self.assertEqual(zf.namelist(), ['sub/', 'sub/b.txt', 'sub/empty/',
+            'sub/up/'])
@@ -0,0 +1,105 @@
+import unittest
+import os
+import shutil
+import copy
+
+import pym_elfinder.exceptions as exc
+from .. import lib
+from .. import lib_localfilesystem as lfs
+
+
+class TestCmdUploadChunked(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.finder = lib.create_finder()
+        cls.quarantine = os.path.join(lib.DEF_OPTS['roots'][0]['path'],
+            '.quarantine')
+        cls.data = os.urandom(25000)
+
+    def setUp(self):
+        self.fn = os.path.join(lfs.DIR, 'chunked.bin')
+
+    def tearDown(self):
+        if os.path.exists(self.fn):
+            os.remove(self.fn)
+        shutil.rmtree(self.quarantine, ignore_errors=True)
+
+    def _chunk(self, index, last=2, size=10000, cid='42', finder=None):
+        finder = finder or self.finder
+        vol = finder.default_volume
+        start = index * size
+        data = self.data[start:start + size]
+        finder.run('upload', dict(
+            target=vol.encode(lfs.DIR),
+            upload=[ lib.Upload('blob', data) ],
+            chunk='chunked.bin.{0}_{1}.part'.format(index, last),
+            cid=cid,
+            range='{0},{1},{2}'.format(start, len(data), len(self.data))
+        ))
+        return finder.response
+
+    def _finish(self, r):
+        vol = self.finder.default_volume
+        self.finder.run('upload', dict(target=vol.encode(lfs.DIR),
+            upload=[ r['_name'] ], chunk=r['_chunkmerged']))
+        return self.finder.response
+
+    def test_chunks_out_of_order(self):
+        self.assertNotIn('_chunkmerged', self._chunk(2))
+        self.assertNotIn('_chunkmerged', self._chunk(0))
+        r = self._chunk(1)
+        self.assertEqual(r['_name'], 'chunked.bin')
+        self.assertFalse(os.path.exists(self.fn))
+        r = self._finish(r)
+        self.assertEqual(r['added'][0]['name'], 'chunked.bin')
+        self.assertEqual(r['added'][0]['size'], len(self.data))
+        with open(self.fn, 'rb') as fh:
+            self.assertEqual(fh.read(), self.data)
+        # Staging area is cleaned up
+        self.assertEqual(os.listdir(os.path.join(self.quarantine, 'chunks')),
+            [])
+
+    def test_status(self):
+        vol = self.finder.default_volume
+        self._chunk(0)
+        self._chunk(2)
+        self.finder.run('chunkstatus', dict(target=vol.encode(lfs.DIR),
+            chunk='chunked.bin.0_2.part', cid='42'))
+        r = self.finder.response
+        self.assertEqual(r['received'], [0, 2])
+        self.assertEqual(r['last'], 2)
+        self.assertEqual(r['size'], len(self.data))
+        # Resend lost chunk to complete the upload
+        self.assertIn('_chunkmerged', self._chunk(1))
+
+    def test_quarantine_hidden(self):
+        self._chunk(0)
+        vol = self.finder.default_volume
+        self.finder.run('open', dict(target=vol.root_hash()))
+        names = [ f['name'] for f in self.finder.response['files'] ]
+        self.assertNotIn('.quarantine', names)
+
+    def test_short_chunk(self):
+        vol = self.finder.default_volume
+        with self.assertRaises(exc.FinderError):
+            self.finder.run('upload', dict(
+                target=vol.encode(lfs.DIR),
+                upload=[ lib.Upload('blob', b'abc') ],
+                chunk='chunked.bin.0_0.part',
+                cid='7',
+                range='0,10,10'
+            ))
+
+    def test_mime_denied(self):
+        opts = copy.deepcopy(lib.DEF_OPTS)
+        opts['roots'][0]['uploadDeny'] = ['all']
+        finder = lib.create_finder(opts)
+        self._chunk(0, finder=finder)
+        self._chunk(1, finder=finder)
+        r = self._chunk(2, finder=finder)
+        vol = finder.default_volume
+        with self.assertRaises(exc.FinderError):
+            finder.run('upload', dict(target=vol.encode(lfs.DIR),
+                upload=[ r['_name'] ], chunk=r['_chunkmerged']))
+        self.assertFalse(os.path.exists(self.fn))
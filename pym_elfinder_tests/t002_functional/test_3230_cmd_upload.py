@@ -0,0 +1,197 @@
+import unittest
+import os
+import io
+import copy
+import tempfile
+
+import pym_elfinder.exceptions as exc
+from .. import lib
+from .. import lib_localfilesystem as lfs
+
+
+class Stream(object):
+    """Unseekable upload stream."""
+
+    def __init__(self, data):
+        self._fd = io.BytesIO(data)
+
+    def read(self, size=-1):
+        return self._fd.read(size)
+
+    def close(self):
+        self._fd.close()
+
+
+class TestCmdUpload(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        opts = copy.deepcopy(lib.DEF_OPTS)
+        opts['roots'][0]['uploadMaxSize'] = 100000
+        cls.finder = lib.create_finder(opts)
+
+    def setUp(self):
+        self.fn = os.path.join(lfs.DIR, 'uploaded.bin')
+
+    def tearDown(self):
+        if os.path.exists(self.fn):
+            os.remove(self.fn)
+        # No temporary files are left behind
+        self.assertEqual([ n for n in os.listdir(lfs.DIR)
+            if n.endswith('.upload') ], [])
+
+    def _upload(self, fo):
+        vol = self.finder.default_volume
+        self.finder.run('upload', dict(target=vol.encode(lfs.DIR),
+            upload=[ lib.Upload('uploaded.bin', fo) ]))
+        return self.finder.response
+
+    def test_stream(self):
+        data = os.urandom(70000)
+        r = self._upload(Stream(data))
+        self.assertEqual(r['added'][0]['size'], len(data))
+        with open(self.fn, 'rb') as fh:
+            self.assertEqual(fh.read(), data)
+
+    def test_spooled_file(self):
+        data = os.urandom(70000)
+        tmp = tempfile.TemporaryFile()
+        tmp.write(data)
+        tmp.seek(0)
+        # Buffered read-ahead must not confuse the zero-copy path
+        tmp.read(10)
+        r = self._upload(tmp)
+        self.assertEqual(r['added'][0]['size'], len(data) - 10)
+        with open(self.fn, 'rb') as fh:
+            self.assertEqual(fh.read(), data[10:])
+
+    def test_too_large(self):
+        r = self._upload(Stream(b'x' * 100001))
+        self.assertEqual(r['added'], [])
+        self.assertEqual(r['error'][0], exc.ERROR_UPLOAD_FILE_SIZE)
+        self.assertFalse(os.path.exists(self.fn))
+
+    def test_too_large_spooled(self):
+        tmp = tempfile.TemporaryFile()
+        tmp.write(b'x' * 150000)
+        tmp.seek(0)
+        r = self._upload(tmp)
+        self.assertEqual(r['error'][0], exc.ERROR_UPLOAD_FILE_SIZE)
+        self.assertFalse(os.path.exists(self.fn))
+
+
+class TestCmdUploadMany(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        opts = copy.deepcopy(lib.DEF_OPTS)
+        opts['roots'][0]['uploadMaxSize'] = 100000
+        cls.finder = lib.create_finder(opts)
+        cls.names = [ 'many_{0}.bin'.format(i) for i in range(8) ]
+
+    def tearDown(self):
+        for name in self.names:
+            fn = os.path.join(lfs.DIR, name)
+            if os.path.exists(fn):
+                os.remove(fn)
+
+    def _upload(self, sizes, spooled=True):
+        vol = self.finder.default_volume
+        files = []
+        for name, size in zip(self.names, sizes):
+            data = name.encode('ascii') * (size // len(name))
+            files.append(lib.Upload(name, io.BytesIO(data) if spooled
+                else Stream(data)))
+        self.finder.run('upload', dict(target=vol.encode(lfs.DIR),
+            upload=files))
+        return self.finder.response
+
+    def test_concurrent(self):
+        r = self._upload([ 50000 ] * 8)
+        self.assertEqual([ f['name'] for f in r['added'] ], self.names)
+        self.assertNotIn('warning', r)
+        for name in self.names:
+            with open(os.path.join(lfs.DIR, name), 'rb') as fh:
+                self.assertEqual(fh.read(), name.encode('ascii') * (50000 // len(name)))
+
+    def test_errors_do_not_abort(self):
+        r = self._upload([ 1000, 200000, 1000, 200000 ], spooled=False)
+        self.assertEqual([ f['name'] for f in r['added'] ],
+            [ self.names[0], self.names[2] ])
+        self.assertEqual(sorted(r['errorData']),
+            [ self.names[1], self.names[3] ])
+        self.assertEqual(r['warning'][:2],
+            [ exc.ERROR_UPLOAD_FILE, self.names[1] ])
+        self.assertNotIn('error', r)
+        self.assertEqual(len(self.finder.upload_errors), 2)
+
+    def test_quota_reserved(self):
+        vol = self.finder.default_volume
+        max_size = vol._max_size
+        # Room for two files only
+        vol._max_size = vol.used_size + 2 * 50000 + 10
+        try:
+            r = self._upload([ 50000 ] * 4)
+        finally:
+            vol._max_size = max_size
+        self.assertEqual(len(r['added']), 2)
+        self.assertEqual(len(r['errorData']), 2)
+
+
+class CountingStream(Stream):
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.count = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.count += len(data)
+        return data
+
+
+class TestUploadMime(unittest.TestCase):
+
+    PNG = (b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00'
+        b'\x00\x01\x08\x06\x00\x00\x00\x1f\x15\xc4\x89')
+
+    @classmethod
+    def setUpClass(cls):
+        opts = copy.deepcopy(lib.DEF_OPTS)
+        opts['roots'][0]['uploadMaxSize'] = 10 * 1024 * 1024
+        opts['roots'][0]['max_size'] = 100 * 1024 * 1024
+        opts['roots'][0]['uploadDeny'] = ['text']
+        cls.finder = lib.create_finder(opts)
+        cls.fn = os.path.join(lfs.DIR, 'sniffed')
+
+    def tearDown(self):
+        if os.path.exists(self.fn):
+            os.remove(self.fn)
+
+    def _upload(self, fo):
+        vol = self.finder.default_volume
+        self.finder.run('upload', dict(target=vol.encode(lfs.DIR),
+            upload=[ lib.Upload('sniffed', fo) ]))
+        return self.finder.response
+
+    def test_denied_early(self):
+        stream = CountingStream(b'Just some text.\n' * 300000)
+        r = self._upload(stream)
+        self.assertEqual(r['error'][0], exc.ERROR_UPLOAD_FILE_MIME)
+        self.assertFalse(os.path.exists(self.fn))
+        # Rejected after the first block
+        self.assertLess(stream.count, 2 * 1024 * 1024)
+
+    def test_denied_spooled(self):
+        tmp = tempfile.TemporaryFile()
+        tmp.write(b'Just some text.\n' * 1000)
+        tmp.seek(0)
+        r = self._upload(tmp)
+        self.assertEqual(r['error'][0], exc.ERROR_UPLOAD_FILE_MIME)
+        self.assertFalse(os.path.exists(self.fn))
+
+    def test_allowed_and_cached(self):
+        from pym_elfinder.volume import localfilesystem
+        r = self._upload(Stream(self.PNG))
+        self.assertEqual(r['added'][0]['mime'], 'image/png')
+        self.assertEqual(localfilesystem._MIME_CACHE[self.fn][1], 'image/png')
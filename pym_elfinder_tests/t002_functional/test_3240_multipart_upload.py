@@ -0,0 +1,91 @@
+import unittest
+import os
+import io
+
+import pym_elfinder.exceptions as exc
+from pym_elfinder import multipart
+from .. import lib
+from .. import lib_localfilesystem as lfs
+
+
+BOUNDARY = '----pymElfinderBoundary42'
+
+
+def build_body(fields, files):
+    lines = []
+    for name, value in fields:
+        lines.append('--{0}\r\nContent-Disposition: form-data; '
+            'name="{1}"\r\n\r\n{2}\r\n'.format(BOUNDARY, name, value)
+            .encode('utf-8'))
+    for name, filename, data in files:
+        lines.append('--{0}\r\nContent-Disposition: form-data; '
+            'name="{1}"; filename="{2}"\r\n'
+            'Content-Type: application/octet-stream\r\n\r\n'.format(
+            BOUNDARY, name, filename).encode('utf-8'))
+        lines.append(data + b'\r\n')
+    lines.append('--{0}--\r\n'.format(BOUNDARY).encode('utf-8'))
+    return b''.join(lines)
+
+
+class TestMultipartParser(unittest.TestCase):
+
+    def test_parts(self):
+        data = os.urandom(5000) + b'\r\n--' + BOUNDARY[:-1].encode() + b'\r\n'
+        body = build_body([ ('cmd', 'upload') ],
+            [ ('upload[]', 'a.bin', data), ('upload[]', 'empty', b'') ])
+        # Tiny blocks put boundaries across reads
+        parser = multipart.MultipartParser(io.BytesIO(body), BOUNDARY,
+            len(body), block_size=7)
+        parts = [ (p.name, p.filename, p.read()) for p in parser ]
+        self.assertEqual(parts, [ ('cmd', None, b'upload'),
+            ('upload[]', 'a.bin', data), ('upload[]', 'empty', b'') ])
+
+    def test_unread_parts_are_skipped(self):
+        body = build_body([], [ ('upload[]', 'a', b'x' * 1000),
+            ('upload[]', 'b', b'y' * 10) ])
+        parser = multipart.MultipartParser(io.BytesIO(body), BOUNDARY)
+        names = [ p.filename for p in parser ]
+        self.assertEqual(names, ['a', 'b'])
+
+    def test_truncated(self):
+        body = build_body([], [ ('upload[]', 'a', b'x' * 1000) ])[:500]
+        parser = multipart.MultipartParser(io.BytesIO(body), BOUNDARY)
+        with self.assertRaises(exc.FinderError):
+            for part in parser:
+                part.read()
+
+    def test_content_type(self):
+        self.assertEqual(multipart.boundary_from_content_type(
+            'multipart/form-data; boundary="{0}"'.format(BOUNDARY)), BOUNDARY)
+        with self.assertRaises(exc.FinderError):
+            multipart.boundary_from_content_type('text/plain')
+
+
+class TestMultipartUpload(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.finder = lib.create_finder()
+
+    def tearDown(self):
+        for name in ('mp_a.bin', 'mp_b.bin'):
+            fn = os.path.join(lfs.DIR, name)
+            if os.path.exists(fn):
+                os.remove(fn)
+
+    def test_upload(self):
+        vol = self.finder.default_volume
+        a, b = os.urandom(300000), os.urandom(10)
+        body = build_body([ ('cmd', 'upload'), ('target', vol.encode(lfs.DIR)) ],
+            [ ('upload[]', 'mp_a.bin', a), ('upload[]', 'mp_b.bin', b) ])
+        fields, files = multipart.parse_upload(io.BytesIO(body),
+            'multipart/form-data; boundary=' + BOUNDARY, str(len(body)))
+        self.assertEqual(fields['cmd'], 'upload')
+        self.finder.run('upload', dict(target=fields['target'], upload=files))
+        r = self.finder.response
+        self.assertEqual([ f['name'] for f in r['added'] ],
+            ['mp_a.bin', 'mp_b.bin'])
+        with open(os.path.join(lfs.DIR, 'mp_a.bin'), 'rb') as fh:
+            self.assertEqual(fh.read(), a)
+        with open(os.path.join(lfs.DIR, 'mp_b.bin'), 'rb') as fh:
+            self.assertEqual(fh.read(), b)
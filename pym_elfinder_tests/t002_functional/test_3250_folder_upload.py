@@ -0,0 +1,69 @@
+import unittest
+import os
+import shutil
+
+import pym_elfinder.exceptions as exc
+from .. import lib
+from .. import lib_localfilesystem as lfs
+
+
+class TestFolderUpload(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.finder = lib.create_finder()
+        cls.top = os.path.join(lfs.DIR, 'folder')
+
+    def setUp(self):
+        os.mkdir(self.top)
+
+    def tearDown(self):
+        shutil.rmtree(self.top)
+
+    def test_mkdir_dirs(self):
+        vol = self.finder.default_volume
+        os.mkdir(os.path.join(self.top, 'photos'))
+        dirs = ['/photos/2013/summer', '/photos/2013/winter', '/docs']
+        self.finder.run('mkdir', dict(target=vol.encode(self.top), dirs=dirs))
+        r = self.finder.response
+        # "photos" existed already
+        self.assertEqual(sorted(st['name'] for st in r['added']),
+            ['2013', 'docs', 'summer', 'winter'])
+        self.assertEqual(sorted(r['hashes']), sorted(dirs))
+        self.assertEqual(vol.decode(r['hashes']['/photos/2013/summer']),
+            os.path.join(self.top, 'photos', '2013', 'summer'))
+        self.assertTrue(os.path.isdir(
+            os.path.join(self.top, 'photos', '2013', 'winter')))
+
+    def test_mkdir_invalid(self):
+        vol = self.finder.default_volume
+        with self.assertRaises(exc.FinderError):
+            self.finder.run('mkdir', dict(target=vol.encode(self.top),
+                dirs=['/ok/../../escape']))
+        with self.assertRaises(exc.FinderError):
+            self.finder.run('mkdir', dict(target=vol.encode(self.top),
+                dirs=['/ok/.hidden']))
+        self.assertEqual(os.listdir(self.top), [])
+
+    def test_mkdir_file_in_the_way(self):
+        vol = self.finder.default_volume
+        lfs.mkfile(os.path.join(self.top, 'a'))
+        with self.assertRaises(exc.FinderError):
+            self.finder.run('mkdir', dict(target=vol.encode(self.top),
+                dirs=['/a/b']))
+
+    def test_upload_into_tree(self):
+        vol = self.finder.default_volume
+        self.finder.run('mkdir', dict(target=vol.encode(self.top),
+            dirs=['/x', '/x/y']))
+        hashes = self.finder.response['hashes']
+        self.finder.run('upload', dict(target=vol.encode(self.top),
+            upload=[ lib.Upload('1.txt', b'one'),
+                lib.Upload('2.txt', b'two'), lib.Upload('3.txt', b'three') ],
+            upload_path=[ hashes['/x'], hashes['/x/y'], '' ]))
+        r = self.finder.response
+        self.assertEqual(len(r['added']), 3)
+        self.assertTrue(os.path.isfile(os.path.join(self.top, 'x', '1.txt')))
+        self.assertTrue(os.path.isfile(
+            os.path.join(self.top, 'x', 'y', '2.txt')))
+        self.assertTrue(os.path.isfile(os.path.join(self.top, '3.txt')))
@@ -0,0 +1,74 @@
+import unittest
+import os
+import copy
+import shutil
+
+from .. import lib
+from .. import lib_localfilesystem as lfs
+
+
+class TestUploadDedup(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        opts = copy.deepcopy(lib.DEF_OPTS)
+        opts['roots'][0]['dedup'] = True
+        cls.finder = lib.create_finder(opts)
+        cls.quarantine = os.path.join(lib.DEF_OPTS['roots'][0]['path'],
+            '.quarantine')
+        cls.names = ['a.pdf', 'b.pdf', 'c.pdf']
+
+    def tearDown(self):
+        for name in self.names:
+            fn = os.path.join(lfs.DIR, name)
+            if os.path.exists(fn):
+                os.remove(fn)
+        shutil.rmtree(self.quarantine, ignore_errors=True)
+
+    def _upload(self, name, data):
+        vol = self.finder.default_volume
+        self.finder.run('upload', dict(target=vol.encode(lfs.DIR),
+            upload=[ lib.Upload(name, data) ]))
+        return self.finder.response
+
+    def test_same_content_is_linked(self):
+        data = os.urandom(30000)
+        vol = self.finder.default_volume
+        self._upload('a.pdf', data)
+        vol.update_quota()
+        used = vol.used_size
+        self._upload('b.pdf', data)
+        self._upload('c.pdf', os.urandom(30000))
+        a, b, c = [ os.stat(os.path.join(lfs.DIR, n)) for n in self.names ]
+        self.assertEqual(a.st_ino, b.st_ino)
+        self.assertNotEqual(a.st_ino, c.st_ino)
+        # Linked copy occupies no more space
+        vol.update_quota()
+        self.assertEqual(vol.used_size, used + 30000)
+        with open(os.path.join(lfs.DIR, 'b.pdf'), 'rb') as fh:
+            self.assertEqual(fh.read(), data)
+        self.assertEqual([ n for n in os.listdir(lfs.DIR)
+            if n.endswith(('.upload', '.link')) ], [])
+
+    def test_put_breaks_link(self):
+        data = b'same content'
+        self._upload('a.pdf', data)
+        self._upload('b.pdf', data)
+        vol = self.finder.default_volume
+        fn = os.path.join(lfs.DIR, 'b.pdf')
+        vol.put_content(vol.encode(fn), 'new content')
+        with open(fn, 'rb') as fh:
+            self.assertEqual(fh.read(), b'new content')
+        with open(os.path.join(lfs.DIR, 'a.pdf'), 'rb') as fh:
+            self.assertEqual(fh.read(), data)
+
+    def test_same_content_same_name(self):
+        data = b'same content'
+        self._upload('a.pdf', data)
+        r = self._upload('a.pdf', data)
+        self.assertEqual(r['added'][0]['name'], 'a.pdf')
+        # No temporary link is left behind
+        self.assertEqual([ n for n in os.listdir(lfs.DIR)
+            if n.endswith(('.upload', '.link')) ], [])
+        with open(os.path.join(lfs.DIR, 'a.pdf'), 'rb') as fh:
+            self.assertEqual(fh.read(), data)
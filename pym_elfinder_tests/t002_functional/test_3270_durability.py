@@ -0,0 +1,85 @@
+import unittest
+import os
+import copy
+import shutil
+
+import pym_elfinder.exceptions as exc
+from .. import lib
+from .. import lib_localfilesystem as lfs
+
+
+class TestDurability(unittest.TestCase):
+
+    def setUp(self):
+        self.top = os.path.join(lfs.DIR, 'durable')
+        os.mkdir(self.top)
+
+    def tearDown(self):
+        shutil.rmtree(self.top)
+
+    def _finder(self, durability):
+        opts = copy.deepcopy(lib.DEF_OPTS)
+        opts['roots'][0]['durability'] = durability
+        return lib.create_finder(opts)
+
+    def _upload(self, finder, n=3):
+        vol = finder.default_volume
+        finder.run('upload', dict(target=vol.encode(self.top),
+            upload=[ lib.Upload('{0}.txt'.format(i), b'data')
+                for i in range(n) ]),
+            debug=True)
+        return finder.response
+
+    def test_none(self):
+        r = self._upload(self._finder('none'))
+        self.assertNotIn('durability', r['debug']['volumes'][0])
+
+    def test_file(self):
+        r = self._upload(self._finder('file'))
+        sync = r['debug']['volumes'][0]['durability']
+        # Each file before it is renamed, and then with its dir
+        self.assertEqual(sync['files'], 9)
+
+    def test_file_synced_before_rename(self):
+        finder = self._finder('file')
+        vol = finder.default_volume
+        sync = vol._sync_before_rename
+        seen = []
+
+        def spy(fd):
+            seen.append(os.path.exists(os.path.join(self.top, '0.txt')))
+            sync(fd)
+
+        vol._sync_before_rename = spy
+        self._upload(finder, 1)
+        # Synced while still under its temporary name
+        self.assertEqual(seen, [ False ])
+        self.assertTrue(os.path.exists(os.path.join(self.top, '0.txt')))
+
+    def test_batch(self):
+        finder = self._finder('batch')
+        r = self._upload(finder)
+        sync = r['debug']['volumes'][0]['durability']
+        # Files, and their common dir once
+        self.assertEqual(sync['files'], 4)
+        self.assertEqual(len(r['added']), 3)
+        self.assertEqual(finder.default_volume._unsynced, set())
+
+    def test_batch_copy(self):
+        finder = self._finder('batch')
+        vol = finder.default_volume
+        src = os.path.join(self.top, 'src')
+        os.makedirs(os.path.join(src, 'sub'))
+        lfs.mkfile(os.path.join(src, 'sub', 'f.txt'), 'content')
+        os.mkdir(os.path.join(self.top, 'dst'))
+        finder.run('paste', dict(src=vol.encode(self.top),
+            dst=vol.encode(os.path.join(self.top, 'dst')),
+            targets=[ vol.encode(src) ], cut=False), debug=True)
+        sync = finder.response['debug']['volumes'][0]['durability']
+        # dst, dst/src, dst/src/sub, dst/src/sub/f.txt
+        self.assertEqual(sync['files'], 4)
+        self.assertEqual(vol.copied, dict(files=1, dirs=2, bytes=7))
+
+    def test_invalid(self):
+        finder = self._finder('always')
+        self.assertEqual(finder.volumes, {})
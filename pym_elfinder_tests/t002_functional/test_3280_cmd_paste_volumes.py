@@ -0,0 +1,241 @@
+import unittest
+import os
+import copy
+import shutil
+import tempfile
+import zipfile
+
+import pym_elfinder.exceptions as exc
+from .. import lib
+
+
+class TestCmdPasteVolumes(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.src_dir = os.path.join(self.tmp_dir, 'src')
+        self.dst_dir = os.path.join(self.tmp_dir, 'dst')
+        os.makedirs(os.path.join(self.src_dir, 'folder', 'sub'))
+        os.mkdir(self.dst_dir)
+        with open(os.path.join(self.src_dir, 'folder', 'sub', 'f.txt'),
+                'w') as fh:
+            fh.write('content')
+        self.zip_fn = os.path.join(self.tmp_dir, 'bundle.zip')
+        with zipfile.ZipFile(self.zip_fn, 'w', zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr('docs/manual.txt', 'Manual ' * 1000)
+            zf.writestr('docs/api/index.html', '<html></html>')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _finder(self, **dst_opts):
+        opts = copy.deepcopy(lib.DEF_OPTS)
+        opts['roots'] = [
+            dict(id='1', driver='pym_elfinder.volume.localfilesystem',
+                path=self.src_dir),
+            dict(id='2', driver='pym_elfinder.volume.localfilesystem',
+                path=self.dst_dir, **dst_opts),
+            dict(id='3', driver='pym_elfinder.volume.ziparchive',
+                path=self.zip_fn),
+        ]
+        finder = lib.create_finder(opts)
+        return (finder, finder.volumes['l1_'], finder.volumes['l2_'],
+            finder.volumes['z3_'])
+
+    def _paste(self, finder, src_vol, src, dst_vol, cut=False):
+        finder.run('paste', dict(src=src_vol.root_hash(),
+            dst=dst_vol.root_hash(), targets=[ src_vol.encode(src) ],
+            cut=cut))
+        return finder.response
+
+    def test_copy_local(self):
+        finder, src_vol, dst_vol, _ = self._finder()
+        r = self._paste(finder, src_vol, os.path.join(self.src_dir, 'folder'),
+            dst_vol)
+        self.assertEqual(r['added'][0]['hash'],
+            dst_vol.encode(os.path.join(self.dst_dir, 'folder')))
+        with open(os.path.join(self.dst_dir, 'folder', 'sub', 'f.txt')) as fh:
+            self.assertEqual(fh.read(), 'content')
+        self.assertTrue(os.path.exists(os.path.join(self.src_dir, 'folder')))
+
+    def test_move_local(self):
+        finder, src_vol, dst_vol, _ = self._finder()
+        src = os.path.join(self.src_dir, 'folder')
+        r = self._paste(finder, src_vol, src, dst_vol, cut=True)
+        self.assertEqual(r['removed'], [ src_vol.encode(src) ])
+        self.assertFalse(os.path.exists(src))
+        self.assertTrue(os.path.exists(
+            os.path.join(self.dst_dir, 'folder', 'sub', 'f.txt')))
+
+    def test_copy_streamed(self):
+        finder, _, dst_vol, zip_vol = self._finder()
+        r = self._paste(finder, zip_vol, '/docs', dst_vol)
+        self.assertEqual(r['added'][0]['name'], 'docs')
+        with open(os.path.join(self.dst_dir, 'docs', 'manual.txt')) as fh:
+            self.assertEqual(fh.read(), 'Manual ' * 1000)
+        self.assertTrue(os.path.isfile(
+            os.path.join(self.dst_dir, 'docs', 'api', 'index.html')))
+
+    def test_move_from_readonly(self):
+        finder, _, dst_vol, zip_vol = self._finder()
+        with self.assertRaises(exc.FinderError):
+            self._paste(finder, zip_vol, '/docs', dst_vol, cut=True)
+        self.assertEqual(os.listdir(self.dst_dir), [])
+
+    def test_copy_to_denied(self):
+        finder, src_vol, dst_vol, _ = self._finder(copyTo=False)
+        with self.assertRaises(exc.FinderError) as cm:
+            self._paste(finder, src_vol,
+                os.path.join(self.src_dir, 'folder'), dst_vol)
+        self.assertEqual(cm.exception.args[0], exc.ERROR_COPY_TO)
+
+    def test_quota(self):
+        # Size of the tree counts, not the size of the dir
+        finder, _, dst_vol, zip_vol = self._finder(max_size=1000)
+        with self.assertRaises(exc.FinderError):
+            self._paste(finder, zip_vol, '/docs', dst_vol)
+        self.assertEqual(os.listdir(self.dst_dir), [])
+
+    def _existing(self, content='existing'):
+        fn = os.path.join(self.dst_dir, 'f.txt')
+        with open(fn, 'w') as fh:
+            fh.write(content)
+        return fn
+
+    def test_dst_exists_locked(self):
+        fn = self._existing()
+        finder, src_vol, dst_vol, _ = self._finder(acl=[
+            { 'pattern' : r'^/f\.txt$', 'locked' : True, 'write' : False } ])
+        r = self._paste(finder, src_vol,
+            os.path.join(self.src_dir, 'folder', 'sub', 'f.txt'), dst_vol)
+        # Locked item is kept, copy gets a unique name
+        self.assertEqual(r['added'][0]['name'], 'f (copy 1).txt')
+        with open(fn) as fh:
+            self.assertEqual(fh.read(), 'existing')
+
+    def test_dst_exists_overwrite(self):
+        fn = self._existing()
+        finder, src_vol, dst_vol, _ = self._finder()
+        r = self._paste(finder, src_vol,
+            os.path.join(self.src_dir, 'folder', 'sub', 'f.txt'), dst_vol)
+        self.assertEqual(r['added'][0]['name'], 'f.txt')
+        with open(fn) as fh:
+            self.assertEqual(fh.read(), 'content')
+
+    def test_dst_exists_no_overwrite(self):
+        fn = self._existing()
+        finder, src_vol, dst_vol, _ = self._finder(copyOverwrite=False)
+        r = self._paste(finder, src_vol,
+            os.path.join(self.src_dir, 'folder', 'sub', 'f.txt'), dst_vol)
+        self.assertEqual(r['added'][0]['name'], 'f (copy 1).txt')
+        with open(fn) as fh:
+            self.assertEqual(fh.read(), 'existing')
+
+    def test_move_src_dir_readonly(self):
+        finder, src_vol, dst_vol, _ = self._finder()
+        src_vol._acl.append({ 'pattern' : r'^/folder/sub$', 'write' : False })
+        src = os.path.join(self.src_dir, 'folder', 'sub', 'f.txt')
+        with self.assertRaises(exc.FinderError):
+            self._paste(finder, src_vol, src, dst_vol, cut=True)
+        self.assertTrue(os.path.exists(src))
+        self.assertEqual(os.listdir(self.dst_dir), [])
+
+    def test_paste_many_same_name(self):
+        fn = self._existing()
+        other_dir = os.path.join(self.src_dir, 'other')
+        os.mkdir(other_dir)
+        with open(os.path.join(other_dir, 'f.txt'), 'w') as fh:
+            fh.write('other')
+        finder, src_vol, dst_vol, _ = self._finder(copyOverwrite=False)
+        finder.run('paste', dict(src=src_vol.root_hash(),
+            dst=dst_vol.root_hash(), targets=[
+                src_vol.encode(os.path.join(self.src_dir, 'folder', 'sub',
+                    'f.txt')),
+                src_vol.encode(os.path.join(other_dir, 'f.txt')) ]))
+        names = [ it['name'] for it in finder.response['added'] ]
+        self.assertEqual(names, [ 'f (copy 1).txt', 'f (copy 2).txt' ])
+        with open(os.path.join(self.dst_dir, 'f (copy 2).txt')) as fh:
+            self.assertEqual(fh.read(), 'other')
+        with open(fn) as fh:
+            self.assertEqual(fh.read(), 'existing')
+
+    def test_paste_many_new_same_name(self):
+        other_dir = os.path.join(self.src_dir, 'other')
+        os.mkdir(other_dir)
+        with open(os.path.join(other_dir, 'f.txt'), 'w') as fh:
+            fh.write('other')
+        finder, src_vol, dst_vol, _ = self._finder()
+        finder.run('paste', dict(src=src_vol.root_hash(),
+            dst=dst_vol.root_hash(), targets=[
+                src_vol.encode(os.path.join(self.src_dir, 'folder', 'sub',
+                    'f.txt')),
+                src_vol.encode(os.path.join(other_dir, 'f.txt')) ]))
+        # Second item does not overwrite the first one
+        names = [ it['name'] for it in finder.response['added'] ]
+        self.assertEqual(names, [ 'f.txt', 'f (copy 1).txt' ])
+
+    def _hidden_finder(self):
+        opts = copy.deepcopy(lib.DEF_OPTS)
+        hidden = [ { 'pattern' : r'/secret\.txt$', 'hidden' : True } ]
+        opts['roots'] = [
+            dict(id='1', driver='pym_elfinder.volume.localfilesystem',
+                path=self.src_dir, acl=hidden),
+            dict(id='2', driver='pym_elfinder.volume.localfilesystem',
+                path=self.dst_dir),
+        ]
+        with open(os.path.join(self.src_dir, 'folder', 'secret.txt'),
+                'w') as fh:
+            fh.write('secret')
+        finder = lib.create_finder(opts)
+        return finder, finder.volumes['l1_'], finder.volumes['l2_']
+
+    def test_copy_hidden_skipped(self):
+        finder, src_vol, dst_vol = self._hidden_finder()
+        self._paste(finder, src_vol, os.path.join(self.src_dir, 'folder'),
+            dst_vol)
+        self.assertTrue(os.path.exists(
+            os.path.join(self.dst_dir, 'folder', 'sub', 'f.txt')))
+        self.assertFalse(os.path.exists(
+            os.path.join(self.dst_dir, 'folder', 'secret.txt')))
+
+    def test_move_hidden_refused(self):
+        finder, src_vol, dst_vol = self._hidden_finder()
+        src = os.path.join(self.src_dir, 'folder')
+        with self.assertRaises(exc.FinderError):
+            self._paste(finder, src_vol, src, dst_vol, cut=True)
+        self.assertTrue(os.path.exists(os.path.join(src, 'secret.txt')))
+        self.assertEqual(os.listdir(self.dst_dir), [])
+
+    def test_stream_failed(self):
+        finder, _, dst_vol, zip_vol = self._finder()
+        save = dst_vol._save_uploaded
+        calls = []
+
+        def failing_save(fd, dst_path, name, *args, **kw):
+            calls.append(name)
+            if len(calls) > 1:
+                fd.close()
+                raise exc.FinderError(exc.ERROR_UPLOAD)
+            return save(fd, dst_path, name, *args, **kw)
+
+        dst_vol._save_uploaded = failing_save
+        with self.assertRaises(exc.FinderError):
+            self._paste(finder, zip_vol, '/docs', dst_vol)
+        # Partial copy is removed
+        self.assertFalse(os.path.exists(os.path.join(self.dst_dir, 'docs')))
+
+    def test_overwrite_failed(self):
+        fn = self._existing()
+        finder, src_vol, dst_vol, _ = self._finder()
+
+        def failing_copy(*args):
+            raise exc.FinderError(exc.ERROR_COPY)
+
+        dst_vol._copy = failing_copy
+        with self.assertRaises(exc.FinderError):
+            self._paste(finder, src_vol,
+                os.path.join(self.src_dir, 'folder', 'sub', 'f.txt'), dst_vol)
+        # Existing item is kept if its replacement could not be copied
+        with open(fn) as fh:
+            self.assertEqual(fh.read(), 'existing')
+        self.assertEqual(os.listdir(self.dst_dir), [ 'f.txt' ])
@@ -0,0 +1,108 @@
+import unittest
+import os
+import copy
+import shutil
+import time
+
+import pym_elfinder.exceptions as exc
+from pym_elfinder.volume import localfilesystem
+from .. import lib
+from .. import lib_localfilesystem as lfs
+
+
+class TestCmdTrash(unittest.TestCase):
+
+    def setUp(self):
+        opts = copy.deepcopy(lib.DEF_OPTS)
+        opts['roots'][0]['trash'] = 'trash'
+        self.finder = lib.create_finder(opts)
+        self.vol = self.finder.default_volume
+        self.quarantine = os.path.join(lib.DEF_OPTS['roots'][0]['path'],
+            '.quarantine')
+        self.top = os.path.join(lfs.DIR, 'trashed')
+        os.makedirs(os.path.join(self.top, 'sub'))
+        lfs.mkfile(os.path.join(self.top, 'sub', 'f.txt'), 'content')
+        lfs.mkfile(os.path.join(lfs.DIR, 'lone.txt'), 'lone')
+
+    def tearDown(self):
+        shutil.rmtree(self.top, ignore_errors=True)
+        for name in ('lone.txt', 'lone (restored 1).txt'):
+            fn = os.path.join(lfs.DIR, name)
+            if os.path.exists(fn):
+                os.remove(fn)
+        localfilesystem._PURGER.wait()
+        shutil.rmtree(self.quarantine, ignore_errors=True)
+
+    def _rm(self, *paths):
+        self.finder.run('rm', dict(targets=[ self.vol.encode(p)
+            for p in paths ]))
+
+    def _list(self):
+        self.finder.run('trash', dict(target=self.vol.root_hash()))
+        return self.finder.response['files']
+
+    def test_rm_and_restore(self):
+        self.vol.update_quota()
+        used = self.vol.used_size
+        self._rm(self.top, os.path.join(lfs.DIR, 'lone.txt'))
+        self.assertFalse(os.path.exists(self.top))
+        # Trash still counts
+        self.vol.update_quota()
+        self.assertEqual(self.vol.used_size, used)
+        items = { it['name'] : it for it in self._list() }
+        self.assertEqual(sorted(items), ['lone.txt', 'trashed'])
+        self.assertEqual(items['trashed']['size'], 7)
+        self.assertEqual(items['trashed']['mime'], 'directory')
+        self.assertEqual(items['trashed']['path'],
+            self.vol._aliaspath(lfs.DIR))
+        self.finder.run('restore', dict(target=self.vol.root_hash(),
+            ids=[ items['trashed']['id'] ]))
+        r = self.finder.response
+        self.assertEqual(r['added'][0]['hash'], self.vol.encode(self.top))
+        with open(os.path.join(self.top, 'sub', 'f.txt')) as fh:
+            self.assertEqual(fh.read(), 'content')
+        self.assertEqual([ it['name'] for it in self._list() ], ['lone.txt'])
+
+    def test_restore_existing_and_missing_parent(self):
+        fn = os.path.join(self.top, 'sub', 'f.txt')
+        self._rm(fn)
+        self._rm(self.top)
+        id_ = [ it['id'] for it in self._list() if it['name'] == 'f.txt' ][0]
+        self.finder.run('restore', dict(target=self.vol.root_hash(),
+            ids=[ id_ ]))
+        # Parents are created again
+        self.assertTrue(os.path.isfile(fn))
+        self._rm(os.path.join(lfs.DIR, 'lone.txt'))
+        lfs.mkfile(os.path.join(lfs.DIR, 'lone.txt'), 'new')
+        id_ = [ it['id'] for it in self._list() if it['name'] == 'lone.txt' ][0]
+        self.finder.run('restore', dict(target=self.vol.root_hash(),
+            ids=[ id_ ]))
+        self.assertEqual(self.finder.response['added'][0]['name'],
+            'lone (restored 1).txt')
+
+    def test_restore_invalid(self):
+        with self.assertRaises(exc.FinderError):
+            self.finder.run('restore', dict(target=self.vol.root_hash(),
+                ids=[ '../../etc' ]))
+
+    def test_purge_expired(self):
+        self._rm(os.path.join(lfs.DIR, 'lone.txt'))
+        trash = os.path.join(self.quarantine, 'trash')
+        old = '{0:x}-{1}'.format(int(time.time()) - 3600, '0' * 12)
+        os.rename(os.path.join(trash, os.listdir(trash)[0]),
+            os.path.join(trash, old))
+        opts = copy.deepcopy(lib.DEF_OPTS)
+        opts['roots'][0]['trash'] = 'trash'
+        opts['roots'][0]['trashTTL'] = 60
+        localfilesystem._TRASH_CHECKED.clear()
+        lib.create_finder(opts)
+        localfilesystem._PURGER.wait()
+        self.assertEqual(os.listdir(trash), [])
+
+    def test_no_trash(self):
+        finder = lib.create_finder(lib.DEF_OPTS)
+        root = finder.default_volume.root_hash()
+        finder.run('trash', dict(target=root))
+        self.assertEqual(finder.response['files'], [])
+        with self.assertRaisesRegex(exc.FinderError, exc.ERROR_FILE_NOT_FOUND):
+            finder.run('restore', dict(target=root, ids=[ '1-' + '0' * 12 ]))
@@ -0,0 +1,91 @@
+import unittest
+import os
+import io
+import copy
+import shutil
+import tempfile
+
+import pym_elfinder.exceptions as exc
+from .. import lib
+from .. import lib_localfilesystem as lfs
+
+
+class TestProbe(unittest.TestCase):
+
+    def setUp(self):
+        opts = copy.deepcopy(lib.DEF_OPTS)
+        opts['roots'][0]['acl'] = [
+            { 'pattern' : r'/probe_locked\.txt$', 'locked' : True },
+        ]
+        self.finder = lib.create_finder(opts)
+        self.vol = self.finder.default_volume
+        self.dir = os.path.join(lfs.DIR, 'probe_dir')
+        self.fn = os.path.join(lfs.DIR, 'probe.txt')
+        self.locked = os.path.join(lfs.DIR, 'probe_locked.txt')
+        os.mkdir(self.dir)
+        lfs.mkfile(self.fn, 'old')
+        lfs.mkfile(self.locked, 'old')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+        for fn in (self.fn, self.locked):
+            if os.path.exists(fn):
+                os.remove(fn)
+
+    def _no_mime(self, *args, **kw):
+        raise AssertionError('mime-type must not be determined')
+
+    def test_probe(self):
+        self.vol.mimetype = self._no_mime
+        self.assertIsNone(self.vol.probe(os.path.join(lfs.DIR, 'nope')))
+        p = self.vol.probe(self.dir)
+        self.assertTrue(p['dir'])
+        self.assertEqual((p['read'], p['write'], p['locked'], p['hidden']),
+            (1, 1, 0, 0))
+        p = self.vol.probe(self.fn)
+        self.assertFalse(p['dir'])
+        self.assertEqual(self.vol.probe(self.locked)['locked'], 1)
+        self.assertEqual(self.vol.probe(self.vol._root_path)['locked'], 1)
+
+    def test_probe_link_out_of_root(self):
+        outside = tempfile.mkdtemp()
+        link = os.path.join(lfs.DIR, 'probe_link')
+        os.symlink(outside, link)
+        try:
+            # Must look like a broken link, not like the dir it points to
+            p = self.vol.probe(link)
+            self.assertFalse(p['dir'])
+            self.assertEqual((p['read'], p['write']), (0, 0))
+        finally:
+            os.remove(link)
+            os.rmdir(outside)
+
+    def test_mkdir_mkfile_exists(self):
+        cur = self.vol.encode(lfs.DIR)
+        for cmd in ('mkdir', 'mkfile'):
+            with self.assertRaisesRegex(exc.FinderError, exc.ERROR_EXISTS):
+                self.finder.run(cmd, dict(target=cur, name='probe.txt'))
+        self.finder.run('mkdir', dict(target=cur, name='probe_new'))
+        r = self.finder.response
+        self.assertEqual(r['added'][0]['name'], 'probe_new')
+        self.assertEqual(r['added'][0]['mime'], 'directory')
+        os.rmdir(os.path.join(lfs.DIR, 'probe_new'))
+
+    def _upload(self, name):
+        self.finder.run('upload', dict(target=self.vol.encode(lfs.DIR),
+            upload=[ lib.Upload(name, io.BytesIO(b'new')) ]))
+        return self.finder.response
+
+    def test_upload_overwrite(self):
+        r = self._upload('probe.txt')
+        self.assertEqual(r['added'][0]['name'], 'probe.txt')
+        with open(self.fn) as fh:
+            self.assertEqual(fh.read(), 'new')
+        r = self._upload('probe_locked.txt')
+        self.assertEqual(r['added'], [])
+        with open(self.locked) as fh:
+            self.assertEqual(fh.read(), 'old')
+        # Never replace a dir with a file
+        r = self._upload('probe_dir')
+        self.assertEqual(r['added'], [])
+        self.assertTrue(os.path.isdir(self.dir))
@@ -0,0 +1,121 @@
+import unittest
+import os
+import copy
+import shutil
+import tempfile
+import zipfile
+
+import pym_elfinder.exceptions as exc
+from pym_elfinder.volume import ziparchive
+from .. import lib
+
+
+class TestZipArchiveVolume(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.zip_fn = os.path.join(cls.tmp_dir, 'bundle.zip')
+        with zipfile.ZipFile(cls.zip_fn, 'w', zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr('README.txt', 'Read me.')
+            # "docs" has no entry of its own
+            zf.writestr('docs/manual.txt', 'Manual ' * 1000)
+            zf.writestr('docs/api/index.html', '<html></html>')
+            zf.writestr('empty/', '')
+        opts = copy.deepcopy(lib.DEF_OPTS)
+        opts['roots'].append(dict(
+            id='1',
+            driver='pym_elfinder.volume.ziparchive',
+            path=cls.zip_fn
+        ))
+        cls.finder = lib.create_finder(opts)
+        cls.vol = cls.finder.volumes['z1_']
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir)
+
+    def test_open(self):
+        self.finder.run('open', dict(target=self.vol.root_hash()))
+        r = self.finder.response
+        self.assertEqual(r['cwd']['name'], 'bundle.zip')
+        self.assertEqual(r['cwd']['dirs'], 1)
+        self.assertEqual(r['cwd']['write'], 0)
+        names = sorted(f['name'] for f in r['files'])
+        self.assertEqual(names, ['README.txt', 'docs', 'empty'])
+
+    def test_tree(self):
+        self.finder.run('tree', dict(target=self.vol.root_hash()))
+        tree = self.finder.response['tree']
+        self.assertEqual(sorted(f['name'] for f in tree),
+            ['bundle.zip', 'docs', 'empty'])
+        docs = [ f for f in tree if f['name'] == 'docs' ][0]
+        self.assertEqual(docs['dirs'], 1)
+        self.assertEqual(docs['phash'], self.vol.root_hash())
+
+    def test_file(self):
+        target = self.vol.encode('/docs/manual.txt')
+        self.finder.run('file', dict(target=target))
+        r = self.finder.response
+        self.assertEqual(r['stat']['size'], 7000)
+        self.assertEqual(r['file'].read(), b'Manual ' * 1000)
+        r['file'].close()
+
+    def test_get(self):
+        self.finder.run('get', dict(target=self.vol.encode('/README.txt')))
+        self.assertEqual(self.finder.response['content'], 'Read me.')
+
+    def test_readonly(self):
+        with self.assertRaises(exc.FinderError):
+            self.finder.run('mkdir', dict(target=self.vol.root_hash(),
+                name='new'))
+        with self.assertRaises(exc.FinderError):
+            self.finder.run('rm', dict(
+                targets=[self.vol.encode('/README.txt')]))
+        self.assertTrue(os.path.exists(self.zip_fn))
+
+    def test_dimensions(self):
+        self.assertIsNone(self.vol._dimensions('/README.txt', 'text/plain'))
+
+    def _mount(self, fn):
+        opts = copy.deepcopy(lib.DEF_OPTS)
+        opts['roots'] = [ dict(id='2', driver='pym_elfinder.volume.ziparchive',
+            path=fn) ]
+        return lib.create_finder(opts).volumes['z2_']
+
+    def test_index_cache(self):
+        fn = os.path.join(self.tmp_dir, 'changing.zip')
+        with zipfile.ZipFile(fn, 'w') as zf:
+            zf.writestr('a.txt', 'a')
+        old = self._mount(fn)
+        # Replaced, not rewritten in place, so the old volume keeps its file
+        tmp = fn + '.tmp'
+        with zipfile.ZipFile(tmp, 'w') as zf:
+            zf.writestr('b.txt', 'bb')
+        os.utime(tmp, (0, 0))
+        os.replace(tmp, fn)
+        vol = self._mount(fn)
+        # Index of changed archive is rebuilt
+        self.assertEqual(vol._ls_names('/'), [ '/b.txt' ])
+        # Old volume still reads its own archive
+        self.assertEqual(old._get_content('/a.txt'), b'a')
+        # Keep the archive of the other tests out of the way
+        saved = dict(ziparchive._INDEX_CACHE)
+        ziparchive._INDEX_CACHE.clear()
+        ziparchive._INDEX_CACHE[os.path.realpath(fn)] = saved.pop(
+            os.path.realpath(fn))
+        size = ziparchive.INDEX_CACHE_SIZE
+        ziparchive.INDEX_CACHE_SIZE = 1
+        try:
+            other = os.path.join(self.tmp_dir, 'other.zip')
+            shutil.copy(self.zip_fn, other)
+            self._mount(other)
+            self.assertEqual(list(ziparchive._INDEX_CACHE),
+                [ os.path.realpath(other) ])
+            # Mounted volume is not affected by dropping its index
+            self.assertEqual(vol._get_content('/b.txt'), b'bb')
+            vol.umount()
+            self.assertIsNone(vol._zip)
+        finally:
+            ziparchive.INDEX_CACHE_SIZE = size
+            ziparchive._INDEX_CACHE.update(saved)